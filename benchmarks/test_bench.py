@@ -33,7 +33,7 @@ def deserialize_module() -> VerifiedModule:
     with open(filename, 'rb') as file:
         code = file.read()
         obj = CompiledModule.deserialize(code)
-        bstr = obj.serialize()
+        bstr = bytes(obj.as_inner().serialize())
         assert code == bstr
         return VerifiedModule(obj)
 
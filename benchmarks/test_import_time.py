@@ -0,0 +1,101 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from typing import List, Mapping
+import argparse
+import json
+import subprocess
+
+# Import-time benchmark: every package below is imported in a fresh interpreter, and the import
+# must take less than its budget in seconds (best of `--repeat` runs).
+#
+#   python benchmarks/test_import_time.py --repeat 5
+#
+# Importing must not build the staged stdlib nor deserialize the genesis blob: both are loaded
+# on first use, so that short-lived tools only pay for what they use.
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../'))
+
+IMPORT_BUDGETS: Mapping[str, float] = {
+    "mol.vm": 0.5,
+    "mol.stdlib": 1.0,
+    "mol.bytecode_verifier": 1.0,
+    "mol.compiler.main": 1.5,
+    "mol.libra_vm": 1.5,
+    "mol.e2e_tests.executor": 1.5,
+    "mol.functional_tests.runner": 1.5,
+}
+
+# Prints the time taken to import the package, and whether the stdlib and the genesis write set
+# were loaded meanwhile.
+PROBE = """
+import sys, time
+start = time.perf_counter()
+__import__(sys.argv[1])
+elapsed = time.perf_counter() - start
+stdlib = sys.modules.get("mol.stdlib.stdlib")
+data_store = sys.modules.get("mol.e2e_tests.data_store")
+print(elapsed)
+print(stdlib is not None and stdlib.stdlib_modules.cache_info().currsize > 0)
+print(data_store is not None and data_store.genesis_write_set.cache_info().currsize > 0)
+"""
+
+
+def import_time(package: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE, package],
+        cwd=ROOT,
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    ).stdout.split()
+    return {
+        "seconds": float(out[0]),
+        "loads_stdlib": out[1] == "True",
+        "loads_genesis": out[2] == "True",
+    }
+
+
+def run(repeat: int = 3, packages: List[str] = None) -> dict:
+    report = {}
+    for package in packages or IMPORT_BUDGETS:
+        runs = [import_time(package) for _ in range(repeat)]
+        best = min(runs, key=lambda run: run["seconds"])
+        best["budget"] = IMPORT_BUDGETS.get(package)
+        report[package] = best
+    return report
+
+
+def failures(report: dict) -> List[str]:
+    ret = []
+    for (package, result) in report.items():
+        if result["budget"] is not None and result["seconds"] > result["budget"]:
+            ret.append(f"{package}: {result['seconds']:.3f}s > {result['budget']}s")
+        if result["loads_stdlib"]:
+            ret.append(f"{package}: builds the stdlib on import")
+        if result["loads_genesis"]:
+            ret.append(f"{package}: loads the genesis blob on import")
+    return ret
+
+
+def test_import_time():
+    report = run(repeat=2)
+    assert failures(report) == []
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Import-time benchmark.")
+    parser.add_argument("packages", nargs="*", help="packages to import, defaults to the budgeted ones")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    report = run(args.repeat, args.packages)
+    print(json.dumps(report, indent=2, sort_keys=True))
+    errors = failures(report)
+    for error in errors:
+        print(error)
+    return 1 if errors else 0
+
+
+if __name__=='__main__':
+    sys.exit(main())
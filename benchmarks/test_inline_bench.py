@@ -0,0 +1,44 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from mol.bytecode_verifier import VerifiedModule
+from mol.compiler.ir_to_bytecode.compiler import compile_module
+from mol.compiler.ir_to_bytecode.parser import parse_module
+from mol.move_vm.runtime.move_vm import MoveVM
+from libra.account_address import Address
+from test_bench import execute
+import time
+
+# The `call` benchmark of `bench.move`, ported to Move IR in `bench_call.mvir` and compiled with
+# and without inlining of its small helpers.
+#
+#   python benchmarks/test_inline_bench.py
+
+CURDIR = os.path.dirname(__file__)
+
+
+def compile_bench(inline: bool) -> VerifiedModule:
+    path = os.path.join(CURDIR, "bench_call.mvir")
+    with open(path) as file:
+        module = parse_module(path, file.read())
+    (compiled, _) = compile_module(Address.default(), module, [], optimize=inline, inline=inline)
+    return VerifiedModule.new(compiled)
+
+
+def bench_call(inline: bool) -> float:
+    move_vm = MoveVM.new()
+    move_vm.cache_module(compile_bench(inline))
+    start = time.perf_counter()
+    execute(move_vm, "call")
+    return time.perf_counter() - start
+
+
+def test_call_inlined():
+    bench_call(True)
+
+
+if __name__ == '__main__':
+    plain = bench_call(False)
+    inlined = bench_call(True)
+    print(f"call: {plain:.2f}s, inlined: {inlined:.2f}s ({plain / inlined:.2f}x)")
@@ -0,0 +1,65 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from mol.bytecode_verifier.instantiation_loops import InstantiationLoopChecker
+from mol.vm.file_format import *
+from mol.vm.file_format_common import Opcodes, SerializedType
+from libra.vm_error import StatusCode
+import time
+
+# Entry point for the bench: builds a module with `count` generic functions, split in rings
+# of `ring` functions each calling the next one with its own type parameter. The last function
+# of a ring calls the first one with `vector<T>`, so every ring is a loop in the instantiation
+# graph.
+def bench(count: int, ring: int):
+    module = generic_module(count, ring)
+    errors = InstantiationLoopChecker.new(module).verify()
+    assert len(errors) == count // ring
+    assert all(x.major_status == StatusCode.LOOP_IN_INSTANTIATION_GRAPH for x in errors)
+
+
+def generic_module(count: int, ring: int) -> CompiledModule:
+    type_param = SignatureToken(SerializedType.TYPE_PARAMETER, typeParameter=0)
+    vector_of = SignatureToken(SerializedType.VECTOR, vector_type=type_param)
+    module = empty_module()
+    module.locals_signatures.append(LocalsSignature([type_param]))
+    module.locals_signatures.append(LocalsSignature([vector_of]))
+    module.function_signatures.append(FunctionSignature(
+        arg_types=[],
+        return_types=[],
+        type_formals=[Kind.All],
+    ))
+    for idx in range(count):
+        if (idx + 1) % ring == 0:
+            (callee, actuals) = (idx + 1 - ring, 2)
+        else:
+            (callee, actuals) = (idx + 1, 1)
+        code_unit = CodeUnit()
+        code_unit.code = [
+            Bytecode(Opcodes.CALL, (FunctionHandleIndex(callee), LocalsSignatureIndex(actuals))),
+            Bytecode(Opcodes.RET),
+        ]
+        fun_def = FunctionDefinition()
+        fun_def.function = FunctionHandleIndex(idx)
+        fun_def.code = code_unit
+        module.identifiers.append(f"f{idx}")
+        module.function_handles.append(FunctionHandle(
+            module=ModuleHandleIndex(0),
+            name=IdentifierIndex(idx + 1),
+            signature=FunctionSignatureIndex(0),
+        ))
+        module.function_defs.append(fun_def)
+    return module.freeze()
+
+
+def test_small_rings():
+    bench(2000, 4)
+
+def test_one_ring():
+    bench(5000, 5000)
+
+if __name__=='__main__':
+    for (count, ring) in [(2000, 4), (5000, 5000), (20000, 20000)]:
+        start = time.perf_counter()
+        bench(count, ring)
+        print(f"{count} functions, rings of {ring}: {time.perf_counter() - start:.3f}s")
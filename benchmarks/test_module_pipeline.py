@@ -0,0 +1,248 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from mol.bytecode_verifier import (
+    CodeUnitVerifier, DuplicationChecker, RecursiveStructDefChecker, ResourceTransitiveChecker,
+    SignatureChecker, VerifiedModule
+    )
+from mol.bytecode_verifier.instantiation_loops import InstantiationLoopChecker
+from mol.compiler.ir_to_bytecode.compiler import compile_module
+from mol.compiler.ir_to_bytecode.parser import parse_script_or_module
+from mol.functional_tests.config.globl import Config as GlobalConfig
+from mol.functional_tests.evaluator import CommandTag
+from mol.functional_tests.preprocessor import build_transactions, split_input
+from mol.move_ir.types import ast
+from mol.move_vm.runtime.loaded_data import LoadedModule
+from mol.stdlib import parse_stdlib_file
+from mol.vm.check_bounds import BoundsChecker
+from mol.vm.file_format import CompiledModule, CompiledModuleMut
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Mapping, Tuple
+import argparse
+import contextlib
+import io
+import json
+import platform
+import time
+
+# Benchmark of the module publishing pipeline: every stage a module blob goes through between
+# being read from storage and being executable, and `serialize` for the way back.
+#
+#   python benchmarks/test_module_pipeline.py --corpus all --output current.json
+#   python benchmarks/test_module_pipeline.py --baseline current.json
+#
+# The report is JSON. For every stage it gives modules/sec and MB/s (measured against the size
+# of the module blob) over the whole corpus, and ops/sec and MB/s per module. Each measurement
+# is the best of `--iterations` runs. With `--baseline`, stages slower than the baseline by more
+# than `--threshold` are listed under "regressions" and the exit status is 1.
+
+CURDIR = os.path.dirname(__file__)
+IR_TESTSUITE = os.path.join(CURDIR, "../ir-testsuite/tests")
+
+
+@dataclass
+class PipelineModule:
+    name: str
+    blob: bytes
+    mutable: CompiledModuleMut
+    compiled: CompiledModule
+    verified: VerifiedModule
+
+
+def pipeline_module(name: str, blob: bytes) -> PipelineModule:
+    compiled = CompiledModule.deserialize(blob)
+    return PipelineModule(
+        name,
+        blob,
+        CompiledModuleMut.deserialize_no_check_bounds(blob),
+        compiled,
+        VerifiedModule.new(compiled),
+    )
+
+
+def stdlib_corpus() -> List[PipelineModule]:
+    ret = []
+    for blob in parse_stdlib_file():
+        module = CompiledModule.deserialize(blob)
+        ret.append(pipeline_module(f"stdlib:{module.name()}", blob))
+    return ret
+
+
+# Compiles the modules of the IR testsuite, keeping the ones that pass verification. The parser
+# prints the errors of the test cases expected to fail, so stdout is silenced meanwhile.
+def ir_corpus(limit: int = None) -> List[PipelineModule]:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return compile_ir_corpus(limit)
+
+
+def compile_ir_corpus(limit: int = None) -> List[PipelineModule]:
+    from mol.stdlib import stdlib_modules
+    ret = []
+    files = sorted(Path(IR_TESTSUITE).glob("**/*.mvir"))
+    for path in files:
+        (config, _directives, commands) = split_input(path.read_text().splitlines())
+        config = GlobalConfig.build(config)
+        deps = list(stdlib_modules())
+        for command in build_transactions(config, commands):
+            if command.tag != CommandTag.vTransaction:
+                continue
+            transaction = command.value
+            try:
+                sorm = parse_script_or_module("unused_file_name", transaction.ins)
+                if sorm.tag != ast.ScriptOrModule.MODULE:
+                    continue
+                address = transaction.config.sender.address()
+                (module, _source_map) = compile_module(address, sorm.value, deps)
+                blob = module.serialize()
+                entry = pipeline_module(f"{path.relative_to(IR_TESTSUITE)}:{module.name()}", blob)
+            except Exception:
+                continue
+            deps.append(entry.verified)
+            ret.append(entry)
+            if limit is not None and len(ret) >= limit:
+                return ret
+    return ret
+
+
+def load_corpus(corpus: str, limit: int = None) -> List[PipelineModule]:
+    if corpus == "stdlib":
+        return stdlib_corpus()
+    elif corpus == "ir":
+        return ir_corpus(limit)
+    else:
+        return stdlib_corpus() + ir_corpus(limit)
+
+
+# Stage name and the operation it times on a module.
+STAGES: List[Tuple[str, Callable[[PipelineModule], object]]] = [
+    ("deserialize", lambda m: CompiledModule.deserialize(m.blob)),
+    ("deserialize_no_check_bounds", lambda m: CompiledModuleMut.deserialize_no_check_bounds(m.blob)),
+    ("bounds_check", lambda m: BoundsChecker(m.mutable).verify()),
+    ("verify.duplication", lambda m: DuplicationChecker(m.compiled).verify()),
+    ("verify.signature", lambda m: SignatureChecker(m.compiled).verify()),
+    ("verify.resources", lambda m: ResourceTransitiveChecker.new(m.compiled).verify()),
+    ("verify.struct_defs", lambda m: RecursiveStructDefChecker(m.compiled).verify()),
+    ("verify.instantiation_loops", lambda m: InstantiationLoopChecker.new(m.compiled).verify()),
+    ("verify.code_unit", lambda m: CodeUnitVerifier.verify(m.compiled)),
+    ("verify", lambda m: VerifiedModule.new(m.compiled)),
+    ("loaded_module", lambda m: LoadedModule.new(m.verified)),
+    # `CompiledModule.serialize` returns the bytes the module was deserialized from, so time the
+    # serializer itself.
+    ("serialize", lambda m: m.mutable.serialize()),
+]
+
+
+def best_time(fun: Callable, module: PipelineModule, iterations: int) -> float:
+    best = None
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fun(module)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def rates(count: int, size: int, elapsed: float) -> Mapping[str, float]:
+    elapsed = max(elapsed, 1e-9)
+    return {
+        "ops_per_sec": count / elapsed,
+        "mb_per_sec": size / elapsed / 1e6,
+    }
+
+
+def run(corpus: str = "stdlib", iterations: int = 3, limit: int = None, stages: List[str] = None) -> dict:
+    modules = load_corpus(corpus, limit)
+    total_size = sum(len(m.blob) for m in modules)
+    report = {
+        "corpus": corpus,
+        "iterations": iterations,
+        "python": platform.python_version(),
+        "module_count": len(modules),
+        "total_bytes": total_size,
+        "stages": {},
+        "modules": {m.name: {"bytes": len(m.blob)} for m in modules},
+    }
+    for (stage, fun) in STAGES:
+        if stages and stage not in stages:
+            continue
+        total = 0.0
+        for module in modules:
+            elapsed = best_time(fun, module, iterations)
+            total += elapsed
+            report["modules"][module.name][stage] = rates(1, len(module.blob), elapsed)
+        report["stages"][stage] = rates(len(modules), total_size, total)
+    return report
+
+
+# Compares the stage throughput of `report` with `baseline`. A stage regresses when its
+# modules/sec dropped by more than `threshold` (a fraction).
+def compare(report: dict, baseline: dict, threshold: float = 0.1) -> dict:
+    stages = {}
+    regressions = []
+    for (stage, current) in report["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if previous is None:
+            continue
+        ratio = current["ops_per_sec"] / previous["ops_per_sec"]
+        stages[stage] = {
+            "baseline_ops_per_sec": previous["ops_per_sec"],
+            "ops_per_sec": current["ops_per_sec"],
+            "ratio": ratio,
+        }
+        if ratio < 1.0 - threshold:
+            regressions.append(stage)
+    return {"threshold": threshold, "stages": stages, "regressions": regressions}
+
+
+def test_stdlib_pipeline():
+    report = run("stdlib", iterations=1, stages=["deserialize", "verify.signature", "serialize"])
+    assert report["module_count"] > 0
+    assert set(report["stages"]) == {"deserialize", "verify.signature", "serialize"}
+    for rate in report["stages"].values():
+        assert rate["ops_per_sec"] > 0 and rate["mb_per_sec"] > 0
+    json.dumps(report)
+
+    baseline = json.loads(json.dumps(report))
+    baseline["stages"]["serialize"]["ops_per_sec"] *= 2
+    comparison = compare(report, baseline)
+    assert comparison["regressions"] == ["serialize"]
+
+
+def test_ir_corpus():
+    modules = ir_corpus(limit=3)
+    assert len(modules) == 3
+    assert all(m.name.endswith(m.compiled.name()) for m in modules)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Module pipeline throughput benchmark.")
+    parser.add_argument("--corpus", choices=["stdlib", "ir", "all"], default="stdlib")
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--limit", type=int, default=None, help="max number of IR modules")
+    parser.add_argument("--stage", action="append", dest="stages", help="only run these stages")
+    parser.add_argument("--output", help="write the report to this file")
+    parser.add_argument("--baseline", help="compare against a report written by --output")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    report = run(args.corpus, args.iterations, args.limit, args.stages)
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as file:
+            comparison = compare(report, json.load(file), args.threshold)
+        report["comparison"] = comparison
+        if comparison["regressions"]:
+            status = 1
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text)
+    else:
+        print(text)
+    return status
+
+
+if __name__=='__main__':
+    sys.exit(main())
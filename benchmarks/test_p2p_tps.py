@@ -0,0 +1,213 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from mol.e2e_tests.account import Account
+from mol.e2e_tests.common_transactions import peer_to_peer_txn
+from mol.e2e_tests.executor import FakeExecutor, VMPublishingOption
+from mol.libra_vm import LibraVM
+from libra.transaction import (
+    SignatureCheckedTransaction, SignedTransaction, Transaction, TransactionOutput, TransactionStatus,
+)
+from libra.vm_error import StatusCode
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import List, Mapping
+import argparse
+import contextlib
+import io
+import json
+import random
+import resource
+import time
+
+# End-to-end throughput benchmark: peer-to-peer transfers between `--accounts` accounts, run
+# through `LibraVM.execute_block` in blocks of `--block-size` transactions on top of genesis.
+#
+#   python benchmarks/test_p2p_tps.py --accounts 100 --transactions 1000 --block-size 100
+#
+# Every transaction is signed before the clock starts. A fraction `--hot-ratio` of the
+# transfers pay one of the first `--hot-accounts` accounts, to model contention on popular
+# accounts; the others pay a random account. The write sets of a block are applied before the
+# next block runs.
+#
+# The report is JSON: transactions per second over the executed blocks, the p50/p99 latency of a
+# transaction (its signature check and its execution), the gas used, and the peak RSS of the
+# process.
+
+INITIAL_BALANCE = 10_000_000_000
+TRANSFER_AMOUNT = 10
+
+
+@dataclass
+class LoadConfig:
+    accounts: int = 100
+    transactions: int = 1000
+    block_size: int = 100
+    hot_ratio: float = 0.0
+    hot_accounts: int = 1
+    seed: int = 0
+
+
+# A `LibraVM` recording the time spent on every user transaction of the blocks it executes: the
+# signatures of a block are all checked before the first transaction runs, so the two parts are
+# added up per transaction.
+class TimedLibraVM(LibraVM):
+    latencies: List[float] = []
+
+    @classmethod
+    def new(cls, code_cache=None) -> LibraVM:
+        vm = super().new(code_cache)
+        # Indices in `latencies` of the transactions whose signature checked, in execution order.
+        vm.checked = deque()
+        return vm
+
+    def check_txn_signature(self, transaction: SignedTransaction):
+        start = time.perf_counter()
+        ret = super().check_txn_signature(transaction)
+        TimedLibraVM.latencies.append(time.perf_counter() - start)
+        if isinstance(ret, SignatureCheckedTransaction):
+            self.checked.append(TimedLibraVM.latencies.__len__() - 1)
+        return ret
+
+    def execute_user_transaction(self, state_view, remote_cache, txn) -> TransactionOutput:
+        start = time.perf_counter()
+        ret = super().execute_user_transaction(state_view, remote_cache, txn)
+        TimedLibraVM.latencies[self.checked.popleft()] += time.perf_counter() - start
+        return ret
+
+
+# Signs `config.transactions` transfers between `accounts`, with the sequence numbers they will
+# have when executed in order.
+def generate_transactions(
+    accounts: List[Account],
+    config: LoadConfig,
+) -> List[SignedTransaction]:
+    rng = random.Random(config.seed)
+    hot = accounts[:max(1, min(config.hot_accounts, len(accounts)))]
+    sequence_numbers: Mapping[int, int] = {}
+    txns = []
+    for _ in range(config.transactions):
+        sender = rng.randrange(len(accounts))
+        if rng.random() < config.hot_ratio:
+            receiver = accounts[rng.randrange(len(hot))]
+        else:
+            receiver = accounts[rng.randrange(len(accounts))]
+        seq_num = sequence_numbers.get(sender, 0)
+        sequence_numbers[sender] = seq_num + 1
+        txns.append(peer_to_peer_txn(accounts[sender], receiver, seq_num, TRANSFER_AMOUNT))
+    return txns
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run(config: LoadConfig) -> dict:
+    executor = FakeExecutor.custom_genesis(None, None, VMPublishingOption.Open)
+    accounts = executor.create_accounts(config.accounts, INITIAL_BALANCE, 0)
+    txns = generate_transactions(accounts, config)
+
+    TimedLibraVM.latencies = []
+    outputs: List[TransactionOutput] = []
+    elapsed = 0.0
+    # The VM prints the traceback of every failed transaction.
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        for start in range(0, len(txns), config.block_size):
+            block = [
+                Transaction('UserTransaction', txn)
+                for txn in txns[start:start + config.block_size]
+            ]
+            begin = time.perf_counter()
+            block_outputs = TimedLibraVM.execute_block(block, executor.get_state_view())
+            elapsed += time.perf_counter() - begin
+            for output in block_outputs:
+                if output.status.tag == TransactionStatus.Keep:
+                    executor.apply_write_set(output.write_set)
+            outputs.extend(block_outputs)
+
+    executed = [
+        output for output in outputs
+        if output.status.tag == TransactionStatus.Keep
+        and output.status.vm_status.major_status == StatusCode.EXECUTED
+    ]
+    gas = [output.gas_used for output in outputs]
+    latencies = TimedLibraVM.latencies
+    return {
+        "config": asdict(config),
+        "transactions": len(outputs),
+        "executed": len(executed),
+        "blocks": -(-len(txns) // config.block_size),
+        "elapsed_s": elapsed,
+        "tps": len(outputs) / elapsed if elapsed else 0.0,
+        "latency_ms": {
+            "p50": percentile(latencies, 0.5) * 1000,
+            "p99": percentile(latencies, 0.99) * 1000,
+            "max": max(latencies, default=0.0) * 1000,
+        },
+        "gas_used": {
+            "total": sum(gas),
+            "mean": sum(gas) / len(gas) if gas else 0.0,
+        },
+        # Linux reports kilobytes.
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def test_p2p_tps():
+    config = LoadConfig(accounts=3, transactions=4, block_size=2, hot_ratio=0.5)
+    report = run(config)
+    assert report["transactions"] == 4
+    assert report["executed"] == 4
+    assert report["blocks"] == 2
+    assert report["tps"] > 0
+    assert report["latency_ms"]["p50"] <= report["latency_ms"]["p99"]
+    assert report["gas_used"]["total"] > 0
+    json.dumps(report)
+
+
+def test_hot_accounts():
+    config = LoadConfig(accounts=10, transactions=50, hot_ratio=1.0, hot_accounts=2)
+    accounts = [Account.new() for _ in range(config.accounts)]
+    txns = generate_transactions(accounts, config)
+    receivers = set(txn.raw_txn.payload.value.args[0].value for txn in txns)
+    assert receivers <= set(account.address() for account in accounts[:2])
+    # Every sender's sequence numbers are consecutive.
+    sequence_numbers = {}
+    for txn in txns:
+        sender = txn.raw_txn.sender
+        assert txn.raw_txn.sequence_number == sequence_numbers.get(sender, 0)
+        sequence_numbers[sender] = txn.raw_txn.sequence_number + 1
+
+
+def main(argv: List[str] = None) -> int:
+    defaults = LoadConfig()
+    parser = argparse.ArgumentParser(description="Peer-to-peer transfer throughput benchmark.")
+    parser.add_argument("--accounts", type=int, default=defaults.accounts)
+    parser.add_argument("--transactions", type=int, default=defaults.transactions)
+    parser.add_argument("--block-size", type=int, default=defaults.block_size)
+    parser.add_argument("--hot-ratio", type=float, default=defaults.hot_ratio,
+        help="fraction of the transfers paying a hot account")
+    parser.add_argument("--hot-accounts", type=int, default=defaults.hot_accounts,
+        help="number of hot accounts")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--output", help="write the report to this file")
+    args = parser.parse_args(argv)
+
+    config = LoadConfig(
+        args.accounts, args.transactions, args.block_size, args.hot_ratio, args.hot_accounts,
+        args.seed,
+    )
+    text = json.dumps(run(config), indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__=='__main__':
+    sys.exit(main())
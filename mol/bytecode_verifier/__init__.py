@@ -6,7 +6,9 @@ from mol.bytecode_verifier.control_flow_graph import (
 from mol.bytecode_verifier.stack_usage_verifier import StackUsageVerifier
 from mol.bytecode_verifier.signature import SignatureChecker
 from mol.bytecode_verifier.resources import ResourceTransitiveChecker
-from mol.bytecode_verifier.code_unit_verifier import CodeUnitVerifier
+from mol.bytecode_verifier.code_unit_verifier import (
+    CodeUnitVerifier, enable_parallel_verification, disable_parallel_verification
+    )
 from mol.bytecode_verifier.struct_defs import RecursiveStructDefChecker
 from mol.bytecode_verifier.verifier import (
     batch_verify_modules, verify_main_signature, verify_module_dependencies,
@@ -18,6 +18,11 @@ class AbstractDomain(abc.ABC):
     def join(self, other: AbstractDomain) -> JoinResult:
         bail("unimplemented!")
 
+    # Returns an independent copy of self. Domains backed by persistent data structures override
+    # this to share structure instead of copying it.
+    def snapshot(self) -> AbstractDomain:
+        return deepcopy(self)
+
 
 
 class JoinResult(IntEnum):
@@ -126,7 +131,7 @@ class AbstractInterpreter(TransferFunctions):
             block_invariant = inv_map[block_id]
 
             if block_invariant.pre.tag == BlockPrecondition.STATE:
-                state = deepcopy(block_invariant.pre.state)
+                state = block_invariant.pre.state.snapshot()
             else:
                 # Can't analyze the block from a failing precondition
                 continue
@@ -166,7 +171,7 @@ class AbstractInterpreter(TransferFunctions):
                     # Haven't visited the next block yet. Use the post of the current block as
                     # its pre and schedule it.
                     inv_map[next_block_id] = BlockInvariant(
-                            BlockPrecondition.State(deepcopy(state)),
+                            BlockPrecondition.State(state.snapshot()),
                             BlockPostcondition.Success(),
                         )
 
@@ -21,8 +21,12 @@ checked_verify = assert_true
 
 
 # This module defines the abstract state for the type and memory safety analysis.
+#
+# Abstract values are immutable and signature tokens are shared with the module rather than
+# copied, so states can share them freely. `AbstractState.snapshot()` is O(1): the snapshot
+# shares the locals map (copied on the first write to either state) and the borrow graph.
 
-@dataclass
+@dataclass(frozen=True)
 class TypedAbstractValue(JsonPrintable):
     signature: SignatureToken
     value: AbstractValue
@@ -30,7 +34,7 @@ class TypedAbstractValue(JsonPrintable):
 
 # AbstractValue represents a value either on the evaluation stack or
 # in a local on a frame of the function stack.
-@dataclass
+@dataclass(frozen=True)
 class AbstractValue(JsonPrintable):
     tag: int
     value: Union[RefID, Kind]
@@ -122,12 +126,16 @@ class LabelElem(JsonPrintable):
 
 # AbstractState is the analysis state over which abstract interpretation is performed.
 @dataclass
-class AbstractState(JsonPrintable):
+class AbstractState(AbstractDomain, JsonPrintable):
     locls: Mapping[LocalIndex, TypedAbstractValue]
     borrow_graph: BorrowGraph #<LabelElem>,
     num_locls: usize
     next_id: usize
 
+    def __post_init__(self):
+        # True if `locls` may be referenced by another state and must be copied before a write.
+        self.shared = False
+
     @classmethod
     def default(cls) -> AbstractState:
         return cls({}, BorrowGraph.new(), 0, 0)
@@ -143,7 +151,7 @@ class AbstractState(JsonPrintable):
                 borrow_graph.add(rid)
                 locls[arg_idx] = \
                     TypedAbstractValue(
-                        signature= deepcopy(arg_type_view.as_inner()),
+                        signature= arg_type_view.as_inner(),
                         value= AbstractValue.Reference(rid),
                     )
             else:
@@ -151,7 +159,7 @@ class AbstractState(JsonPrintable):
                     function_definition_view.signature().as_inner().type_formals)
                 locls[arg_idx] = \
                     TypedAbstractValue(
-                        signature= deepcopy(arg_type_view.as_inner()),
+                        signature= arg_type_view.as_inner(),
                         value= AbstractValue.Value(arg_kind),
                     )
 
@@ -168,6 +176,21 @@ class AbstractState(JsonPrintable):
         return new_state
 
 
+    # returns a copy of self sharing its locals and borrow graph
+    def snapshot(self) -> AbstractState:
+        self.shared = True
+        ret = AbstractState(self.locls, self.borrow_graph.snapshot(), self.num_locls, self.next_id)
+        ret.shared = True
+        return ret
+
+
+    # makes `locls` private to self before a write
+    def own_locls(self):
+        if self.shared:
+            self.locls = dict(self.locls)
+            self.shared = False
+
+
     # checks if local@idx is available
     def is_available(self, idx: LocalIndex) -> bool:
         return idx in self.locls
@@ -180,11 +203,13 @@ class AbstractState(JsonPrintable):
 
     # removes local@idx
     def remove_local(self, idx: LocalIndex) -> TypedAbstractValue:
+        self.own_locls()
         return self.locls.pop(idx)
 
 
     # inserts local@idx
     def insert_local(self, idx: LocalIndex, abs_type: TypedAbstractValue):
+        self.own_locls()
         self.locls[idx] = abs_type
 
 
@@ -215,6 +240,7 @@ class AbstractState(JsonPrintable):
     # destroys local@idx
     def destroy_local(self, idx: LocalIndex):
         checked_precondition(self.is_local_safe_to_destroy(idx))
+        self.own_locls()
         local = self.locls.pop(idx)
         av = local.value
         if av.tag == AbstractValue.REFERENCE:
@@ -367,11 +393,11 @@ class AbstractState(JsonPrintable):
                 new_id = RefID(idx)
                 id_map[rid] = new_id
                 new_abs = TypedAbstractValue(
-                    signature= deepcopy(abv.signature),
+                    signature= abv.signature,
                     value= AbstractValue.Reference(new_id),
                 )
             else:
-                new_abs = deepcopy(abv)
+                new_abs = abv
             return (idx, new_abs)
 
         locls = {}
@@ -418,8 +444,8 @@ class AbstractState(JsonPrintable):
         checked_precondition(self.next_id == other.next_id)
         checked_precondition(self.num_locls == other.num_locls)
         locls = {} #BTreeMap.new()
-        self_graph = deepcopy(self.borrow_graph)
-        other_graph = deepcopy(other.borrow_graph)
+        self_graph = self.borrow_graph.snapshot()
+        other_graph = other.borrow_graph.snapshot()
         for idx in self.iter_locls():
             self_value = self.locls.get(idx)
             other_value = other.locls.get(idx)
@@ -448,7 +474,7 @@ class AbstractState(JsonPrintable):
                     # The local has a value on each side, add it to the state
                     checked_verify(self_value == other_value)
                     checked_verify(idx not in locls)
-                    locls[idx] = deepcopy(self_value)
+                    locls[idx] = self_value
 
         self_graph.join(other_graph)
         borrow_graph = self_graph
@@ -489,3 +515,4 @@ class AbstractState(JsonPrintable):
         self.borrow_graph = other.borrow_graph
         self.num_locls = other.num_locls
         self.next_id = other.next_id
+        self.shared = other.shared
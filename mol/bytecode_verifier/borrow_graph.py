@@ -27,6 +27,11 @@ checked_verify = assert_true
 # b is equal to the p-extension of a.  Instead, if the edge was weak, it indicates that b is an
 # extension of the p-extension of a.
 
+# The graph is a persistent structure: edges and labels are immutable, an edge set is never
+# mutated in place once it is in the graph (it is replaced by a new set instead), and the map
+# from ids to edge sets is copied on the first write after a `snapshot()`. Taking a snapshot is
+# O(1) and a snapshot shares every edge set with the graph it was taken from.
+
 
 
 
@@ -38,21 +43,18 @@ class EdgeType(IntEnum):
 
 
 # The label on an edge
-Label= List
+Label= Tuple
 
 def starts_with(label1, label2):
     return len(label2) <= len(label1) and label1[0:len(label2)] == label2
 
 # A labeled edge in borrow graph
-@dataclass
+@dataclass(frozen=True)
 class Edge(JsonPrintable):
     edge_type: EdgeType
     label: Label[Any]
     to: RefID
 
-    def __hash__(self):
-        return (self.edge_type, tuple(self.label), self.to).__hash__()
-
 
     def is_prefix(self, other: Edge) -> bool:
         return self == other or (
@@ -67,15 +69,35 @@ class Edge(JsonPrintable):
 class BorrowGraph(JsonPrintable):
     v0: Mapping[RefID, Set[Edge]] #BTreeMap<RefID, BTreeSet<Edge<T>>>)
 
+    def __post_init__(self):
+        # True if `v0` may be referenced by another graph and must be copied before a write.
+        self.shared = False
+
     # creates a new empty borrow graph
     @classmethod
     def new(cls) -> BorrowGraph:
         return cls({})
 
 
+    # returns a copy of self sharing all its edge sets
+    def snapshot(self) -> BorrowGraph:
+        self.shared = True
+        ret = BorrowGraph(self.v0)
+        ret.shared = True
+        return ret
+
+
+    # makes `v0` private to self before a write
+    def own(self):
+        if self.shared:
+            self.v0 = dict(self.v0)
+            self.shared = False
+
+
     # adds a fresh id
     def add(self, rid: RefID):
         checked_precondition(rid not in self.v0)
+        self.own()
         self.v0[rid] = set()
 
 
@@ -84,8 +106,9 @@ class BorrowGraph(JsonPrintable):
         checked_precondition(frm in self.v0)
         checked_precondition(to in self.v0)
         checked_precondition(self.v0[to].__len__() == 0)
-        new_edge = Edge(EdgeType.Weak, label, to)
-        self.v0[frm].add(new_edge)
+        self.own()
+        new_edge = Edge(EdgeType.Weak, tuple(label), to)
+        self.v0[frm] = self.v0[frm] | {new_edge}
 
 
     # adds a strong edge and factors other edges coming out of `from` with respect to the new edge
@@ -94,8 +117,10 @@ class BorrowGraph(JsonPrintable):
         checked_precondition(to in self.v0)
         checked_precondition(self.v0[to].__len__() == 0)
         checked_precondition(label.__len__() <= 1)
+        self.own()
 
-        new_edge = Edge(EdgeType.Strong, deepcopy(label), to)
+        label = tuple(label)
+        new_edge = Edge(EdgeType.Strong, label, to)
 
         self.v0.pop(to)
         from_edge_set = self.v0.pop(frm)
@@ -109,11 +134,9 @@ class BorrowGraph(JsonPrintable):
             lamb = lambda x: x.label and x.label[0] == label[0]
             (new_to_edges, new_from_edge_set) = BorrowGraph.split(from_edge_set, lamb)
             new_from_edge_set.add(new_edge)
-            for x in new_to_edges:
-                x.label.pop(0)
 
             self.v0[frm] = new_from_edge_set
-            self.v0[to] = set(new_to_edges)
+            self.v0[to] = {Edge(x.edge_type, x.label[1:], x.to) for x in new_to_edges}
 
     # removes `id` and appropriately concatenates each incoming edge with each outgoing edge of `id`
     def remove(self, rid: RefID):
@@ -121,16 +144,20 @@ class BorrowGraph(JsonPrintable):
         #     print(self)
         #     breakpoint()
         checked_assume(self.invariant())
+        self.own()
         id_edge_set = self.v0.pop(rid)
 
         def lambda0():
             x = {}
             for (n, es) in self.v0.items():
-                x[deepcopy(n)] = [x for x in es if x.to == rid]
+                x[n] = [x for x in es if x.to == rid]
             return x
         removed_edges = lambda0()
 
         for (n, es) in removed_edges.items():
+            if es:
+                # replace the (possibly shared) edge set of `n` by a private copy
+                self.v0[n] = set(self.v0[n])
             for removed_edge in es:
                 n_edge_set_ref = self.v0[n]
                 n_edge_set_ref.remove(removed_edge)
@@ -140,9 +167,7 @@ class BorrowGraph(JsonPrintable):
                         return
 
                     if removed_edge.edge_type == EdgeType.Strong:
-                        new_label = []
-                        new_label.extend(deepcopy(removed_edge.label))
-                        new_label.extend(deepcopy(id_edge.label))
+                        new_label = removed_edge.label + id_edge.label
                         edge = Edge(
                             edge_type= id_edge.edge_type,
                             label= new_label,
@@ -152,7 +177,7 @@ class BorrowGraph(JsonPrintable):
                     else:
                         edge = Edge(
                             edge_type= EdgeType.Weak,
-                            label= deepcopy(removed_edge.label),
+                            label= removed_edge.label,
                             to= id_edge.to,
                         )
                         n_edge_set_ref.add(edge)
@@ -167,7 +192,7 @@ class BorrowGraph(JsonPrintable):
         new_graph = {}
         for (n, es) in self.v0.items():
             key = id_map[n]
-            v = {Edge(x.edge_type, deepcopy(x.label), id_map[x.to]) for x in es}
+            v = {Edge(x.edge_type, x.label, id_map[x.to]) for x in es}
             new_graph[key] = v
 
         new_borrow_graph = BorrowGraph(new_graph)
@@ -187,7 +212,9 @@ class BorrowGraph(JsonPrintable):
     # joins `other` into `self`
     def join(self, other: BorrowGraph):
         for (n, es) in self.unmatched_edges(other).items():
-            self.v0[n].update(es)
+            if es:
+                self.own()
+                self.v0[n] = self.v0[n] | es
 
 
     # gets all ids that are targets of outgoing edges from `id`
@@ -225,7 +252,7 @@ class BorrowGraph(JsonPrintable):
     def unmatched_edges(self, other: BorrowGraph) -> Mapping[RefID, Set[Edge]]:
         unmatched_edges = {}
         for (n, other_edges) in other.v0.items():
-            unmatched_edges[deepcopy(n)] = set()
+            unmatched_edges[n] = set()
             for other_edge in other_edges:
                 found_match = False
                 for self_edge in self.v0[n]:
@@ -234,7 +261,7 @@ class BorrowGraph(JsonPrintable):
                         break
 
                 if not found_match:
-                    unmatched_edges[n].add(deepcopy(other_edge))
+                    unmatched_edges[n].add(other_edge)
 
         return unmatched_edges
 
@@ -244,7 +271,7 @@ class BorrowGraph(JsonPrintable):
             for edge in edges:
                 if edge.to not in self.v0:
                     return False
-                if flatten(edge.label) != edge.label:
+                if tuple(flatten(list(edge.label))) != edge.label:
                     return False
         for (n, edges) in self.v0.items():
             for edge in edges:
@@ -6,24 +6,41 @@ from libra.vm_error import StatusCode, VMStatus
 from mol.vm.errors import append_err_info
 from mol.vm.file_format import CompiledModule, FunctionDefinition
 from mol.vm import IndexKind, ModuleAccess
-from typing import List, Optional
+from typing import List, Optional, ClassVar
 from dataclasses import dataclass
 from libra.rustlib import flatten
+from concurrent.futures import Executor, ProcessPoolExecutor
+import os
 
 # This module implements the checker for verifying correctness of function bodies.
 # The overall verification is split between stack_usage_verifier.rs and
 # abstract_interpreter.rs. CodeUnitVerifier simply orchestrates calls into these two files.
+#
+# Function bodies are independent of each other, so for large modules they can be verified on a
+# process pool (see `enable_parallel_verification`). The errors are merged back in function
+# definition order, so the result is the same as a serial run.
 
 @dataclass
 class CodeUnitVerifier:
     module: CompiledModule
 
+    # Process pool used for modules with at least `PARALLEL_THRESHOLD` function definitions.
+    # `None` verifies every module serially.
+    POOL: ClassVar[Optional[Executor]] = None
+    # Number of worker processes of `POOL`, which the functions are split between.
+    WORKERS: ClassVar[int] = 1
+    PARALLEL_THRESHOLD = 16
+
     @classmethod
     def verify(cls, module: CompiledModule) -> List[VMStatus]:
-        verifier = cls(module)
+        function_defs = module.function_defs()
+        if cls.POOL is None or function_defs.__len__() < cls.PARALLEL_THRESHOLD:
+            per_function = verify_function_range(module, 0, function_defs.__len__())
+        else:
+            per_function = verify_function_parallel(cls.POOL, cls.WORKERS, module)
+
         ret = []
-        for (idx, function_definition) in enumerate(verifier.module.function_defs()):
-            errors = flatten(verifier.verify_function(function_definition))
+        for (idx, errors) in enumerate(per_function):
             for err in errors:
                 append_err_info(err, IndexKind.FunctionDefinition, idx)
                 ret.append(err)
@@ -63,3 +80,39 @@ class CodeUnitVerifier:
             return errors
 
         return TypeAndMemorySafetyAnalysis.verify(self.module, function_definition, cfg)
+
+
+# Verify the function definitions in `[start, end)`, returning the (flattened) errors of each.
+def verify_function_range(module: CompiledModule, start: int, end: int) -> List[List[VMStatus]]:
+    verifier = CodeUnitVerifier(module)
+    function_defs = module.function_defs()
+    return [flatten(verifier.verify_function(function_defs[idx])) for idx in range(start, end)]
+
+
+# Verify the function definitions of `module` in `workers` chunks, one per worker of `pool`.
+def verify_function_parallel(
+    pool: Executor, workers: int, module: CompiledModule
+) -> List[List[VMStatus]]:
+    count = module.function_defs().__len__()
+    chunk_size = max(1, -(-count // workers))
+    ranges = [(start, min(start + chunk_size, count)) for start in range(0, count, chunk_size)]
+    futures = [pool.submit(verify_function_range, module, start, end) for (start, end) in ranges]
+    ret = []
+    for future in futures:
+        ret.extend(future.result())
+    return ret
+
+
+# Verify the function bodies of large modules on a pool of `max_workers` processes.
+def enable_parallel_verification(max_workers: Optional[int] = None) -> Executor:
+    disable_parallel_verification()
+    CodeUnitVerifier.POOL = ProcessPoolExecutor(max_workers)
+    CodeUnitVerifier.WORKERS = max_workers or os.cpu_count() or 1
+    return CodeUnitVerifier.POOL
+
+
+def disable_parallel_verification():
+    if CodeUnitVerifier.POOL is not None:
+        CodeUnitVerifier.POOL.shutdown()
+        CodeUnitVerifier.POOL = None
+        CodeUnitVerifier.WORKERS = 1
@@ -6,9 +6,7 @@ from mol.vm.file_format import (
         LocalsSignatureIndex, SignatureToken, TypeParameterIndex, ModuleAccess
     )
 from typing import List, Optional, Mapping, Tuple, Set
-from dataclasses import dataclass
-from pygraph.classes.digraph import digraph
-from pygraph.algorithms.accessibility import mutual_accessibility
+from dataclasses import dataclass, field
 from libra.rustlib import format_str
 
 # This implements an algorithm that detects loops during the instantiation of generics.
@@ -82,11 +80,88 @@ class Edge:
 EdgeInGraph = Tuple[Node, Node]
 
 
+# Graph<Node, Edge> with integer node indices. `succ[i]` maps the index of each successor of
+# node `i` to the data of the edge; only the first edge added between two nodes is kept.
+@dataclass
+class Graph:
+    nodes: List[Node] = field(default_factory=list)
+    node_map: Mapping[Node, int] = field(default_factory=dict)
+    succ: List[Mapping[int, Edge]] = field(default_factory=list)
+
+    # Retrives the index of the specified node. If none exists in the graph yet, create one.
+    def get_or_add_node(self, node: Node) -> int:
+        idx = self.node_map.get(node)
+        if idx is None:
+            idx = self.nodes.__len__()
+            self.node_map[node] = idx
+            self.nodes.append(node)
+            self.succ.append({})
+        return idx
+
+
+    def add_edge(self, node_from: Node, node_to: Node, edge: Edge):
+        from_idx = self.get_or_add_node(node_from)
+        to_idx = self.get_or_add_node(node_to)
+        self.succ[from_idx].setdefault(to_idx, edge)
+
+
+    def edge_data(self, eg: EdgeInGraph) -> Edge:
+        return self.succ[self.node_map[eg[0]]][self.node_map[eg[1]]]
+
+
+# Computes the strongly connected components of the graph given by the successor lists `succ`
+# with Tarjan's algorithm. Iterative, so that deep graphs from untrusted modules cannot exhaust
+# the Python stack. Components are returned in reverse topological order.
+def strongly_connected_components(succ: List[List[int]]) -> List[List[int]]:
+    count = succ.__len__()
+    index = [-1] * count
+    lowlink = [0] * count
+    on_stack = [False] * count
+    stack = []
+    components = []
+    next_index = 0
+    for root in range(count):
+        if index[root] != -1:
+            continue
+        index[root] = lowlink[root] = next_index
+        next_index += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, iter(succ[root]))]
+        while work:
+            (v, children) = work[-1]
+            for w in children:
+                if index[w] == -1:
+                    index[w] = lowlink[w] = next_index
+                    next_index += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    work.append((w, iter(succ[w])))
+                    break
+                elif on_stack[w] and index[w] < lowlink[v]:
+                    lowlink[v] = index[w]
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    if lowlink[v] < lowlink[parent]:
+                        lowlink[parent] = lowlink[v]
+                if lowlink[v] == index[v]:
+                    component = []
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = False
+                        component.append(w)
+                        if w == v:
+                            break
+                    components.append(component)
+    return components
+
+
 @dataclass
 class InstantiationLoopChecker:
     module: CompiledModule
-    graph: digraph #Graph<Node, Edge>
-    # node_map: Mapping[Node, NodeIndex]
+    graph: Graph #Graph<Node, Edge>
     func_handle_def_map: Mapping[FunctionHandleIndex, FunctionDefinitionIndex]
 
     @classmethod
@@ -95,21 +170,7 @@ class InstantiationLoopChecker:
         for (def_idx, fdef) in enumerate(module.function_defs()):
             func_handle_def_map[fdef.function] = FunctionDefinitionIndex.new(def_idx)
 
-        return cls(module, digraph(), func_handle_def_map)
-
-
-    # Retrives the node corresponding to the specified type formal.
-    # If none exists in the graph yet, create one.
-    # def get_or_add_node(self, node: Node) -> NodeIndex {
-    #     match self.node_map.entry(node) {
-    #         hash_map.Entry.Occupied(entry) => *entry.get(),
-    #         hash_map.Entry.Vacant(entry) => {
-    #             idx = self.graph.add_node(node)
-    #             entry.insert(idx)
-    #             idx
-    #         }
-    #     }
-    # }
+        return cls(module, Graph(), func_handle_def_map)
 
     # Helper function that extracts type parameters from a given type.
     # Duplicated entries are removed.
@@ -144,16 +205,7 @@ class InstantiationLoopChecker:
     # Helper function that creates an edge from one given node to the other.
     # If a node does not exist, create one.
     def add_edge(self, node_from: Node, node_to: Node, edge: Edge):
-        if not self.graph.has_node(node_from):
-            self.graph.add_node(node_from)
-        if not self.graph.has_node(node_to):
-            self.graph.add_node(node_to)
-
-        if self.graph.has_edge((node_from, node_to)):
-            if edge.tag == Edge.TYCONAPP:
-                self.graph.add_edge_attributes((node_from, node_to), attrs = [('data',edge)])
-        else:
-            self.graph.add_edge((node_from, node_to), attrs = [('data',edge)])
+        self.graph.add_edge(node_from, node_to, edge)
 
 
     # Helper of 'def build_graph' that inspects a function call. If type parameters of the caller
@@ -219,22 +271,24 @@ class InstantiationLoopChecker:
     # contain at least one `TyConApp` edge. Such components indicate there exists a loop such
     # that an input type can get "bigger" infinitely many times along the loop, also creating
     # infinitely many types. This is precisely the kind of constructs we want to forbid.
+    #
+    # Components are reported ordered by their smallest node, with their nodes sorted, once for
+    # every `TyConApp` edge they contain.
     def find_non_trivial_components(self) -> List[Tuple[List[Node], List[EdgeInGraph]]]:
-        ma = mutual_accessibility(self.graph)
-        sccs = {tuple(x) for x in ma.values()}
+        graph = self.graph
+        succ = graph.succ
+        by_node = lambda v: graph.nodes[v]
+        sccs = [sorted(scc, key=by_node) for scc in strongly_connected_components([list(x) for x in succ])]
+        sccs.sort(key=lambda scc: graph.nodes[scc[0]])
         ret = []
-        for nodes in sccs:
-            edges = []
-            for node in nodes:
-                ns = self.graph.neighbors(node)
-                for n in ns:
-                    if n in nodes:
-                        edges.append((node, n))
-
-            for eg in edges:
-                edge: Edge = self.get_edge_data(eg)
-                if edge.tag == Edge.TYCONAPP:
-                    ret.append((nodes, edges))
+        for scc in sccs:
+            members = set(scc)
+            edges = [(v, w) for v in scc for w in succ[v] if w in members]
+            tycon_count = sum(1 for (v, w) in edges if succ[v][w].tag == Edge.TYCONAPP)
+            if tycon_count:
+                nodes = [graph.nodes[v] for v in scc]
+                edges = [(graph.nodes[v], graph.nodes[w]) for (v, w) in edges]
+                ret.extend([(nodes, edges)] * tycon_count)
         return ret
 
 
@@ -256,11 +310,7 @@ class InstantiationLoopChecker:
 
 
     def get_edge_data(self, eg: EdgeInGraph) -> Edge:
-        arr = self.graph.edge_attributes(eg)
-        for name, edge in arr:
-            if name =='data':
-                return edge
-        return None
+        return self.graph.edge_data(eg)
 
 
     def verify(self) -> List[VMStatus]:
@@ -22,7 +22,6 @@ from mol.vm.views import (
     )
 from typing import List, Any, Optional, Mapping, Set, Union
 from dataclasses import dataclass
-from copy import deepcopy
 from enum import IntEnum
 from libra.rustlib import assert_true, bail, usize, flatten
 
@@ -155,9 +154,9 @@ class TypeAndMemorySafetyAnalysis(AbstractInterpreter):
 
         fid = state.borrow_field(operand, mut_, field_definition_index)
         if fid is not None:
-            field_signature = deepcopy(self\
+            field_signature = self\
                 .module()\
-                .get_field_signature(field_definition_index).v0)
+                .get_field_signature(field_definition_index).v0
 
             field_token = field_signature\
                     .substitute(operand.signature.get_type_actuals_from_reference())
@@ -189,7 +188,7 @@ class TypeAndMemorySafetyAnalysis(AbstractInterpreter):
         mut_: bool,
         idx: LocalIndex,
     ):
-        loc_signature = deepcopy(self.locals_signature_view.token_at(idx).as_inner())
+        loc_signature = self.locals_signature_view.token_at(idx).as_inner()
 
         if loc_signature.is_reference():
             errors.append(err_at_offset(StatusCode.BORROWLOC_REFERENCE_ERROR, offset))
@@ -239,7 +238,7 @@ class TypeAndMemorySafetyAnalysis(AbstractInterpreter):
 
         type_actuals = self.module().locals_signature_at(type_actuals_idx).v0
         struct_type =\
-            signature_token_help.Struct(struct_definition.struct_handle, deepcopy(type_actuals))
+            signature_token_help.Struct(struct_definition.struct_handle, type_actuals)
 
         #TTODO: Maybe bug?
         SignatureTokenView.new(self.module(), struct_type).kind(self.type_formals())
@@ -430,7 +429,7 @@ class TypeAndMemorySafetyAnalysis(AbstractInterpreter):
             elif signature_view.is_reference():
                 rid = state.borrow_local_reference(idx)
                 self.stack.append(TypedAbstractValue(
-                    signature= deepcopy(signature_view.as_inner()),
+                    signature= signature_view.as_inner(),
                     value= AbstractValue.Reference(rid),
                 ))
             else:
@@ -440,7 +439,7 @@ class TypeAndMemorySafetyAnalysis(AbstractInterpreter):
                 elif kind == Kind.Unrestricted:
                     if not state.is_local_mutably_borrowed(idx):
                         self.stack.append(TypedAbstractValue(
-                            signature= deepcopy(signature_view.as_inner()),
+                            signature= signature_view.as_inner(),
                             value= AbstractValue.Value(Kind.Unrestricted),
                         ))
                     else:
@@ -451,7 +450,7 @@ class TypeAndMemorySafetyAnalysis(AbstractInterpreter):
 
         elif tag == Opcodes.MOVE_LOC:
             idx = bytecode.value
-            signature = deepcopy(self.locals_signature_view.token_at(idx).as_inner())
+            signature = self.locals_signature_view.token_at(idx).as_inner()
             if not state.is_available(idx):
                 errors.append(err_at_offset(StatusCode.MOVELOC_UNAVAILABLE_ERROR, offset))
             elif signature.is_reference() or not state.is_local_borrowed(idx):
@@ -538,7 +537,7 @@ class TypeAndMemorySafetyAnalysis(AbstractInterpreter):
             struct_definition = self.module().struct_def_at(idx)
             type_actuals = self.module().locals_signature_at(type_actuals_idx).v0
             struct_type = signature_token_help.Struct(
-                struct_definition.struct_handle, deepcopy(type_actuals))
+                struct_definition.struct_handle, type_actuals)
             kind = SignatureTokenView.new(
                 self.module(), struct_type).kind(self.type_formals())
 
@@ -574,7 +573,7 @@ class TypeAndMemorySafetyAnalysis(AbstractInterpreter):
             struct_definition = self.module().struct_def_at(idx)
             type_actuals = self.module().locals_signature_at(type_actuals_idx).v0
             struct_type = signature_token_help.Struct(
-                struct_definition.struct_handle, deepcopy(type_actuals))
+                struct_definition.struct_handle, type_actuals)
 
             # Pop an abstract value from the stack and check if its type is equal to the one
             # declared. TODO: is it safe to not call verify the kinds if the types are equal
@@ -866,7 +865,7 @@ class TypeAndMemorySafetyAnalysis(AbstractInterpreter):
 
             type_actuals = self.module().locals_signature_at(type_actuals_idx).v0
             struct_type =signature_token_help.Struct(
-                struct_definition.struct_handle, deepcopy(type_actuals))
+                struct_definition.struct_handle, type_actuals)
 
             #TTODO
             SignatureTokenView.new(self.module(), struct_type).kind(self.type_formals())
@@ -908,7 +907,7 @@ class TypeAndMemorySafetyAnalysis(AbstractInterpreter):
 
             type_actuals = self.module().locals_signature_at(type_actuals_idx).v0
             struct_type = signature_token_help.Struct(
-                struct_definition.struct_handle, deepcopy(type_actuals))
+                struct_definition.struct_handle, type_actuals)
 
             #TTODO
             SignatureTokenView.new(self.module(), struct_type).kind(self.type_formals())
@@ -938,7 +937,7 @@ class TypeAndMemorySafetyAnalysis(AbstractInterpreter):
 
             type_actuals = self.module().locals_signature_at(type_actuals_idx).v0
             struct_type =signature_token_help.Struct(
-                struct_definition.struct_handle, deepcopy(type_actuals))
+                struct_definition.struct_handle, type_actuals)
             #TTODO
             SignatureTokenView.new(self.module(), struct_type).kind(self.type_formals())
 
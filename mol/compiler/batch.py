@@ -0,0 +1,422 @@
+from __future__ import annotations
+from mol.bytecode_verifier import VerifiedModule, VerifiedScript, VerifyException
+from mol.bytecode_verifier.verifier import verify_module_dependencies, verify_script_dependencies
+from mol.compiler.compile_cache import CompileCache, compile_with_cache, compiler_version
+from mol.compiler.ir_to_bytecode.parser import parse_script_or_module
+from mol.move_ir.types import ast
+from mol.stdlib import stdlib_modules
+from mol.vm.file_format import CompiledModule
+from libra.hasher import HashValue
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Mapping, Optional, Set, Tuple
+import json
+
+# Batch mode of the IR compiler: compiles a tree of `.mvir` sources, given as a directory or as a
+# JSON manifest listing the sources relative to it.
+#
+# The import graph is built from the `get_external_deps()` of every source. Modules are compiled
+# once all the modules of the batch they import are, on a process pool, and verified against the
+# stdlib and their (transitive) dependencies from the batch. Scripts are compiled like modules
+# nothing depends on. Every source gets a `.mv` and a `.mvsm` output.
+#
+# The build is incremental. A build state file in the output directory records, for every source,
+# the hash of its text, its module name and imports, and the hashes of its output and of the
+# outputs of its dependencies. A source whose text and dependencies did not change is not parsed
+# nor compiled again, its existing output is used as is.
+
+BUILD_STATE_FILE = ".mvir-build.json"
+
+
+@dataclass
+class SourceUnit:
+    path: Path
+    # The path relative to the root of the batch, which identifies the unit in the build state.
+    rel: str
+    source: str
+    source_hash: str
+    # The module name, None for a script.
+    name: Optional[str] = None
+    # The names of the modules imported from the address of the batch.
+    imports: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+    def is_script(self) -> bool:
+        return self.name is None
+
+
+@dataclass
+class JobResult:
+    binary: Optional[bytes] = None
+    source_map: Optional[bytes] = None
+    errors: List[str] = field(default_factory=list)
+
+
+@dataclass
+class BatchReport:
+    compiled: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    failed: Mapping[str, List[str]] = field(default_factory=dict)
+
+    def summary(self) -> str:
+        return "compiled {}, up to date {}, failed {}".format(
+            len(self.compiled), len(self.skipped), len(self.failed))
+
+
+# Runs the jobs in the calling process, for `jobs == 1`.
+class InlineExecutor(Executor):
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as err:
+            future.set_exception(err)
+        return future
+
+
+def hash_hex(data: bytes) -> str:
+    return HashValue.from_sha3_256(data).hex()
+
+
+# Return the root of the batch and its sources.
+def collect_sources(target: Path) -> Tuple[Path, List[Path]]:
+    if target.is_dir():
+        return (target, sorted(target.glob("**/*.mvir")))
+    root = target.parent
+    return (root, [root / path for path in json.loads(target.read_text())])
+
+
+def load_unit(root: Path, path: Path) -> SourceUnit:
+    source = path.read_text()
+    return SourceUnit(
+        path,
+        path.relative_to(root).as_posix(),
+        source,
+        hash_hex(source.encode()),
+    )
+
+
+# Parse the source for its module name and imports. Runs in a worker.
+def scan_source(path: str, source: str, address: bytes) -> Tuple[Optional[str], List[str]]:
+    sorm = parse_script_or_module(path, source)
+    imports = sorted(
+        str(dep.name) for dep in sorm.value.get_external_deps() if bytes(dep.address) == address
+    )
+    if sorm.tag == ast.ScriptOrModule.SCRIPT:
+        return (None, imports)
+    else:
+        return (str(sorm.value.name), imports)
+
+
+# The modules of the batch already deserialized by this process, by hash.
+LOADED_DEPS: Mapping[str, VerifiedModule] = {}
+
+
+def load_dep(binary: bytes, verify: bool) -> VerifiedModule:
+    key = hash_hex(binary)
+    ret = LOADED_DEPS.get(key)
+    if ret is None:
+        module = CompiledModule.deserialize(binary)
+        if verify:
+            ret = VerifiedModule.new(module)
+        else:
+            ret = VerifiedModule.bypass_verifier_DANGEROUS_FOR_TESTING_ONLY(module)
+        LOADED_DEPS[key] = ret
+    return ret
+
+
+# Compile and verify one source against `dep_binaries`, the modules of the batch it depends on in
+# dependency order. Runs in a worker.
+def compile_job(
+    path: str,
+    source: str,
+    address: bytes,
+    dep_binaries: List[bytes],
+    use_stdlib: bool,
+    verify: bool,
+    cache_dir: Optional[str],
+    optimize: bool = False,
+    inline: bool = False,
+) -> JobResult:
+    try:
+        deps = list(stdlib_modules()) if use_stdlib else []
+        deps.extend(load_dep(binary, verify) for binary in dep_binaries)
+        cache = CompileCache.new(cache_dir) if cache_dir else None
+        unit = compile_with_cache(cache, path, source, address, deps, optimize, inline)
+        errors = []
+        if verify and unit.is_script():
+            errors = verify_script_dependencies(VerifiedScript.new(unit.script), deps)
+        elif verify:
+            errors = verify_module_dependencies(VerifiedModule.new(unit.module), deps)
+        if errors:
+            return JobResult(errors=[str(e) for e in errors])
+        return JobResult(unit.serialize(), unit.source_map.serialize())
+    except VerifyException as err:
+        return JobResult(errors=[str(e) for e in err.vm_status])
+    except Exception as err:
+        return JobResult(errors=[f"{type(err).__name__}: {err}"])
+
+
+# Return the units of the batch each unit imports. Imports of modules not in the batch are left to
+# the compiler, which looks them up in the stdlib.
+def dependency_graph(units: List[SourceUnit]) -> Mapping[str, List[str]]:
+    modules = {}
+    for unit in units:
+        if unit.name is None:
+            continue
+        if unit.name in modules:
+            raise ValueError(f"module {unit.name} is defined in {modules[unit.name]} and {unit.rel}")
+        modules[unit.name] = unit.rel
+    return {
+        unit.rel: [modules[name] for name in unit.imports if name in modules] for unit in units
+    }
+
+
+# Order the units so that every unit comes after the units it imports.
+def topological_order(graph: Mapping[str, List[str]]) -> List[str]:
+    order = []
+    state = {}
+    for root in sorted(graph):
+        if root in state:
+            continue
+        state[root] = 1
+        stack = [(root, iter(graph[root]))]
+        while stack:
+            (node, deps) = stack[-1]
+            dep = next(deps, None)
+            if dep is None:
+                stack.pop()
+                state[node] = 2
+                order.append(node)
+            elif dep not in state:
+                state[dep] = 1
+                stack.append((dep, iter(graph[dep])))
+            elif state[dep] == 1:
+                cycle = [n for (n, _) in stack]
+                cycle = cycle[cycle.index(dep):]
+                raise ValueError("cyclic module dependencies: " + " -> ".join(cycle + [dep]))
+    return order
+
+
+def transitive_deps(rel: str, graph: Mapping[str, List[str]], order: List[str]) -> List[str]:
+    seen: Set[str] = set()
+    stack = list(graph[rel])
+    while stack:
+        dep = stack.pop()
+        if dep not in seen:
+            seen.add(dep)
+            stack.extend(graph[dep])
+    return [x for x in order if x in seen]
+
+
+@dataclass
+class BatchCompiler:
+    root: Path
+    out_dir: Path
+    address: bytes
+    jobs: int = 1
+    use_stdlib: bool = True
+    verify: bool = True
+    cache_dir: Optional[str] = None
+    optimize: bool = False
+    inline: bool = False
+
+    def output_path(self, rel: str, suffix: str) -> Path:
+        return (self.out_dir / rel).with_suffix(suffix)
+
+
+    def load_state(self) -> dict:
+        path = self.out_dir / BUILD_STATE_FILE
+        state = None
+        if path.exists():
+            try:
+                state = json.loads(path.read_text())
+            except ValueError:
+                state = None
+        if (state is None
+                or state.get("compiler") != compiler_version().hex()
+                or state.get("address") != self.address.hex()
+                or state.get("stdlib") != self.use_stdlib
+                or state.get("verify") != self.verify
+                or state.get("optimize") != self.optimize
+                or state.get("inline") != self.inline):
+            state = {"units": {}}
+        state.update({
+            "compiler": compiler_version().hex(),
+            "address": self.address.hex(),
+            "stdlib": self.use_stdlib,
+            "verify": self.verify,
+            "optimize": self.optimize,
+            "inline": self.inline,
+        })
+        return state
+
+
+    def save_state(self, state: dict) -> None:
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        path = self.out_dir / BUILD_STATE_FILE
+        path.write_text(json.dumps(state, indent=2, sort_keys=True))
+
+
+    # Fill in the name and imports of the units, from the build state for the ones that did not
+    # change and by parsing the others.
+    def scan(self, executor: Executor, units: List[SourceUnit], state: dict) -> None:
+        futures = {}
+        for unit in units:
+            entry = state["units"].get(unit.rel)
+            if entry is not None and entry["source"] == unit.source_hash:
+                unit.name = entry["name"]
+                unit.imports = entry["imports"]
+            else:
+                futures[unit.rel] = executor.submit(
+                    scan_source, str(unit.path), unit.source, self.address)
+        for unit in units:
+            future = futures.get(unit.rel)
+            if future is None:
+                continue
+            try:
+                (unit.name, unit.imports) = future.result()
+            except Exception as err:
+                unit.error = f"{type(err).__name__}: {err}"
+
+
+    # Return the output of `unit` if it is up to date, given the current outputs of the units.
+    def up_to_date(
+        self,
+        unit: SourceUnit,
+        deps: List[str],
+        outputs: Mapping[str, bytes],
+        state: dict,
+    ) -> Optional[bytes]:
+        entry = state["units"].get(unit.rel)
+        if entry is None or entry["source"] != unit.source_hash:
+            return None
+        if entry["deps"] != {dep: hash_hex(outputs[dep]) for dep in deps}:
+            return None
+        path = self.output_path(unit.rel, ".mv")
+        if not path.exists() or not self.output_path(unit.rel, ".mvsm").exists():
+            return None
+        binary = path.read_bytes()
+        if hash_hex(binary) != entry["output"]:
+            return None
+        return binary
+
+
+    def write_outputs(self, unit: SourceUnit, result: JobResult) -> None:
+        path = self.output_path(unit.rel, ".mv")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(result.binary)
+        self.output_path(unit.rel, ".mvsm").write_bytes(result.source_map)
+
+
+    def run(self, sources: List[Path]) -> BatchReport:
+        report = BatchReport()
+        state = self.load_state()
+        units = [load_unit(self.root, path) for path in sources]
+        by_rel = {unit.rel: unit for unit in units}
+        if self.jobs > 1:
+            executor = ProcessPoolExecutor(self.jobs)
+        else:
+            executor = InlineExecutor()
+        with executor:
+            self.scan(executor, units, state)
+            for unit in units:
+                if unit.error is not None:
+                    report.failed[unit.rel] = [unit.error]
+            units = [unit for unit in units if unit.error is None]
+            graph = dependency_graph(units)
+            order = topological_order(graph)
+            all_deps = {rel: transitive_deps(rel, graph, order) for rel in order}
+
+            outputs: Mapping[str, bytes] = {}
+            new_units = {}
+            waiting = {rel: set(graph[rel]) for rel in order}
+            dependents = {rel: [] for rel in order}
+            for rel in order:
+                for dep in graph[rel]:
+                    dependents[dep].append(rel)
+            ready = [rel for rel in order if not waiting[rel]]
+            running = {}
+
+            # Called when `rel` is done, successfully or not.
+            def finish(rel: str, binary: Optional[bytes]) -> None:
+                if binary is not None:
+                    outputs[rel] = binary
+                for dependent in dependents[rel]:
+                    if binary is None and dependent not in report.failed:
+                        report.failed[dependent] = [f"dependency {rel} failed"]
+                    waiting[dependent].discard(rel)
+                    if not waiting[dependent]:
+                        ready.append(dependent)
+
+            while ready or running:
+                while ready:
+                    rel = ready.pop(0)
+                    unit = by_rel[rel]
+                    if rel in report.failed:
+                        finish(rel, None)
+                        continue
+                    binary = self.up_to_date(unit, all_deps[rel], outputs, state)
+                    if binary is not None:
+                        report.skipped.append(rel)
+                        new_units[rel] = state["units"][rel]
+                        finish(rel, binary)
+                        continue
+                    future = executor.submit(
+                        compile_job,
+                        str(unit.path),
+                        unit.source,
+                        self.address,
+                        [outputs[dep] for dep in all_deps[rel]],
+                        self.use_stdlib,
+                        self.verify,
+                        self.cache_dir,
+                        self.optimize,
+                        self.inline,
+                    )
+                    running[future] = rel
+                if not running:
+                    break
+                (done, _) = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    rel = running.pop(future)
+                    unit = by_rel[rel]
+                    result = future.result()
+                    if result.errors:
+                        report.failed[rel] = result.errors
+                        finish(rel, None)
+                        continue
+                    self.write_outputs(unit, result)
+                    report.compiled.append(rel)
+                    new_units[rel] = {
+                        "source": unit.source_hash,
+                        "name": unit.name,
+                        "imports": unit.imports,
+                        "deps": {dep: hash_hex(outputs[dep]) for dep in all_deps[rel]},
+                        "output": hash_hex(result.binary),
+                    }
+                    finish(rel, result.binary)
+
+        state["units"] = new_units
+        self.save_state(state)
+        return report
+
+
+def compile_batch(
+    target: str,
+    address: bytes,
+    jobs: int = 1,
+    out_dir: Optional[str] = None,
+    use_stdlib: bool = True,
+    verify: bool = True,
+    cache_dir: Optional[str] = None,
+    optimize: bool = False,
+    inline: bool = False,
+) -> BatchReport:
+    (root, sources) = collect_sources(Path(target))
+    out_dir = Path(out_dir) if out_dir else root
+    compiler = BatchCompiler(
+        root, out_dir, bytes(address), jobs, use_stdlib, verify, cache_dir, optimize, inline,
+    )
+    return compiler.run(sources)
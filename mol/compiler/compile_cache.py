@@ -0,0 +1,205 @@
+from __future__ import annotations
+from mol.compiler.bytecode_source_map.source_map import SourceMap
+from mol.compiler.ir_to_bytecode.compiler import compile_module, compile_script
+from mol.compiler.ir_to_bytecode.parser import parse_script_or_module
+from mol.libra_vm.version import version
+from mol.move_ir.types import ast
+from mol.vm.file_format import CompiledModule, CompiledScript, ModuleAccess
+from libra.account_address import Address
+from libra.hasher import new_sha3_256
+from libra.rustlib import format_str
+from canoser import Struct
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, List, Optional
+import os
+import tempfile
+
+# A content-addressed, on-disk cache for the IR compiler.
+#
+# An entry is keyed by the hash of everything the output of the compiler depends on: the source
+# text and the file name it is compiled under (the source map records it), the sender address,
+# the hashes of the dependency modules in order, whether the inliner and the optimizer run, and
+# the compiler version. It stores the compiled bytes and the serialized `SourceMap`, so a hit
+# skips parsing and compiling entirely.
+#
+# Entries are written to a temporary file which is then renamed, so several processes may share
+# a cache directory.
+
+
+# The version of the compiler, for cache keys. Besides the package version, this hashes the
+# sources of the compiler and of the serializers it depends on, so that entries written by a
+# different compiler are never used.
+@lru_cache(maxsize=None)
+def compiler_version() -> bytes:
+    mol_dir = Path(__file__).resolve().parent.parent
+    files = sorted((mol_dir / "compiler" / "ir_to_bytecode").glob("**/*.py"))
+    files.append(mol_dir / "compiler" / "bytecode_source_map" / "source_map.py")
+    files.append(mol_dir / "vm" / "serializer.py")
+    sha3 = new_sha3_256()
+    sha3.update(version.encode())
+    for file in files:
+        sha3.update(file.relative_to(mol_dir).as_posix().encode())
+        sha3.update(file.read_bytes())
+    return sha3.digest()
+
+
+# The on-disk format of a cache entry.
+class CacheEntry(Struct):
+    _fields = [
+        ('is_script', bool),
+        ('compiled', bytes),
+        ('source_map', bytes),
+        # The parsed source as displayed by the compiler log.
+        ('parsed', str),
+    ]
+
+
+# The result of compiling a source, whether it comes from the cache or not.
+@dataclass
+class CompiledUnit:
+    script: Optional[CompiledScript]
+    module: Optional[CompiledModule]
+    source_map: SourceMap
+    parsed: str
+    cache_hit: bool = False
+
+    def is_script(self) -> bool:
+        return self.script is not None
+
+    def serialize(self) -> bytes:
+        if self.script is not None:
+            return self.script.serialize()
+        else:
+            return self.module.serialize()
+
+
+@dataclass
+class CompileCache:
+    root: Path
+    hits: int = 0
+    misses: int = 0
+
+    @classmethod
+    def new(cls, root: str) -> CompileCache:
+        root = Path(root)
+        root.mkdir(parents=True, exist_ok=True)
+        return cls(root)
+
+
+    # Return the cache key of compiling `source` as `file_name`, as a hex string.
+    def key(
+        self,
+        file_name: str,
+        source: str,
+        address: Address,
+        deps: List[ModuleAccess],
+        optimize: bool = False,
+        inline: bool = False,
+    ) -> str:
+        sha3 = new_sha3_256()
+        sha3.update(compiler_version())
+        sha3.update(bytes([optimize, inline]))
+        for part in [file_name.encode(), source.encode(), bytes(address)]:
+            sha3.update(len(part).to_bytes(8, "little"))
+            sha3.update(part)
+        for dep in deps:
+            sha3.update(dep.as_module().hash_value())
+        return sha3.hexdigest()
+
+
+    def path(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+
+    def get(self, key: str) -> Optional[CompiledUnit]:
+        path = self.path(key)
+        try:
+            entry = CacheEntry.deserialize(path.read_bytes())
+            source_map = SourceMap.deserialize(entry.source_map)
+            if entry.is_script:
+                script = CompiledScript.deserialize(entry.compiled)
+                return CompiledUnit(script, None, source_map, entry.parsed, True)
+            else:
+                module = CompiledModule.deserialize(entry.compiled)
+                return CompiledUnit(None, module, source_map, entry.parsed, True)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # A corrupted entry is a miss, it is overwritten by the next `put`.
+            return None
+
+
+    def put(self, key: str, unit: CompiledUnit) -> None:
+        entry = CacheEntry(
+            unit.is_script(),
+            unit.serialize(),
+            unit.source_map.serialize(),
+            unit.parsed,
+        )
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        (fd, tmp) = tempfile.mkstemp(dir=path.parent, prefix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(entry.serialize())
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+    # Compile `source`, using the cached output when there is one.
+    def compile(
+        self,
+        file_name: str,
+        source: str,
+        address: Address,
+        deps: List[ModuleAccess],
+        optimize: bool = False,
+        inline: bool = False,
+    ) -> CompiledUnit:
+        key = self.key(file_name, source, address, deps, optimize, inline)
+        unit = self.get(key)
+        if unit is not None:
+            self.hits += 1
+            return unit
+        self.misses += 1
+        unit = compile_source(file_name, source, address, deps, optimize, inline)
+        self.put(key, unit)
+        return unit
+
+
+# Parse and compile `source` without a cache.
+def compile_source(
+    file_name: str,
+    source: str,
+    address: Address,
+    deps: List[ModuleAccess],
+    optimize: bool = False,
+    inline: bool = False,
+) -> CompiledUnit:
+    sorm = parse_script_or_module(file_name, source)
+    parsed = format_str("{}", sorm.value)
+    if sorm.tag == ast.ScriptOrModule.SCRIPT:
+        (script, source_map) = compile_script(address, sorm.value, deps, optimize)
+        return CompiledUnit(script, None, source_map, parsed)
+    else:
+        (module, source_map) = compile_module(address, sorm.value, deps, optimize, inline)
+        return CompiledUnit(None, module, source_map, parsed)
+
+
+# Compile `source` through `cache` if there is one.
+def compile_with_cache(
+    cache: Optional[CompileCache],
+    file_name: str,
+    source: str,
+    address: Address,
+    deps: List[ModuleAccess],
+    optimize: bool = False,
+    inline: bool = False,
+) -> CompiledUnit:
+    if cache is None:
+        return compile_source(file_name, source, address, deps, optimize, inline)
+    return cache.compile(file_name, source, address, deps, optimize, inline)
@@ -1,6 +1,8 @@
 from __future__ import annotations
 from mol.compiler.ir_to_bytecode.context import Context, MaterializedPools, TABLE_MAX_SIZE
 from mol.compiler.ir_to_bytecode.errors import *
+from mol.compiler.ir_to_bytecode.inliner import inline_module
+from mol.compiler.ir_to_bytecode.optimizer import optimize_module, optimize_script
 from mol.compiler.bytecode_source_map.source_map import SourceMap
 from libra.account_address import Address
 from mol.move_ir.types import ast
@@ -324,11 +326,12 @@ class FunctionFrame:
             bail("Impossible: failed to get loop breaks (no loops in stack)")
 
 
-# Compile a transaction script.
+# Compile a transaction script. With `optimize`, the code is rewritten by the peephole optimizer.
 def compile_script(
     address: Address,
     script: Script,
     dependencies: List[ModuleAccess],
+    optimize: bool = False,
 ) -> Tuple[CompiledScript, SourceMap]:
     current_module = QualifiedModuleIdent(
         address = address,
@@ -364,17 +367,22 @@ def compile_script(
         mpools.address_pool,
         main,
     )
+    if optimize:
+        optimize_script(compiled_script, source_map)
     try:
         return (compiled_script.freeze(), source_map)
     except VMException as err:
         raise BoundsCheckErrors(err.vm_status)
 
 
-# Compile a module.
+# Compile a module. With `inline`, the small private functions are inlined into their callers, and
+# with `optimize`, the code is rewritten by the peephole optimizer.
 def compile_module(
     address: Address,
     module: ModuleDefinition,
     dependencies: List[ModuleAccess],
+    optimize: bool = False,
+    inline: bool = False,
 ) -> Tuple[CompiledModule, SourceMap]:
     current_module = QualifiedModuleIdent(
         address = address,
@@ -425,6 +433,10 @@ def compile_module(
         field_defs,
         function_defs,
     )
+    if inline:
+        inline_module(compiled_module, source_map)
+    if optimize:
+        optimize_module(compiled_module, source_map)
     return (compiled_module.freeze(), source_map)
 
 
@@ -13,6 +13,7 @@ from mol.vm.file_format import (
     )
 from mol.vm import signature_token_help
 from typing import List, Optional, Tuple, Mapping
+from collections import OrderedDict
 from dataclasses import dataclass
 from libra.rustlib import bail, ensure, usize
 from canoser import Uint16
@@ -92,6 +93,22 @@ class CompiledDependency:
         )
 
 
+    # Returns the `CompiledDependency` for `dep`, shared with the other compilations against a
+    # module with the same hash.
+    @classmethod
+    def cached(cls, dep: ModuleAccess) -> CompiledDependency:
+        key = dep.as_module().hash_value()
+        ret = DEPENDENCY_CACHE.get(key)
+        if ret is None:
+            ret = cls.new(dep)
+            DEPENDENCY_CACHE[key] = ret
+            if len(DEPENDENCY_CACHE) > DEPENDENCY_CACHE_SIZE:
+                DEPENDENCY_CACHE.popitem(last=False)
+        else:
+            DEPENDENCY_CACHE.move_to_end(key)
+        return ret
+
+
     def source_struct_info(
         self,
         idx: StructHandleIndex,
@@ -150,13 +167,23 @@ class MaterializedPools:
     address_pool: List[Address]
 
 
+# The `CompiledDependency` of the modules compiled against, by module hash, least recently used
+# first. The same modules (the stdlib, the modules published so far) are the dependencies of
+# many compilations, and building a `CompiledDependency` scans all of the module's handles.
+DEPENDENCY_CACHE_SIZE = 1024
+DEPENDENCY_CACHE: Mapping[bytes, CompiledDependency] = OrderedDict()
+
+
 # Compilation context for a single compilation unit (module or script).
 # Contains all of the pools as they are built up.
 # Specific definitions to CompiledModule or CompiledScript are not stored.
 # However, some fields, like struct_defs and fields, are not used in CompiledScript.
 @dataclass
 class Context(JsonPrintable):
-    dependencies: Mapping[QualifiedModuleIdent, CompiledDependency]
+    # The modules that can be imported, their `CompiledDependency` is only looked up once they
+    # are used.
+    dependencies: Mapping[QualifiedModuleIdent, ModuleAccess]
+    compiled_dependencies: Mapping[QualifiedModuleIdent, CompiledDependency]
 
     # helpers
     aliases: Mapping[QualifiedModuleIdent, ModuleName]
@@ -198,12 +225,12 @@ class Context(JsonPrintable):
         current_module: QualifiedModuleIdent,
     ) -> Context:
         dependencies = {
-            QualifiedModuleIdent(dep.name(), dep.address()) : CompiledDependency.new(dep) \
-            for dep in dependencies_iter
+            QualifiedModuleIdent(dep.name(), dep.address()) : dep for dep in dependencies_iter
         }
 
         context = cls(
             dependencies= dependencies,
+            compiled_dependencies= {},
             aliases= {},
             modules= {},
             structs= {},
@@ -524,9 +551,13 @@ class Context(JsonPrintable):
     #**********************************************************************************************
 
     def dependency(self, m: QualifiedModuleIdent) -> CompiledDependency:
-        ret = self.dependencies.get(m)
+        ret = self.compiled_dependencies.get(m)
         if ret is None:
-            bail("Dependency not provided for {}", m)
+            dep = self.dependencies.get(m)
+            if dep is None:
+                bail("Dependency not provided for {}", m)
+            ret = CompiledDependency.cached(dep)
+            self.compiled_dependencies[m] = ret
         return ret
 
 
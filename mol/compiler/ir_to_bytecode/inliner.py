@@ -0,0 +1,337 @@
+from __future__ import annotations
+from mol.bytecode_verifier.code_unit_verifier import CodeUnitVerifier
+from mol.compiler.bytecode_source_map.source_map import SourceMap
+from mol.compiler.ir_to_bytecode.optimizer import code_locations, set_code_locations
+from mol.move_ir.types.location import Loc
+from mol.vm.file_format import (
+        Bytecode, CompiledModule, CompiledModuleMut, FunctionDefinition, LocalsSignature, LocalsSignatureIndex,
+        Opcodes, SignatureToken,
+    )
+from mol.vm import VMException
+from canoser import Uint8
+from typing import List, Mapping, Optional, Set, Tuple
+from dataclasses import dataclass
+from copy import deepcopy
+
+# Inlining of small functions for the IR compiler.
+#
+# A call to a private, non-generic, non-recursive function of the same module whose body is at
+# most `INLINE_SIZE_THRESHOLD` instructions is replaced by the body of the callee. The callee gets
+# its own range of locals in the caller: the arguments are stored to its parameters, its locals
+# are renumbered, and each `RET` stores the return values to fresh locals and branches to the end
+# of the inlined code, where they are pushed back. A callee with a single `RET` at the end leaves
+# its return values on the stack instead.
+#
+# The inlined instructions keep the source locations of the callee, and its locals are named
+# `callee.local` in the caller, so the source map still points at the code being run. The callee
+# itself is kept.
+#
+# A caller is only rewritten if it verifies both before and after inlining, otherwise its code is
+# left as is: the verifier also rejects inlined code which does not fit the caller, for example a
+# callee with branches called while the caller has values on the stack.
+
+INLINE_SIZE_THRESHOLD = 16
+
+# Instructions whose operand is a local index.
+LOCAL_INSTRUCTIONS = {
+    Opcodes.COPY_LOC, Opcodes.MOVE_LOC, Opcodes.ST_LOC, Opcodes.MUT_BORROW_LOC,
+    Opcodes.IMM_BORROW_LOC,
+}
+
+BRANCHES = {Opcodes.BR_TRUE, Opcodes.BR_FALSE, Opcodes.BRANCH}
+
+
+# What is needed to inline a function.
+@dataclass
+class Inlinee:
+    name: str
+    code: List[Bytecode]
+    locals: List[SignatureToken]
+    arg_count: int
+    return_types: List[SignatureToken]
+    locations: List[Optional[Loc]]
+    local_names: List[Tuple[str, Loc]]
+
+    # Whether the only `RET` is the last instruction, in which case no branch is needed.
+    def returns_at_end(self) -> bool:
+        rets = [instr for instr in self.code if instr.tag == Opcodes.RET]
+        return len(rets) == 1 and self.code[-1].tag == Opcodes.RET
+
+
+def function_name(module: CompiledModuleMut, function_def: FunctionDefinition) -> str:
+    handle = module.function_handles[function_def.function.v0]
+    return module.identifiers[handle.name.v0]
+
+
+# Return the function definition called by `instr`, if it is a call to a function of `module`.
+def called_definition(instr: Bytecode, definitions: Mapping[int, int]) -> Optional[int]:
+    if instr.tag != Opcodes.CALL:
+        return None
+    (handle, _) = instr.value
+    return definitions.get(handle.v0)
+
+
+def call_graph(module: CompiledModuleMut) -> Mapping[int, Set[int]]:
+    definitions = {fdef.function.v0: idx for (idx, fdef) in enumerate(module.function_defs)}
+    graph = {}
+    for (idx, fdef) in enumerate(module.function_defs):
+        callees = set()
+        if not fdef.is_native():
+            for instr in fdef.code.code:
+                callee = called_definition(instr, definitions)
+                if callee is not None:
+                    callees.add(callee)
+        graph[idx] = callees
+    return graph
+
+
+def is_recursive(idx: int, graph: Mapping[int, Set[int]]) -> bool:
+    seen = set()
+    stack = list(graph[idx])
+    while stack:
+        node = stack.pop()
+        if node == idx:
+            return True
+        if node not in seen:
+            seen.add(node)
+            stack.extend(graph[node])
+    return False
+
+
+def has_branch_out_of_bounds(code: List[Bytecode]) -> bool:
+    return any(instr.tag in BRANCHES and instr.value >= len(code) for instr in code)
+
+
+# Return the function definitions of `module` ordered so that callees come before their callers,
+# except in cycles.
+def callees_first(graph: Mapping[int, Set[int]]) -> List[int]:
+    order = []
+    visited = set()
+    for root in graph:
+        if root in visited:
+            continue
+        visited.add(root)
+        stack = [(root, iter(sorted(graph[root])))]
+        while stack:
+            (node, callees) = stack[-1]
+            callee = next(callees, None)
+            if callee is None:
+                stack.pop()
+                order.append(node)
+            elif callee not in visited:
+                visited.add(callee)
+                stack.append((callee, iter(sorted(graph[callee]))))
+    return order
+
+
+# Return what is needed to inline the function at `idx`, or None if it cannot be inlined.
+def inlinee(
+    module: CompiledModuleMut,
+    source_map: SourceMap,
+    graph: Mapping[int, Set[int]],
+    idx: int,
+) -> Optional[Inlinee]:
+    fdef = module.function_defs[idx]
+    function_map = source_map.function_map.get(idx)
+    code = fdef.code.code
+    if (fdef.is_public() or function_map is None or len(code) > INLINE_SIZE_THRESHOLD
+            or has_branch_out_of_bounds(code)):
+        return None
+    handle = module.function_handles[fdef.function.v0]
+    signature = module.function_signatures[handle.signature.v0]
+    if signature.type_formals or is_recursive(idx, graph):
+        return None
+    return Inlinee(
+        name=function_name(module, fdef),
+        code=code,
+        locals=module.locals_signatures[fdef.code.locals.v0].v0,
+        arg_count=len(signature.arg_types),
+        return_types=signature.return_types,
+        locations=code_locations(function_map, len(code)),
+        local_names=list(function_map.locls),
+    )
+
+
+# Inline `inlinees` into `code`, whose locals are `locals`. Returns the new code, the location of
+# each of its instructions, the names of the new locals, and for each offset of `code` (and its
+# end) its offset in the new code. `locals` is extended in place.
+def inline_calls(
+    code: List[Bytecode],
+    locations: List[Optional[Loc]],
+    locals: List[SignatureToken],
+    inlinees: Mapping[int, Inlinee],
+    definitions: Mapping[int, int],
+) -> Tuple[List[Bytecode], List[Optional[Loc]], List[Tuple[str, Loc]], List[int]]:
+    new_code = []
+    new_locations = []
+    local_names = []
+    offsets = []
+    # The branches of `code`, whose targets are remapped once all of it is emitted.
+    branches = []
+
+    def emit(instr: Bytecode, loc: Optional[Loc]) -> None:
+        new_code.append(instr)
+        new_locations.append(loc)
+
+    for (offset, instr) in enumerate(code):
+        offsets.append(len(new_code))
+        loc = locations[offset]
+        inlinee = inlinees.get(called_definition(instr, definitions))
+        returns_at_end = inlinee is not None and inlinee.returns_at_end()
+        if inlinee is not None:
+            temp_count = 0 if returns_at_end else len(inlinee.return_types)
+            if len(locals) + len(inlinee.locals) + temp_count > Uint8.max_value:
+                inlinee = None
+        if inlinee is None:
+            if instr.tag in BRANCHES:
+                branches.append(len(new_code))
+            emit(instr, loc)
+            continue
+
+        base = len(locals)
+        locals.extend(inlinee.locals)
+        for (name, name_loc) in inlinee.local_names:
+            local_names.append((f"{inlinee.name}.{name}", name_loc))
+        temps = []
+        if not returns_at_end:
+            temps = list(range(len(locals), len(locals) + len(inlinee.return_types)))
+            locals.extend(inlinee.return_types)
+            for k in range(len(temps)):
+                local_names.append((f"{inlinee.name}.ret{k}", loc))
+
+        for k in reversed(range(inlinee.arg_count)):
+            emit(Bytecode(Opcodes.ST_LOC, base + k), loc)
+
+        # The offset in the new code of each instruction of the callee, and of its end.
+        start = len(new_code)
+        callee_offsets = []
+        size = 0
+        for (k, callee_instr) in enumerate(inlinee.code):
+            callee_offsets.append(start + size)
+            if callee_instr.tag != Opcodes.RET:
+                size += 1
+            elif not returns_at_end:
+                size += len(temps) + (0 if k == len(inlinee.code) - 1 else 1)
+        end = start + size
+
+        for (k, callee_instr) in enumerate(inlinee.code):
+            callee_loc = inlinee.locations[k]
+            if callee_instr.tag in LOCAL_INSTRUCTIONS:
+                emit(Bytecode(callee_instr.tag, base + callee_instr.value), callee_loc)
+            elif callee_instr.tag in BRANCHES:
+                emit(Bytecode(callee_instr.tag, callee_offsets[callee_instr.value]), callee_loc)
+            elif callee_instr.tag != Opcodes.RET:
+                emit(callee_instr, callee_loc)
+            elif not returns_at_end:
+                for temp in reversed(temps):
+                    emit(Bytecode(Opcodes.ST_LOC, temp), callee_loc)
+                if k != len(inlinee.code) - 1:
+                    emit(Bytecode(Opcodes.BRANCH, end), callee_loc)
+        assert len(new_code) == end
+        for temp in temps:
+            emit(Bytecode(Opcodes.MOVE_LOC, temp), loc)
+
+    offsets.append(len(new_code))
+    for k in branches:
+        new_code[k] = Bytecode(new_code[k].tag, offsets[new_code[k].value])
+    return (new_code, new_locations, local_names, offsets)
+
+
+# Whether `function_def` of `module` passes the bounds checker and the code unit verifier.
+# `frozen` is `module` frozen, and so bounds checked, before any function was rewritten: only the
+# definition, locals and code of the function are checked again.
+def verifies(
+    module: CompiledModuleMut,
+    frozen: CompiledModule,
+    function_def: FunctionDefinition,
+) -> bool:
+    errors = function_def.check_bounds(module)
+    if errors:
+        return False
+    handle = module.function_handles[function_def.function.v0]
+    signature = module.function_signatures[handle.signature.v0]
+    locals = module.locals_signatures[function_def.code.locals.v0]
+    if (locals.check_struct_handles(module.struct_handles)
+            or function_def.code.check_bounds((module, signature))):
+        return False
+    return not CodeUnitVerifier(frozen).verify_function(function_def)
+
+
+# Return the index of `signature` in the locals signature pool of `module`, adding it if needed.
+def locals_signature_index(module: CompiledModuleMut, signature: LocalsSignature) -> int:
+    for (idx, existing) in enumerate(module.locals_signatures):
+        if existing == signature:
+            return idx
+    module.locals_signatures.append(signature)
+    return len(module.locals_signatures) - 1
+
+
+# Remove the locals signatures added from index `start` on that no function uses anymore.
+def remove_unused_locals_signatures(module: CompiledModuleMut, start: int) -> None:
+    used = sorted({
+        fdef.code.locals.v0 for fdef in module.function_defs
+        if not fdef.is_native() and fdef.code.locals.v0 >= start
+    })
+    remap = {old: start + k for (k, old) in enumerate(used)}
+    module.locals_signatures[start:] = [module.locals_signatures[old] for old in used]
+    for fdef in module.function_defs:
+        if not fdef.is_native() and fdef.code.locals.v0 >= start:
+            fdef.code.locals = LocalsSignatureIndex(remap[fdef.code.locals.v0])
+
+
+# Rewrite the function at `idx` with the calls to `inlinees` inlined. Returns whether it changed.
+def inline_function(
+    module: CompiledModuleMut,
+    source_map: SourceMap,
+    idx: int,
+    inlinees: Mapping[int, Inlinee],
+    definitions: Mapping[int, int],
+) -> bool:
+    code_unit = module.function_defs[idx].code
+    function_map = source_map.function_map.get(idx)
+    if function_map is None or has_branch_out_of_bounds(code_unit.code):
+        return False
+    locals = list(module.locals_signatures[code_unit.locals.v0].v0)
+    (code, locations, local_names, offsets) = inline_calls(
+        code_unit.code,
+        code_locations(function_map, len(code_unit.code)),
+        locals,
+        inlinees,
+        definitions,
+    )
+    if not local_names and len(code) == len(code_unit.code):
+        return False
+    code_unit.code = code
+    code_unit.locals = LocalsSignatureIndex(
+        locals_signature_index(module, LocalsSignature(locals))
+    )
+    set_code_locations(function_map, locations)
+    function_map.locls.extend(local_names)
+    function_map.nops = {label: offsets[offset] for (label, offset) in function_map.nops.items()}
+    return True
+
+
+# Inline the small functions of `module` into their callers, see the top of this file. Callees
+# are rewritten before their callers, so that chains of small functions are inlined all the way.
+def inline_module(module: CompiledModuleMut, source_map: SourceMap) -> None:
+    try:
+        frozen = module.freeze()
+    except VMException:
+        return
+    graph = call_graph(module)
+    definitions = {fdef.function.v0: idx for (idx, fdef) in enumerate(module.function_defs)}
+    signature_count = len(module.locals_signatures)
+    inlinees = {}
+    for idx in callees_first(graph):
+        fdef = module.function_defs[idx]
+        if fdef.is_native() or not verifies(module, frozen, fdef):
+            continue
+        if graph[idx] & set(inlinees):
+            original = (fdef.code.code, fdef.code.locals, deepcopy(source_map.function_map[idx]))
+            if (inline_function(module, source_map, idx, inlinees, definitions)
+                    and not verifies(module, frozen, fdef)):
+                (fdef.code.code, fdef.code.locals, source_map.function_map[idx]) = original
+        callee = inlinee(module, source_map, graph, idx)
+        if callee is not None:
+            inlinees[idx] = callee
+    remove_unused_locals_signatures(module, signature_count)
@@ -0,0 +1,356 @@
+from __future__ import annotations
+from mol.bytecode_verifier.code_unit_verifier import CodeUnitVerifier
+from mol.compiler.bytecode_source_map.source_map import FunctionSourceMap, SourceMap
+from mol.move_ir.types.location import Loc
+from mol.vm.file_format import (
+        Bytecode, CodeUnit, CompiledModuleMut, CompiledScriptMut, LocalsSignature, Opcodes,
+    )
+from mol.vm import VMException
+from typing import Callable, List, Mapping, Optional, Set, Tuple
+from bisect import bisect_left
+
+# Peephole optimizer for the code generated by the IR compiler.
+#
+# The compiler emits straightforward stack code. This pass rewrites it, until nothing changes,
+# with:
+#   - branch threading: a branch to an unconditional branch jumps to its target instead,
+#   - no-op elimination: branches to the next instruction, values pushed and popped right away
+#     (`LD_U64 1; POP`), `ST_LOC x; MOVE_LOC x` of primitive locals, conditional branches
+#     on constants (`LD_TRUE; BR_FALSE`), and code that cannot be reached after `RET`, `ABORT`
+#     and `BRANCH`,
+#   - dead store elimination: `ST_LOC x; COPY_LOC x` is dropped, and `ST_LOC x` becomes `POP`,
+#     when the primitive local `x` is not read again before it is overwritten (see `liveness`),
+#   - constant folding of integer arithmetic, comparisons, casts and `NOT` on constants. Operations
+#     that would fail at runtime (overflow, division by zero) are kept.
+#
+# An instruction is only merged with the instructions before it when it is not a branch target.
+# Code with a branch out of bounds is left as is, for the bounds checker to report.
+# Only the functions that pass the bytecode verifier are optimized, so that the optimizer never
+# changes which programs are rejected, nor the errors reported for them. Every function of the
+# result still passes the verifier; the code offsets of the source map are remapped to the
+# optimized code.
+
+
+CONST_LOADS = {
+    Opcodes.LD_U8: 0xff,
+    Opcodes.LD_U64: 0xffff_ffff_ffff_ffff,
+    Opcodes.LD_U128: 0xffff_ffff_ffff_ffff_ffff_ffff_ffff_ffff,
+}
+
+# Instructions that push a value without any other effect.
+PURE_PUSHES = set(CONST_LOADS) | {
+    Opcodes.LD_TRUE, Opcodes.LD_FALSE, Opcodes.LD_ADDR, Opcodes.LD_BYTEARRAY,
+}
+
+BRANCHES = {Opcodes.BR_TRUE, Opcodes.BR_FALSE, Opcodes.BRANCH}
+
+# Instructions that read a local.
+LOCAL_READS = {Opcodes.COPY_LOC, Opcodes.MOVE_LOC}
+
+LOCAL_BORROWS = {Opcodes.MUT_BORROW_LOC, Opcodes.IMM_BORROW_LOC}
+
+# Instructions after which execution does not fall through.
+TERMINATORS = {Opcodes.RET, Opcodes.ABORT, Opcodes.BRANCH}
+
+ARITHMETIC: Mapping[Opcodes, Callable[[int, int], Optional[int]]] = {
+    Opcodes.ADD: lambda a, b: a + b,
+    Opcodes.SUB: lambda a, b: a - b,
+    Opcodes.MUL: lambda a, b: a * b,
+    Opcodes.DIV: lambda a, b: a // b if b != 0 else None,
+    Opcodes.MOD: lambda a, b: a % b if b != 0 else None,
+    Opcodes.BIT_OR: lambda a, b: a | b,
+    Opcodes.BIT_AND: lambda a, b: a & b,
+    Opcodes.XOR: lambda a, b: a ^ b,
+}
+
+COMPARISONS: Mapping[Opcodes, Callable[[int, int], bool]] = {
+    Opcodes.EQ: lambda a, b: a == b,
+    Opcodes.NEQ: lambda a, b: a != b,
+    Opcodes.LT: lambda a, b: a < b,
+    Opcodes.GT: lambda a, b: a > b,
+    Opcodes.LE: lambda a, b: a <= b,
+    Opcodes.GE: lambda a, b: a >= b,
+}
+
+CASTS = {
+    Opcodes.CAST_U8: Opcodes.LD_U8,
+    Opcodes.CAST_U64: Opcodes.LD_U64,
+    Opcodes.CAST_U128: Opcodes.LD_U128,
+}
+
+
+def load_bool(value: bool) -> Bytecode:
+    return Bytecode(Opcodes.LD_TRUE) if value else Bytecode(Opcodes.LD_FALSE)
+
+
+def bool_value(instr: Bytecode) -> Optional[bool]:
+    if instr.tag == Opcodes.LD_TRUE:
+        return True
+    elif instr.tag == Opcodes.LD_FALSE:
+        return False
+    return None
+
+
+# Fold `a; b; op` where `a` and `b` load integer constants of the same type.
+def fold_binary(a: Bytecode, b: Bytecode, op: Bytecode) -> Optional[Bytecode]:
+    if a.tag != b.tag or a.tag not in CONST_LOADS:
+        return None
+    if op.tag in COMPARISONS:
+        return load_bool(COMPARISONS[op.tag](a.value, b.value))
+    if op.tag in ARITHMETIC:
+        value = ARITHMETIC[op.tag](a.value, b.value)
+        if value is not None and 0 <= value <= CONST_LOADS[a.tag]:
+            return Bytecode(a.tag, value)
+    return None
+
+
+# Fold `a; op` where `a` loads a constant.
+def fold_unary(a: Bytecode, op: Bytecode) -> Optional[Bytecode]:
+    if op.tag in CASTS and a.tag in CONST_LOADS:
+        tag = CASTS[op.tag]
+        if a.value <= CONST_LOADS[tag]:
+            return Bytecode(tag, a.value)
+    elif op.tag == Opcodes.NOT and bool_value(a) is not None:
+        return load_bool(not bool_value(a))
+    return None
+
+
+def branch_targets(code: List[Bytecode]) -> Set[int]:
+    return {instr.value for instr in code if instr.tag in BRANCHES}
+
+
+# Return the final target of a branch to `target`, following unconditional branches.
+def thread_target(code: List[Bytecode], target: int) -> int:
+    seen = set()
+    while target < len(code) and code[target].tag == Opcodes.BRANCH and target not in seen:
+        seen.add(target)
+        target = code[target].value
+    return target
+
+
+# Return, for each instruction of `code`, the bit set of the locals that may be read after it
+# before being stored to again. Locals that are borrowed anywhere in the function are always live,
+# since they may be read through the reference.
+def liveness(code: List[Bytecode]) -> List[int]:
+    borrowed = 0
+    for instr in code:
+        if instr.tag in LOCAL_BORROWS:
+            borrowed |= 1 << instr.value
+    live_in = [0] * (len(code) + 1)
+    live_out = [0] * len(code)
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(code) - 1, -1, -1):
+            instr = code[i]
+            live = borrowed
+            if instr.tag not in TERMINATORS:
+                live |= live_in[i + 1]
+            if instr.tag in BRANCHES:
+                live |= live_in[instr.value]
+            live_out[i] = live
+            if instr.tag in LOCAL_READS:
+                live |= 1 << instr.value
+            elif instr.tag == Opcodes.ST_LOC:
+                live &= ~(1 << instr.value)
+            if live != live_in[i]:
+                live_in[i] = live
+                changed = True
+    return live_out
+
+
+# One pass of the peephole rules over `code`. Returns None if nothing changed, otherwise the new
+# code and, for each of its instructions, the index in `code` of the instruction it replaces.
+def peephole(
+    code: List[Bytecode],
+    is_primitive_local: Callable[[int], bool],
+) -> Optional[Tuple[List[Bytecode], List[int]]]:
+    targets = branch_targets(code)
+    count = len(code)
+    if any(target >= count for target in targets):
+        return None
+    live_out = liveness(code)
+    new_code = []
+    origins = []
+    changed = False
+
+    # Whether the primitive local `idx` is not read after the instruction at `j`.
+    def dead_after(idx: int, j: int) -> bool:
+        return not live_out[j] >> idx & 1 and is_primitive_local(idx)
+
+    # Whether the instruction at `j` exists and may be merged with the instructions before it.
+    def mergeable(j: int) -> bool:
+        return j < count and j not in targets
+
+    def emit(instr: Bytecode, origin: int) -> None:
+        new_code.append(instr)
+        origins.append(origin)
+
+    i = 0
+    while i < count:
+        instr = code[i]
+        if instr.tag in BRANCHES:
+            target = thread_target(code, instr.value)
+            if target != instr.value:
+                instr = Bytecode(instr.tag, target)
+                changed = True
+            if target == i + 1:
+                changed = True
+                if instr.tag == Opcodes.BRANCH:
+                    i += 1
+                    continue
+                # Drop the condition.
+                instr = Bytecode(Opcodes.POP)
+
+        elif mergeable(i + 1):
+            nxt = code[i + 1]
+            if instr.tag in PURE_PUSHES and nxt.tag == Opcodes.POP:
+                changed = True
+                i += 2
+                continue
+            if bool_value(instr) is not None and nxt.tag in [Opcodes.BR_TRUE, Opcodes.BR_FALSE]:
+                changed = True
+                if bool_value(instr) == (nxt.tag == Opcodes.BR_TRUE):
+                    emit(Bytecode(Opcodes.BRANCH, nxt.value), i)
+                i += 2
+                continue
+            if (instr.tag == Opcodes.ST_LOC and nxt.tag == Opcodes.MOVE_LOC
+                    and instr.value == nxt.value and is_primitive_local(instr.value)):
+                changed = True
+                i += 2
+                continue
+            if (instr.tag == Opcodes.ST_LOC and nxt.tag == Opcodes.COPY_LOC
+                    and instr.value == nxt.value and dead_after(instr.value, i + 1)):
+                changed = True
+                i += 2
+                continue
+            folded = fold_unary(instr, nxt)
+            if folded is not None:
+                changed = True
+                emit(folded, i)
+                i += 2
+                continue
+            if mergeable(i + 2):
+                folded = fold_binary(instr, nxt, code[i + 2])
+                if folded is not None:
+                    changed = True
+                    emit(folded, i)
+                    i += 3
+                    continue
+
+        if instr.tag == Opcodes.ST_LOC and dead_after(instr.value, i):
+            changed = True
+            instr = Bytecode(Opcodes.POP)
+
+        emit(instr, i)
+        i += 1
+        if instr.tag in TERMINATORS:
+            # Skip the code that cannot be reached.
+            while i < count and i not in targets:
+                changed = True
+                i += 1
+
+    if not changed:
+        return None
+    for (k, instr) in enumerate(new_code):
+        if instr.tag in BRANCHES:
+            new_code[k] = Bytecode(instr.tag, bisect_left(origins, instr.value))
+    return (new_code, origins)
+
+
+# Optimize `code`, returning the new code and, for each of its instructions, the offset in `code`
+# of the instruction it comes from.
+def optimize_code(
+    code: List[Bytecode],
+    locals_signature: LocalsSignature,
+) -> Tuple[List[Bytecode], List[int]]:
+    def is_primitive_local(idx: int) -> bool:
+        return locals_signature.v0[idx].is_primitive()
+
+    origins = list(range(len(code)))
+    while True:
+        result = peephole(code, is_primitive_local)
+        if result is None:
+            return (code, origins)
+        (code, step) = result
+        origins = [origins[j] for j in step]
+
+
+# Return the source location of each of the first `count` instructions of a function.
+def code_locations(function_map: FunctionSourceMap, count: int) -> List[Optional[Loc]]:
+    offsets = sorted(function_map.code_map)
+    ret = []
+    for offset in range(count):
+        k = bisect_left(offsets, offset + 1) - 1
+        ret.append(function_map.code_map[offsets[k]] if k >= 0 else None)
+    return ret
+
+
+# Replace the code map of `function_map` with the one giving `locations` to the instructions.
+def set_code_locations(function_map: FunctionSourceMap, locations: List[Optional[Loc]]) -> None:
+    code_map = {}
+    previous = None
+    for (offset, loc) in enumerate(locations):
+        if loc is not None and loc != previous:
+            code_map[offset] = loc
+            previous = loc
+    function_map.code_map = code_map
+
+
+# Remap the code offsets of `function_map` to the optimized code. `origins` is as returned by
+# `optimize_code`.
+def remap_function_source_map(function_map: FunctionSourceMap, origins: List[int]) -> None:
+    locations = code_locations(function_map, max(origins, default=-1) + 1)
+    set_code_locations(function_map, [locations[origin] for origin in origins])
+    function_map.nops = {
+        label: bisect_left(origins, offset) for (label, offset) in function_map.nops.items()
+    }
+
+
+def optimize_code_unit(
+    code_unit: CodeUnit,
+    locals_signature: LocalsSignature,
+    function_map: Optional[FunctionSourceMap],
+) -> None:
+    (code, origins) = optimize_code(code_unit.code, locals_signature)
+    code_unit.code = code
+    if function_map is not None:
+        remap_function_source_map(function_map, origins)
+
+
+# Return the functions of `module` that pass the bytecode verifier, by index. None do if the
+# module does not pass the bounds checker.
+def verified_functions(module: CompiledModuleMut) -> Set[int]:
+    try:
+        frozen = module.freeze()
+    except VMException:
+        return set()
+    verifier = CodeUnitVerifier(frozen)
+    return {
+        idx for (idx, function_def) in enumerate(module.function_defs)
+        if not function_def.is_native() and not verifier.verify_function(function_def)
+    }
+
+
+def optimize_module(module: CompiledModuleMut, source_map: SourceMap) -> None:
+    verified = verified_functions(module)
+    for (idx, function_def) in enumerate(module.function_defs):
+        if idx not in verified:
+            continue
+        code_unit = function_def.code
+        optimize_code_unit(
+            code_unit,
+            module.locals_signatures[code_unit.locals.v0],
+            source_map.function_map.get(idx),
+        )
+
+
+def optimize_script(script: CompiledScriptMut, source_map: SourceMap) -> None:
+    if not verified_functions(script.into_module()):
+        return
+    code_unit = script.main.code
+    optimize_code_unit(
+        code_unit,
+        script.locals_signatures[code_unit.locals.v0],
+        source_map.function_map.get(0),
+    )
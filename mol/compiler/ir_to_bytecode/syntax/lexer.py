@@ -1,9 +1,10 @@
 from __future__ import annotations
 from mol.compiler.ir_to_bytecode.syntax.parse_error import ParseError, ParseErrorInvalidToken
-from mol.move_ir.types.codespan import ByteIndex, Span
+from mol.move_ir.types.codespan import Span
 from mol.move_ir.types.location import Loc
 from enum import Enum, auto
 from typing import List, Optional, Tuple
+import re
 from dataclasses import dataclass
 from libra.rustlib import usize
 
@@ -123,6 +124,90 @@ class Tok(Enum):
             return False
 
 
+# The lexer works on offsets into the whole source text and never slices it, so that lexing is
+# linear in the size of the source. Each token is found by a single match of TOKEN_RE at the end
+# of the previous token: the `ws` group skips the whitespace in front of the token (the same
+# characters `str.lstrip` would drop) and at most one of the other groups matches the token itself.
+TOKEN_RE = re.compile(r"""
+    (?P<ws>\s*)
+    (?:
+        (?P<name>[a-zA-Z_][a-zA-Z0-9_]*)
+      | (?P<address>0[xX][0-9a-fA-F]+)
+      | (?P<number>[0-9]+)(?P<suffix>u8|u64|u128)?
+      | (?P<punct>&mut\ |&&|\|\||==>|==|!=|<=|<<|>=|>>|\.\.|:=|[&|=!<>.:%()*+,\-/;^{}\[\]])
+      | (?P<dollar>\$)
+    )?
+""", re.VERBOSE)
+
+# A name directly following a '.', for DotNameValue.
+DOT_NAME_RE = re.compile(r"[a-zA-Z_][a-zA-Z0-9_]*")
+
+# The rest of a ByteArrayValue after the 'h"' prefix.
+BYTE_ARRAY_RE = re.compile(r'[0-9a-fA-F]*"')
+
+PUNCT_TOKENS = {
+    "&mut " : Tok.AmpMut,
+    "&&" : Tok.AmpAmp,
+    "&" : Tok.Amp,
+    "||" : Tok.PipePipe,
+    "|" : Tok.Pipe,
+    "==>" : Tok.EqualEqualGreater,
+    "==" : Tok.EqualEqual,
+    "=" : Tok.Equal,
+    "!=" : Tok.ExclaimEqual,
+    "!" : Tok.Exclaim,
+    "<=" : Tok.LessEqual,
+    "<<" : Tok.LessLess,
+    "<" : Tok.Less,
+    ">=" : Tok.GreaterEqual,
+    ">>" : Tok.GreaterGreater,
+    ">" : Tok.Greater,
+    "%" : Tok.Percent,
+    "(" : Tok.LParen,
+    ")" : Tok.RParen,
+    "*" : Tok.Star,
+    "+" : Tok.Plus,
+    "," : Tok.Comma,
+    "-" : Tok.Minus,
+    ".." : Tok.PeriodPeriod, # range, for specs
+    "." : Tok.Period,
+    "/" : Tok.Slash,
+    ":=" : Tok.ColonEqual, # spec update
+    ":" : Tok.Colon,
+    ";" : Tok.Semicolon,
+    "^" : Tok.Caret,
+    "{" : Tok.LBrace,
+    "}" : Tok.RBrace,
+    "[" : Tok.LSquare,
+    "]" : Tok.RSquare,
+}
+
+NUMBER_SUFFIX_TOKENS = {
+    None : Tok.U64Value,
+    "u8" : Tok.U8Value,
+    "u64" : Tok.U64Value,
+    "u128" : Tok.U128Value,
+}
+
+# Names lexed together with a following '<'. The length of the token is the length of the name
+# plus the value in the map.
+LESS_TOKENS = {
+    "vector" : (Tok.Vector, 0), #TTODO: why not lenn + 1
+    "borrow_global" : (Tok.BorrowGlobal, 1),
+    "borrow_global_mut" : (Tok.BorrowGlobalMut, 1),
+    "exists" : (Tok.Exists, 1),
+    "move_from" : (Tok.MoveFrom, 1),
+    "move_to_sender" : (Tok.MoveToSender, 1),
+}
+
+# Names lexed together with a following '('.
+LPAREN_TOKENS = {
+    "assert" : Tok.Assert,
+    "copy" : Tok.Copy,
+    "move" : Tok.Move,
+}
+
+
 @dataclass
 class Lexer:
     spec_mode: bool
@@ -167,18 +252,15 @@ class Lexer:
 
 
     def lookahead(self) -> Tok:
-        text = self.text[self.cur_end:].lstrip()
-        offset = self.text.__len__() - text.__len__()
-        (tok, _) = self.find_token(text, offset)
+        (tok, _, _) = self.find_token(self.cur_end)
         return tok
 
 
     def advance(self) -> None:
         self.prev_end = self.cur_end
-        text = self.text[self.cur_end:].lstrip()
-        self.cur_start = self.text.__len__() - text.__len__()
-        (token, lenn) = self.find_token(text, self.cur_start)
-        self.cur_end = self.cur_start + lenn
+        (token, start, lenn) = self.find_token(self.cur_end)
+        self.cur_start = start
+        self.cur_end = start + lenn
         self.token = token
 
 
@@ -191,288 +273,136 @@ class Lexer:
         self.cur_end = self.cur_start + lenn
 
 
+    # Return all the tokens of the source with their start and end offsets, ending with Tok.EOF.
+    # The parser may switch to spec_mode or split tokens with `replace_token`, so this is the
+    # token stream of a source that does neither.
+    def tokens(self) -> List[Tuple[Tok, usize, usize]]:
+        ret = []
+        end = 0
+        while True:
+            (token, start, lenn) = self.find_token(end)
+            end = start + lenn
+            ret.append((token, start, end))
+            if token == Tok.EOF:
+                return ret
 
-    # Find the next token and its length without changing the state of the lexer.
+
+    # Find the next token at or after offset `pos`, skipping whitespace, without changing the
+    # state of the lexer. Return the token, its start offset and its length.
     def find_token(
         self,
-        text: str,
-        start_offset: usize,
-    ) -> Tuple[Tok, usize]:
-        if not text:
-            return (Tok.EOF, 0)
-
-        ch = text[0]
-        if ch >= '0' and ch <= '9':
-            if (text.startswith("0x") or text.startswith("0X")) and text.__len__() > 2:
-                hex_len = get_hex_digits_len(text[2:])
-                if hex_len == 0:
-                    # Fall back to treating this as a "0" token.
-                    return (Tok.U64Value, 1)
-                else:
-                    return (Tok.AddressValue, 2 + hex_len)
-
-            else:
-                return get_decimal_number(text)
-
-        elif (ch >= 'a' and ch <= 'z') or (ch >= 'A' and ch <= 'Z') or ch == '$' or ch == '_':
-            lenn = get_name_len(text)
-            name = text[:lenn]
-            if not self.spec_mode:
-                sss = text[lenn:]
-                if not sss:
-                    return (get_name_token(name), lenn)
-
-                if sss[0] == '"':
-                    # Special case for ByteArrayValue: h\"[0-9A-Fa-f]*\"
-                    bvlen = 0
-                    if name == "h":
-                        bvlen = get_byte_array_value_len(text[(lenn + 1):])
-                        if bvlen > 0:
-                            return (Tok.ByteArrayValue, 2 + bvlen)
-
-                    return (get_name_token(name), lenn)
-
-                elif sss[0] == '.':
-                    len2 = get_name_len(text[(lenn + 1):])
-                    if len2 > 0:
-                        return (Tok.DotNameValue, lenn + 1 + len2)
-                    else:
-                        return (get_name_token(name), lenn)
-
-                elif sss[0] == '<':
-                    lt_map = {
-                        "vector" : (Tok.Vector, lenn), #TTODO: why not lenn + 1
-                        "borrow_global" : (Tok.BorrowGlobal, lenn + 1),
-                        "borrow_global_mut" : (Tok.BorrowGlobalMut, lenn + 1),
-                        "exists" : (Tok.Exists, lenn + 1),
-                        "move_from" : (Tok.MoveFrom, lenn + 1),
-                        "move_to_sender" : (Tok.MoveToSender, lenn + 1),
-                    }
-                    if name in lt_map:
-                        return lt_map[name]
-                    else:
-                        return (Tok.NameBeginTyValue, lenn + 1)
-
-                elif sss[0] == '(':
-                    lt_map = {
-                        "assert" : (Tok.Assert, lenn + 1),
-                        "copy" : (Tok.Copy, lenn + 1),
-                        "move" : (Tok.Move, lenn + 1),
-                    }
-                    if name in lt_map:
-                        return lt_map[name]
-                    else:
-                        return (get_name_token(name), lenn)
-                else:
-                    return (get_name_token(name), lenn)
-            else:
-                return (get_name_token(name), lenn) # just return the name in spec_mode
-
-        elif ch == '&':
-            if text.startswith("&mut "):
-                return (Tok.AmpMut, 5)
-            elif text.startswith("&&"):
-                return (Tok.AmpAmp, 2)
-            else:
-                return (Tok.Amp, 1)
-
-        elif ch == '|':
-            if text.startswith("||"):
-                return (Tok.PipePipe, 2)
-            else:
-                return (Tok.Pipe, 1)
-
-        elif ch == '=':
-            if text.startswith("==>"):
-                return (Tok.EqualEqualGreater, 3)
-            elif text.startswith("=="):
-                return (Tok.EqualEqual, 2)
-            else:
-                return (Tok.Equal, 1)
-
-        elif ch == '!':
-            if text.startswith("!="):
-                return (Tok.ExclaimEqual, 2)
+        pos: usize,
+    ) -> Tuple[Tok, usize, usize]:
+        text = self.text
+        m = TOKEN_RE.match(text, pos)
+        start = m.end("ws")
+
+        name = m.group("name")
+        if name is not None:
+            lenn = len(name)
+            if self.spec_mode:
+                return (get_name_token(name), start, lenn) # just return the name in spec_mode
+            end = start + lenn
+            if end == len(text):
+                return (get_name_token(name), start, lenn)
+            ch = text[end]
+            if ch == '"':
+                # Special case for ByteArrayValue: h\"[0-9A-Fa-f]*\"
+                if name == "h":
+                    bv = BYTE_ARRAY_RE.match(text, end + 1)
+                    if bv is not None:
+                        return (Tok.ByteArrayValue, start, bv.end() - start)
+                return (get_name_token(name), start, lenn)
+            elif ch == '.':
+                dot_name = DOT_NAME_RE.match(text, end + 1)
+                if dot_name is not None:
+                    return (Tok.DotNameValue, start, dot_name.end() - start)
+                return (get_name_token(name), start, lenn)
+            elif ch == '<':
+                if name in LESS_TOKENS:
+                    (token, extra) = LESS_TOKENS[name]
+                    return (token, start, lenn + extra)
+                return (Tok.NameBeginTyValue, start, lenn + 1)
+            elif ch == '(':
+                if name in LPAREN_TOKENS:
+                    return (LPAREN_TOKENS[name], start, lenn + 1)
+                return (get_name_token(name), start, lenn)
             else:
-                return (Tok.Exclaim, 1)
-
-        elif ch == '<':
-            if text.startswith("<="):
-                return (Tok.LessEqual, 2)
-            elif text.startswith("<<"):
-                return (Tok.LessLess, 2)
-            else:
-                return (Tok.Less, 1)
-
-        elif ch == '>':
-            if text.startswith(">="):
-                return (Tok.GreaterEqual, 2)
-            elif text.startswith(">>"):
-                return (Tok.GreaterGreater, 2)
-            else:
-                return (Tok.Greater, 1)
-
-        elif ch == '%':
-            return (Tok.Percent, 1)
-        elif ch == '(':
-            return (Tok.LParen, 1)
-        elif ch == ')':
-            return (Tok.RParen, 1)
-        elif ch == '*':
-            return (Tok.Star, 1)
-        elif ch == '+':
-            return (Tok.Plus, 1)
-        elif ch == ',':
-            return (Tok.Comma, 1)
-        elif ch == '-':
-            return (Tok.Minus, 1)
-        elif ch == '.':
-            if text.startswith(".."):
-                return (Tok.PeriodPeriod, 2) # range, for specs
-            else:
-                return (Tok.Period, 1)
-
-        elif ch == '/':
-            return (Tok.Slash, 1)
-        elif ch == ':':
-            if text.startswith(":="):
-                return (Tok.ColonEqual, 2) # spec update
-            else:
-                return (Tok.Colon, 1)
-
-        elif ch == ';':
-            return (Tok.Semicolon, 1)
-        elif ch == '^':
-            return (Tok.Caret, 1)
-        elif ch == '{':
-            return (Tok.LBrace, 1)
-        elif ch == '}':
-            return (Tok.RBrace, 1)
-        elif ch == '[':
-            return (Tok.LSquare, 1)
-        elif ch == ']':
-            return (Tok.RSquare, 1)
-        else:
-            idx = ByteIndex(start_offset)
-            location = Loc(self.file_name(), Span.new(idx, idx))
-            raise ParseErrorInvalidToken(location)
-
-
-# Return the length of the substring matching [a-zA-Z$_][a-zA-Z0-9$_]
-def get_name_len(text: str) -> usize:
-    # If the first character is 0..=9 or EOF, then return a length of 0.
-    if not text:
-        return 0
-    if text[0] >= '0' and text[0] <= '9':
-        return 0
-    for i, ch in enumerate(text):
-        od = ord(ch)
-        if od >= ord('a') and od <= ord('z'):
-            continue
-        if od >= ord('A') and od <= ord('Z'):
-            continue
-        if od >= ord('0') and od <= ord('9'):
-            continue
-        if ch == '_':
-            continue
-        return i
-    return len(text)
-
-
-def _get_digits_len(text: str) -> usize:
-    for i, ch in enumerate(text):
-        od = ord(ch)
-        if od >= ord('0') and od <= ord('9'):
-            continue
-        return i
-    return len(text)
-
-
-def get_decimal_number(text: str) -> Tuple[Tok, usize]:
-    lenn = _get_digits_len(text)
-    rest = text[lenn:]
-    if rest.startswith("u8"):
-        return (Tok.U8Value, lenn + 2)
-    elif rest.startswith("u64"):
-        return (Tok.U64Value, lenn + 3)
-    elif rest.startswith("u128"):
-        return (Tok.U128Value, lenn + 4)
-    else:
-        return (Tok.U64Value, lenn)
-
-
-# Return the length of the substring containing characters in [0-9a-fA-F].
-def get_hex_digits_len(text: str) -> usize:
-    for i, ch in enumerate(text):
-        od = ord(ch)
-        if od >= ord('a') and od <= ord('f'):
-            continue
-        if od >= ord('A') and od <= ord('F'):
-            continue
-        if od >= ord('0') and od <= ord('9'):
-            continue
-        return i
-    return len(text)
-
-
-# Check for an optional sequence of hex digits following by a double quote, and return
-# the length of that string if found. This is used to lex ByteArrayValue tokens after
-# seeing the 'h"' prefix.
-def get_byte_array_value_len(text: str) -> usize:
-    hex_len = get_hex_digits_len(text)
-    if len(text) > hex_len and text[hex_len:][0] == '"':
-        return hex_len + 1
-    else:
-        return 0
+                return (get_name_token(name), start, lenn)
+
+        punct = m.group("punct")
+        if punct is not None:
+            return (PUNCT_TOKENS[punct], start, len(punct))
+
+        number = m.group("number")
+        if number is not None:
+            return (NUMBER_SUFFIX_TOKENS[m.group("suffix")], start, m.end() - start)
+
+        if m.group("address") is not None:
+            return (Tok.AddressValue, start, m.end() - start)
+
+        if m.group("dollar") is not None:
+            # '$' may start a name but is not part of one, so this is an empty name.
+            return (Tok.NameValue, start, 0)
+
+        if start == len(text):
+            return (Tok.EOF, start, 0)
+
+        location = Loc(self.file_name(), Span(start, start))
+        raise ParseErrorInvalidToken(location)
+
+
+# Return the tokens of `text` with their start and end offsets, see `Lexer.tokens`.
+def tokenize(file: str, text: str) -> List[Tuple[Tok, usize, usize]]:
+    return Lexer.new(file, text).tokens()
+
+
+NAME_TOKENS = {
+    "_" : Tok.Underscore,
+    "abort" : Tok.Abort,
+    "aborts_if" : Tok.AbortsIf,
+    "acquires" : Tok.Acquires,
+    "address" : Tok.Address,
+    "as" : Tok.As,
+    "bool" : Tok.Bool,
+    "break" : Tok.Break,
+    "continue" : Tok.Continue,
+    "else" : Tok.Else,
+    "ensures" : Tok.Ensures,
+    "false" : Tok.FALSE,
+    "freeze" : Tok.Freeze,
+    "get_txn_sender" : Tok.GetTxnSender,
+    "global" : Tok.Global,              # spec language
+    "global_exists" : Tok.GlobalExists, # spec language
+    "to_u8" : Tok.ToU8,
+    "to_u64" : Tok.ToU64,
+    "to_u128" : Tok.ToU128,
+    "if" : Tok.If,
+    "import" : Tok.Import,
+    "let" : Tok.Let,
+    "loop" : Tok.Loop,
+    "main" : Tok.Main,
+    "module" : Tok.Module,
+    "native" : Tok.Native,
+    "invariant" : Tok.Invariant,
+    "old" : Tok.Old,
+    "public" : Tok.Public,
+    "requires" : Tok.Requires,
+    "resource" : Tok.Resource,
+    "RET" : Tok.SpecReturn,
+    "return" : Tok.Return,
+    "struct" : Tok.Struct,
+    "succeeds_if" : Tok.SucceedsIf,
+    "synthetic" : Tok.Synthetic,
+    "true" : Tok.TRUE,
+    "txn_sender" : Tok.TxnSender,
+    "u8" : Tok.U8,
+    "u64" : Tok.U64,
+    "u128" : Tok.U128,
+    "unrestricted" : Tok.Unrestricted,
+    "while" : Tok.While,
+}
 
 
 def get_name_token(name: str) -> Tok:
-    name_dict = {
-        "_" : Tok.Underscore,
-        "abort" : Tok.Abort,
-        "aborts_if" : Tok.AbortsIf,
-        "acquires" : Tok.Acquires,
-        "address" : Tok.Address,
-        "as" : Tok.As,
-        "bool" : Tok.Bool,
-        "break" : Tok.Break,
-        "continue" : Tok.Continue,
-        "else" : Tok.Else,
-        "ensures" : Tok.Ensures,
-        "false" : Tok.FALSE,
-        "freeze" : Tok.Freeze,
-        "get_txn_sender" : Tok.GetTxnSender,
-        "global" : Tok.Global,              # spec language
-        "global_exists" : Tok.GlobalExists, # spec language
-        "to_u8" : Tok.ToU8,
-        "to_u64" : Tok.ToU64,
-        "to_u128" : Tok.ToU128,
-        "if" : Tok.If,
-        "import" : Tok.Import,
-        "let" : Tok.Let,
-        "loop" : Tok.Loop,
-        "main" : Tok.Main,
-        "module" : Tok.Module,
-        "native" : Tok.Native,
-        "invariant" : Tok.Invariant,
-        "old" : Tok.Old,
-        "public" : Tok.Public,
-        "requires" : Tok.Requires,
-        "resource" : Tok.Resource,
-        "RET" : Tok.SpecReturn,
-        "return" : Tok.Return,
-        "struct" : Tok.Struct,
-        "succeeds_if" : Tok.SucceedsIf,
-        "synthetic" : Tok.Synthetic,
-        "true" : Tok.TRUE,
-        "txn_sender" : Tok.TxnSender,
-        "u8" : Tok.U8,
-        "u64" : Tok.U64,
-        "u128" : Tok.U128,
-        "unrestricted" : Tok.Unrestricted,
-        "while" : Tok.While,
-    }
-    if name in name_dict:
-        return name_dict[name]
-    else:
-        return Tok.NameValue
+    return NAME_TOKENS.get(name, Tok.NameValue)
@@ -4,9 +4,9 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../'
 from pathlib import Path
 from mol.bytecode_verifier import VerifiedModule, VerifiedScript, VerifyException
 from mol.bytecode_verifier.verifier import verify_module_dependencies
-from mol.compiler.ir_to_bytecode.compiler import compile_module, compile_script
+from mol.compiler.batch import compile_batch
+from mol.compiler.compile_cache import CompileCache, compile_with_cache
 from mol.compiler.ir_to_bytecode.parser import parse_script_or_module
-from mol.move_ir.types import ast
 from libra import AccessPath, Address
 from libra.transaction import Script, Module
 from libra.vm_error import VMStatus
@@ -23,6 +23,12 @@ def get_parser():
     parser.add_argument('-l', "--list-dependencies", action='store_true', default=False, help='Instead of compiling the source, emit a dependency list of the compiled source')
     parser.add_argument("--deps", dest='deps_path', help='Path to the list of modules that we want to link with')
     parser.add_argument("--src-map", dest='output_source_maps', action='store_true', default=False)
+    parser.add_argument('-O', "--optimize", action='store_true', default=False, help='Run the peephole optimizer on the generated bytecode')
+    parser.add_argument("--inline", action='store_true', default=False, help='Inline the small private functions of a module into their callers')
+    parser.add_argument("--cache-dir", help='Directory of the compile cache, reused by later runs')
+    parser.add_argument("--batch", action='store_true', default=False, help='Compile all the .mvir sources of a directory, or of a JSON manifest listing them, in dependency order')
+    parser.add_argument('-j', "--jobs", type=int, default=os.cpu_count(), help='Number of processes compiling in batch mode')
+    parser.add_argument("--out-dir", help='Output directory in batch mode, defaults to the source directory')
     parser.add_argument('source_path', nargs=1, help='Path to the Move IR source to compile')
     return parser
 
@@ -61,6 +67,9 @@ def main(argv=None):
         address = Address.normalize_to_bytes(address)
 
     source_path = args.source_path[0]
+    if args.batch:
+        return main_batch(args, source_path, address)
+
     mvir_extension = ".mvir"
     mv_extension = ".mv"
     source_map_extension = ".mvsm"
@@ -69,9 +78,9 @@ def main(argv=None):
         sys.exit(1)
 
     source = Path(source_path).read_text()
-    sorm = parse_script_or_module(source_path, source)
 
     if args.list_dependencies:
+        sorm = parse_script_or_module(source_path, source)
         dependency_list = sorm.value.get_external_deps()
         dependency_list = [AccessPath.code_access_path(m) for m in dependency_list]
         print(dependency_list)
@@ -86,16 +95,20 @@ def main(argv=None):
     else:
         deps = stdlib_modules()
 
-    if sorm.tag == ast.ScriptOrModule.SCRIPT:
-        parsed_script = sorm.value
-        compiled_script, source_map = compile_script(address, parsed_script, deps)
+    cache = CompileCache.new(args.cache_dir) if args.cache_dir else None
+    unit = compile_with_cache(
+        cache, source_path, source, address, deps, args.optimize, args.inline,
+    )
+    source_map = unit.source_map
+
+    if unit.is_script():
+        compiled_script = compiled_sorm = unit.script
         if not args.no_verify:
             verified_script = VerifiedScript.new(compiled_script)
             compiled_sorm = verified_script.into_inner()
 
-    elif sorm.tag == ast.ScriptOrModule.MODULE:
-        parsed_module = sorm.value
-        compiled_module, source_map = compile_module(address, parsed_module, deps)
+    else:
+        compiled_module = compiled_sorm = unit.module
         if not args.no_verify:
             verified_module = do_verify_module(compiled_module, deps)
             compiled_sorm = verified_module.into_inner()
@@ -108,5 +121,30 @@ def main(argv=None):
     bytes = compiled_sorm.serialize()
     Path(source_path).with_suffix(mv_extension).write_bytes(bytes)
 
+def main_batch(args, source_path: str, address: bytes) -> None:
+    try:
+        report = compile_batch(
+            source_path,
+            address,
+            jobs=max(args.jobs or 1, 1),
+            out_dir=args.out_dir,
+            use_stdlib=not args.no_stdlib,
+            verify=not args.no_verify,
+            cache_dir=args.cache_dir,
+            optimize=args.optimize,
+            inline=args.inline,
+        )
+    except ValueError as err:
+        print(err)
+        sys.exit(1)
+    for (path, errors) in sorted(report.failed.items()):
+        print(f"{path}: compilation failed")
+        for e in errors:
+            print(f"    {e}")
+    print(report.summary())
+    if report.failed:
+        sys.exit(1)
+
+
 if __name__ == '__main__':
     main()
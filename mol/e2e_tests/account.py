@@ -115,6 +115,44 @@ class Account:
     def auth_key_prefix(self) -> bytes:
         return AuthenticationKey.ed25519(self.pubkey).prefix()
 
+
+    # Returns a [`SignedTransaction`] with the arguments defined in `args` and this account as
+    # the sender.
+    def create_signed_txn_with_args(self,
+        program: bytes,
+        args: List[TransactionArgument],
+        sequence_number: Uint64,
+        max_gas_amount: Uint64,
+        gas_unit_price: Uint64,
+    ) -> SignedTransaction:
+        return self.create_signed_txn_impl(
+            self.addr,
+            TransactionPayload('Script', Script(program, args)),
+            sequence_number,
+            max_gas_amount,
+            gas_unit_price,
+        )
+
+
+    # Returns a [`SignedTransaction`] with the given payload, signed by this account.
+    def create_signed_txn_impl(self,
+        sender: Address,
+        program: TransactionPayload,
+        sequence_number: Uint64,
+        max_gas_amount: Uint64,
+        gas_unit_price: Uint64,
+    ) -> SignedTransaction:
+        raw = RawTransaction(
+            sender,
+            sequence_number,
+            program,
+            max_gas_amount,
+            gas_unit_price,
+            AccountConfig.lbr_type_tag(),
+            DEFAULT_EXPIRATION_TIME,
+        )
+        return raw.sign(self.privkey, self.pubkey).into_inner()
+
     def default(cls) -> Account:
         return cls.new()
 
@@ -0,0 +1,32 @@
+from __future__ import annotations
+from mol.e2e_tests.account import Account
+from mol.stdlib import staged_transaction_script
+from mol.vm.gas_schedule import MAXIMUM_NUMBER_OF_GAS_UNITS
+from libra.transaction import SignedTransaction, TransactionArgument
+from canoser import Uint64
+
+# Support for encoding transactions for common situations.
+
+PEER_TO_PEER: bytes = staged_transaction_script("peer_to_peer")
+
+
+# Returns a transaction to transfer coin from one account to another (possibly new) one, with the
+# given arguments.
+def peer_to_peer_txn(
+    sender: Account,
+    receiver: Account,
+    seq_num: Uint64,
+    transfer_amount: Uint64,
+) -> SignedTransaction:
+    args = [
+        TransactionArgument('Address', receiver.address()),
+        TransactionArgument('U8Vector', receiver.auth_key_prefix()),
+        TransactionArgument('U64', transfer_amount),
+    ]
+    return sender.create_signed_txn_with_args(
+        PEER_TO_PEER,
+        args,
+        seq_num,
+        MAXIMUM_NUMBER_OF_GAS_UNITS.get(),
+        1,
+    )
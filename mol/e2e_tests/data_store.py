@@ -7,13 +7,17 @@ from libra.language_storage import ModuleId
 from libra.transaction import Transaction, TransactionPayload
 from libra.transaction.write_set import WriteOp, WriteSet
 from mol.move_vm.types.values import Struct
+from libra.rustlib import bail, ensure
 
 from mol.vm.errors import *
 from mol.vm import CompiledModule
 from mol.move_vm.state.data_cache import RemoteCache
 from pathlib import Path
+from collections import ChainMap
+from functools import lru_cache
 from dataclasses import dataclass, field
-from typing import List, Optional, Mapping
+from typing import Iterator, List, Optional, Mapping, Set, Tuple
+import weakref
 
 
 # Support for mocking the Libra data store.
@@ -33,20 +37,101 @@ def load_genesis(path: str) -> WriteSet:
     bail("Expected writeset txn in genesis txn")
 
 
-# The write set encoded in the genesis transaction.
-GENESIS_WRITE_SET = load_genesis("../vm_genesis/genesis/genesis.blob")
+# The write set encoded in the genesis transaction, deserialized on first use.
+@lru_cache(maxsize=None)
+def genesis_write_set() -> WriteSet:
+    return load_genesis("../vm_genesis/genesis/genesis.blob")
+
+
+# `GENESIS_WRITE_SET` is an alias of `genesis_write_set()`, resolved when first accessed.
+def __getattr__(name: str):
+    if name == "GENESIS_WRITE_SET":
+        return genesis_write_set()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # An in-memory implementation of [`StateView`] and [`RemoteCache`] for the VM.
 #
 # Tests use this to set up state, and pass in a reference to the cache whenever a `StateView` or
 # `RemoteCache` is needed.
-@dataclass
+#
+# A data store can be forked in O(1): the fork is an overlay on top of its parent, holding only
+# the blobs written (`data`) and the access paths deleted (`deleted`) since the fork. Reads that
+# miss the overlay fall through to the parent. A fork can later be merged back into its parent,
+# or discarded.
+#
+# The parent is the fork's snapshot, so it cannot be written to while it has live forks. Forks
+# that are dropped without being discarded stop counting once they are garbage collected. Data
+# stores compare by identity, so that forks can be tracked.
+@dataclass(eq=False)
 class FakeDataStore(StateView, RemoteCache):
     data: Mapping[AccessPath, bytes]
     named_accounts: Mapping[str, bytes] = field(default_factory=dict)
+    base: Optional[FakeDataStore] = None
+    deleted: Set[AccessPath] = field(default_factory=set)
+    forks: weakref.WeakSet = field(default_factory=weakref.WeakSet, repr=False)
+
+    # Creates a data store with the state of this one, which can be written to independently.
+    #
+    # This data store becomes read only until the fork is merged, discarded or dropped.
+    def fork(self) -> FakeDataStore:
+        fork = FakeDataStore({}, ChainMap({}, self.named_accounts), self)
+        self.forks.add(fork)
+        return fork
+
+    # Drops this fork, leaving its parent as it was when it was forked.
+    def discard(self) -> None:
+        ensure(self.base is not None, "only a fork can be discarded")
+        self.base.forks.discard(self)
+        self.base = None
+        self.data = {}
+        self.deleted = set()
+
+    # Applies the changes made in this fork to its parent, then discards it.
+    #
+    # Returns the parent. Fails if the parent has other live forks, as they would see the changes.
+    def merge(self) -> FakeDataStore:
+        base = self.base
+        ensure(base is not None, "only a fork can be merged")
+        ensure(
+            len(base.forks) == 1,
+            "cannot merge into a data store with {} live forks",
+            len(base.forks),
+        )
+        base.forks.discard(self)
+        for access_path in self.deleted:
+            base.remove(access_path)
+        for (access_path, blob) in self.data.items():
+            base.set(access_path, blob)
+        base.named_accounts.update(self.named_accounts.maps[0])
+        self.discard()
+        return base
+
+    # Number of data stores under this one, 0 for a data store that is not a fork.
+    def depth(self) -> int:
+        depth = 0
+        base = self.base
+        while base is not None:
+            depth += 1
+            base = base.base
+        return depth
+
+    # Iterates over every (key, value) pair visible in this data store.
+    def items(self) -> Iterator[Tuple[AccessPath, bytes]]:
+        yield from self.data.items()
+        if self.base is not None:
+            for (access_path, blob) in self.base.items():
+                if access_path not in self.data and access_path not in self.deleted:
+                    yield (access_path, blob)
+
+    def ensure_writable(self) -> None:
+        ensure(
+            not self.forks,
+            "cannot write to a data store with {} live forks",
+            len(self.forks),
+        )
 
     def print_account_resource(self, only_balance=False, show_genesis=False):
-        for ap, blob in self.data.items():
+        for ap, blob in self.items():
             #TTODO: account_resource_path to AccountResource.resource_path
             #TTODO: balance is not in AccountResource
             if ap.path == AccountConfig.account_resource_path():
@@ -76,23 +161,23 @@ class FakeDataStore(StateView, RemoteCache):
     #
     # Returns the previous data if the key was occupied.
     def set(self, access_path: AccessPath, data_blob: bytes) -> Optional[bytes]:
-        if access_path in self.data:
-            ret = self.data[access_path]
-            self.data[access_path] = data_blob
-            return ret
-        else:
-            self.data[access_path] = data_blob
-            return None
+        self.ensure_writable()
+        ret = self.get(access_path)
+        self.data[access_path] = data_blob
+        self.deleted.discard(access_path)
+        return ret
 
 
     # Deletes a key from this data store.
     #
     # Returns the previous data if the key was occupied.
     def remove(self, access_path: AccessPath) -> Optional[bytes]:
-        if access_path in self.data:
-            return self.data.pop(access_path)
-        else:
-            return None
+        self.ensure_writable()
+        ret = self.get(access_path)
+        self.data.pop(access_path, None)
+        if self.base is not None and self.base.get(access_path) is not None:
+            self.deleted.add(access_path)
+        return ret
 
 
     # Adds an [`AccountData`] to this data store.
@@ -123,16 +208,20 @@ class FakeDataStore(StateView, RemoteCache):
 # TODO: only the "sync" get is implemented
 # impl StateView for FakeDataStore {
     def get(self, access_path: AccessPath) -> Optional[bytes]:
-        if access_path in self.data:
-            return self.data[access_path]
-        else:
-            return None
+        store = self
+        while store is not None:
+            if access_path in store.data:
+                return store.data[access_path]
+            if access_path in store.deleted:
+                return None
+            store = store.base
+        return None
 
     def multi_get(self, _access_paths: List[AccessPath]) -> List[Optional[bytes]]:
         bail("unimplemented")
 
     def is_genesis(self) -> bool:
-        return not self.data
+        return next(self.items(), None) is None
 
 
 # This is used by the `process_transaction` API.
@@ -1,6 +1,6 @@
 from __future__ import annotations
 from mol.e2e_tests.account import Account, AccountData
-from mol.e2e_tests.data_store import FakeDataStore, GENESIS_WRITE_SET
+from mol.e2e_tests.data_store import FakeDataStore, genesis_write_set
 from mol.bytecode_verifier import VerifiedModule
 from libra_storage.state_view import StateView
 from libra import AccessPath, AccountResource
@@ -40,7 +40,7 @@ def test_all_genesis_impl(
     publishing_options: Optional[VMPublishingOption],
     test_fn: Callable[[FakeExecutor], None],
 ) -> None:
-    ws = GENESIS_WRITE_SET
+    ws = genesis_write_set()
     test_fn(FakeExecutor.from_genesis(ws, publishing_options))
 
 
@@ -56,6 +56,22 @@ def test_all_genesis(
 
 
 
+# The last genesis [`WriteSet`] an executor was created from, with the data store it wrote.
+#
+# Executors created from the same write set again get a fork of that data store instead of
+# replaying the write set. The data store itself is never written to.
+GENESIS_DATA_STORE: Optional[Tuple[WriteSet, FakeDataStore]] = None
+
+
+def genesis_data_store(write_set: WriteSet) -> FakeDataStore:
+    global GENESIS_DATA_STORE
+    if GENESIS_DATA_STORE is None or GENESIS_DATA_STORE[0] is not write_set:
+        data_store = FakeDataStore({})
+        data_store.add_write_set(write_set)
+        GENESIS_DATA_STORE = (write_set, data_store)
+    return GENESIS_DATA_STORE[1]
+
+
 # Provides an environment to run a VM instance.
 #
 # This class is a mock in-memory implementation of the Libra executor.
@@ -69,18 +85,37 @@ class FakeExecutor:
     def from_genesis(cls,
         write_set: WriteSet,
     ) -> FakeExecutor:
-        executor = FakeExecutor(
-            FakeDataStore({}),
+        return FakeExecutor(
+            genesis_data_store(write_set).fork(),
             0,
         )
-        executor.apply_write_set(write_set)
-        return executor
+
+
+    # Creates an executor with the state of this one, in O(1). Transactions applied to either
+    # executor are not seen by the other one.
+    #
+    # This executor becomes read only until the fork is merged, discarded or dropped.
+    def fork(self) -> FakeExecutor:
+        return FakeExecutor(self.data_store.fork(), self.block_time)
+
+
+    # Applies the state of a fork of this executor back to it, and discards the fork.
+    def merge(self, fork: FakeExecutor):
+        ensure(fork.data_store.base is self.data_store, "not a fork of this executor")
+        fork.data_store.merge()
+        self.block_time = fork.block_time
+
+
+    # Drops the state of a fork of this executor.
+    def discard(self, fork: FakeExecutor):
+        ensure(fork.data_store.base is self.data_store, "not a fork of this executor")
+        fork.data_store.discard()
 
 
     # Creates an executor from the genesis file GENESIS_FILE_LOCATION
     @classmethod
     def from_genesis_file(cls) -> FakeExecutor:
-        return cls.from_genesis(GENESIS_WRITE_SET)
+        return cls.from_genesis(genesis_write_set())
 
 
     # Creates an executor from the genesis file GENESIS_FILE_LOCATION with script/module
@@ -91,7 +126,7 @@ class FakeExecutor:
         if VMPublishingOption.Locked == publishing_options:
             bail("Whitelisted transactions are not supported as a publishing option")
 
-        return cls.from_genesis(GENESIS_WRITE_SET, publishing_options)
+        return cls.from_genesis(genesis_write_set(), publishing_options)
 
 
     # Creates an executor in which no genesis state has been applied yet.
@@ -111,9 +146,9 @@ class FakeExecutor:
         publishing_options: VMPublishingOption,
     ) -> FakeExecutor:
         if genesis_modules is None and validator_set is None:
-            genesis_write_set = GENESIS_WRITE_SET.raw_txn.payload.value.write_set
+            write_set = genesis_write_set().raw_txn.payload.value.write_set
         elif validator_set is None:
-            genesis_write_set = GENESIS_WRITE_SET.raw_txn.payload.value.write_set
+            write_set = genesis_write_set().raw_txn.payload.value.write_set
         else:
             discovery_set = make_placeholder_discovery_set(validator_set)
             if genesis_modules:
@@ -128,9 +163,9 @@ class FakeExecutor:
                 discovery_set,
                 stdlib_modules,
             )
-            genesis_write_set = txn.into_inner().payload.value.write_set
+            write_set = txn.into_inner().payload.value.write_set
 
-        return cls.from_genesis(genesis_write_set)
+        return cls.from_genesis(write_set)
 
 
     # Creates a number of [`Account`] instances all with the same balance and sequence number,
@@ -139,7 +174,7 @@ class FakeExecutor:
         accounts: List[Account] = []
         for _i in range(size):
             account_data = AccountData.new(balance, seq_num)
-            self.add_account_data(account_data)
+            self.add_account_data(account_data.address().hex(), account_data)
             accounts.append(account_data.into_account())
 
         return accounts
@@ -1,11 +1,8 @@
 from mol.bytecode_verifier.verifier import VerifiedModule
 from mol.functional_tests.compiler import Compiler, ScriptOrModule
 from mol.compiler.bytecode_source_map.mapping import SourceMapping
-from mol.compiler.ir_to_bytecode.compiler import compile_module, compile_script
-from mol.compiler.ir_to_bytecode.parser import parse_script_or_module
+from mol.compiler.compile_cache import CompileCache, compile_with_cache
 from libra.account_address import Address
-from libra.rustlib import format_str
-from mol.move_ir.types import ast
 from mol.stdlib import stdlib_modules
 from typing import List, Optional, Callable
 from pathlib import Path
@@ -13,10 +10,12 @@ from pathlib import Path
 
 class IRCompiler(Compiler):
 
-    def __init__(self, deps: List[VerifiedModule] = None):
+    # With a `cache`, sources compiled before against the same dependencies are not recompiled.
+    def __init__(self, deps: List[VerifiedModule] = None, cache: Optional[CompileCache] = None):
         if deps is None:
             deps = stdlib_modules()
         self.deps = deps
+        self.cache = cache
         self.output_source_maps = False
 
     def write_sourcemap(self, path, source_map, source):
@@ -39,12 +38,11 @@ class IRCompiler(Compiler):
             # don't use real path to compile, otherwise the output will contain source_mapping text
             # which will cause the testcases failed, such as "break_outside_loop.mvir"
             path = "unused_file_name"
-        sorm = parse_script_or_module(path, ins)
+        unit = compile_with_cache(self.cache, path, ins, address, self.deps)
+        log(unit.parsed)
 
-        if sorm.tag == ast.ScriptOrModule.SCRIPT:
-            parsed_script = sorm.value
-            log(format_str("{}", parsed_script))
-            script, source_map = compile_script(address, parsed_script, self.deps)
+        if unit.is_script():
+            script, source_map = unit.script, unit.source_map
             self.write_sourcemap(path, source_map, ins)
 
             if self.output_source_maps:
@@ -54,10 +52,8 @@ class IRCompiler(Compiler):
                 source_mapping = None
             return ScriptOrModule(script=script, source_map=source_map, source_mapping=source_mapping)
 
-        elif sorm.tag == ast.ScriptOrModule.MODULE:
-            parsed_module = sorm.value
-            log(format_str("{}", parsed_module))
-            module, source_map = compile_module(address, parsed_module, self.deps)
+        else:
+            module, source_map = unit.module, unit.source_map
             self.write_sourcemap(path, source_map, ins)
 
             if self.output_source_maps:
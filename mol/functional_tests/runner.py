@@ -0,0 +1,292 @@
+from __future__ import annotations
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from mol.compiler.ir_to_bytecode.context import CompiledDependency
+from mol.e2e_tests.executor import FakeExecutor, VMPublishingOption
+from mol.functional_tests import testsuite
+from mol.functional_tests.ir_compiler import IRCompiler
+from mol.global_source_mapping import GlobalSourceMapping
+from mol.move_vm.runtime.code_cache import (
+    build_shared_module_cache, fork_context, install_shared_module_cache,
+)
+from mol.move_vm.runtime.coverage import Coverage
+from mol.stdlib import stdlib_modules
+from dataclasses import asdict, dataclass
+from multiprocessing.connection import wait
+from pathlib import Path
+from typing import List, Optional
+from xml.etree import ElementTree
+import argparse
+import contextlib
+import io
+import json
+import time
+import traceback
+
+# Parallel runner for the IR functional testsuite.
+#
+#   python mol/functional_tests/runner.py ir-testsuite/tests -j 8 --junit report.xml
+#
+# The runner warms up once: the stdlib is verified and loaded into the shared module cache, a
+# genesis executor is built, and the compiler's view of every stdlib module is prepared. Each
+# case then runs in a process forked from that state, so it starts warm but cannot leak state
+# into the other cases (`IRCompiler` appends the modules it compiles to its dependencies).
+#
+# A case running longer than `--timeout` seconds is killed and reported as such. The results,
+# with the wall time of every case, can be written as JUnit XML and as JSON; the slowest cases
+# are listed at the end of the run.
+#
+# With `--lcov` or `--cobertura`, every case records the code coverage of the Move functions it
+# runs, and the coverage of all the cases is reported for the stdlib modules. `--coverage-data`
+# saves the merged bitmaps, to be merged with those of other runs by `coverage_main.py`.
+
+# Cases known to fail, skipped by both this runner and the pytest collection of the suite.
+FAILED_CASES = [
+    "reconfiguration_via_network_address_rotation.mvir",
+    "tests/generics/instantiation_loops/recursive_struct.mvir",
+    "transaction_fee_distribution",
+    "validator_set/reconfiguration_via_key_rotation.mvir",
+    "tests/validator_set/register_validator.mvir",
+    "tests/borrow_tests/eq_bad.mvir",
+]
+
+PASSED = "passed"
+FAILED = "failed"
+ERROR = "error"
+TIMEOUT = "timeout"
+
+
+def is_failed_case(file: str) -> bool:
+    for x in FAILED_CASES:
+        if file.find(x) != -1:
+            return True
+    return False
+
+
+# Return the `.mvir` cases under `root`, which is a directory or a single case.
+def collect_cases(root: str) -> List[str]:
+    if os.path.isfile(root):
+        return [root]
+    cases = []
+    for (dirpath, _, files) in os.walk(root):
+        for file in files:
+            if file.endswith(".mvir"):
+                fullname = os.path.join(dirpath, file)
+                if not is_failed_case(fullname):
+                    cases.append(fullname)
+    return cases
+
+
+@dataclass
+class CaseResult:
+    path: str
+    outcome: str
+    # Wall time of the case in seconds, from the fork to the result.
+    time: float
+    message: str = ""
+
+    def is_success(self) -> bool:
+        return self.outcome == PASSED
+
+
+# Prepare the state every case starts from. Must run in the parent before any case is forked.
+def warm_up() -> None:
+    stdlib = stdlib_modules()
+    for module in stdlib:
+        CompiledDependency.cached(module)
+    FakeExecutor.custom_genesis(stdlib, None, VMPublishingOption.Open)
+    install_shared_module_cache(build_shared_module_cache(stdlib))
+
+
+# Run the case at `path` in this process.
+def run_case(path: str) -> CaseResult:
+    start = time.perf_counter()
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            testsuite.functional_tests(IRCompiler(list(stdlib_modules())), path)
+        outcome = PASSED
+        message = ""
+    except AssertionError as err:
+        outcome = FAILED
+        message = f"{err}\n{output.getvalue()}"
+    except Exception:
+        outcome = ERROR
+        message = f"{traceback.format_exc()}\n{output.getvalue()}"
+    return CaseResult(path, outcome, time.perf_counter() - start, message)
+
+
+# Run the case at `path`, and send its result and its coverage data, if `coverage`, to `conn`.
+def case_worker(path: str, conn, coverage: bool = False) -> None:
+    if coverage:
+        with Coverage() as case_coverage:
+            result = run_case(path)
+        conn.send((result, case_coverage.to_data()))
+    else:
+        conn.send((run_case(path), None))
+    conn.close()
+
+
+# Run `cases` on up to `jobs` forked processes, killing the ones running longer than `timeout`
+# seconds. Results are in the order of `cases`. `report` is called on every result as it comes.
+# The coverage data of the cases are merged into `coverage`, if any.
+def run_cases(
+    cases: List[str],
+    jobs: int,
+    timeout: Optional[float],
+    report=None,
+    coverage: Optional[Coverage] = None,
+) -> List[CaseResult]:
+    ctx = fork_context()
+    pending = list(reversed(list(enumerate(cases))))
+    running = {}
+    results = [None] * len(cases)
+
+    def finish(idx: int, result: CaseResult) -> None:
+        results[idx] = result
+        if report is not None:
+            report(result)
+
+    while pending or running:
+        while pending and len(running) < jobs:
+            (idx, path) = pending.pop()
+            (reader, writer) = ctx.Pipe(duplex=False)
+            process = ctx.Process(
+                target=case_worker, args=(path, writer, coverage is not None), daemon=True,
+            )
+            process.start()
+            writer.close()
+            running[reader] = (idx, path, process, time.perf_counter())
+
+        wait_for = None
+        if timeout is not None:
+            deadline = min(start for (_, _, _, start) in running.values()) + timeout
+            wait_for = max(0.0, deadline - time.perf_counter())
+        ready = wait(list(running), wait_for)
+
+        now = time.perf_counter()
+        for (reader, (idx, path, process, start)) in list(running.items()):
+            if reader in ready:
+                try:
+                    (result, data) = reader.recv()
+                    result.time = now - start
+                    if data is not None:
+                        coverage.merge(data)
+                except EOFError:
+                    process.join()
+                    result = CaseResult(
+                        path, ERROR, now - start, f"worker exited with {process.exitcode}",
+                    )
+            elif timeout is not None and now - start >= timeout:
+                process.kill()
+                result = CaseResult(path, TIMEOUT, now - start, f"timed out after {timeout}s")
+            else:
+                continue
+            process.join()
+            reader.close()
+            del running[reader]
+            finish(idx, result)
+    return results
+
+
+def write_json(results: List[CaseResult], path: str) -> None:
+    total = sum(result.time for result in results)
+    data = {
+        "total_time": total,
+        "counts": {
+            outcome: sum(1 for result in results if result.outcome == outcome)
+            for outcome in [PASSED, FAILED, ERROR, TIMEOUT]
+        },
+        "cases": [asdict(result) for result in results],
+    }
+    Path(path).write_text(json.dumps(data, indent=2))
+
+
+def write_junit(results: List[CaseResult], path: str) -> None:
+    suite = ElementTree.Element("testsuite", {
+        "name": "ir-testsuite",
+        "tests": str(len(results)),
+        "failures": str(sum(1 for result in results if result.outcome == FAILED)),
+        "errors": str(sum(1 for result in results if result.outcome in [ERROR, TIMEOUT])),
+        "time": f"{sum(result.time for result in results):.3f}",
+    })
+    for result in results:
+        case = ElementTree.SubElement(suite, "testcase", {
+            "classname": os.path.dirname(result.path),
+            "name": os.path.basename(result.path),
+            "time": f"{result.time:.3f}",
+        })
+        if result.outcome == FAILED:
+            ElementTree.SubElement(case, "failure", {"message": "failed"}).text = result.message
+        elif result.outcome != PASSED:
+            ElementTree.SubElement(case, "error", {"message": result.outcome}).text = result.message
+    ElementTree.ElementTree(suite).write(path, encoding="utf-8", xml_declaration=True)
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(prog='IR testsuite runner', add_help=True)
+    parser.add_argument('paths', nargs='*', help='Directories or .mvir cases, defaults to ir-testsuite/tests')
+    parser.add_argument('-j', "--jobs", type=int, default=os.cpu_count(), help='Number of cases run in parallel')
+    parser.add_argument("--timeout", type=float, default=300, help='Seconds after which a case is killed, 0 for none')
+    parser.add_argument('-k', dest='keyword', help='Only run the cases whose path contains this string')
+    parser.add_argument("--junit", help='Write a JUnit XML report to this file')
+    parser.add_argument("--json", help='Write a JSON report to this file')
+    parser.add_argument("--slowest", type=int, default=10, help='Number of slowest cases to list')
+    parser.add_argument("--lcov", help='Write the lcov coverage of the stdlib to this file')
+    parser.add_argument("--cobertura", help='Write the Cobertura coverage of the stdlib to this file')
+    parser.add_argument("--coverage-data", help='Write the merged coverage bitmaps to this file')
+    return parser
+
+
+def main(argv=None):
+    args = get_parser().parse_args(argv)
+    paths = args.paths
+    if not paths:
+        paths = [os.path.normpath(os.path.join(os.path.dirname(__file__), "../../ir-testsuite/tests"))]
+    cases = sorted(case for path in paths for case in collect_cases(path))
+    if args.keyword:
+        cases = [case for case in cases if args.keyword in case]
+
+    start = time.perf_counter()
+    warm_up()
+    warm_up_time = time.perf_counter() - start
+
+    def report(result: CaseResult) -> None:
+        if not result.is_success():
+            print(f"{result.outcome.upper()} {result.path} ({result.time:.2f}s)")
+            print(result.message)
+
+    coverage = None
+    if args.lcov or args.cobertura or args.coverage_data:
+        coverage = Coverage()
+    results = run_cases(cases, max(args.jobs or 1, 1), args.timeout or None, report, coverage)
+    wall_time = time.perf_counter() - start
+
+    if args.json:
+        write_json(results, args.json)
+    if args.junit:
+        write_junit(results, args.junit)
+    if coverage is not None:
+        GlobalSourceMapping.init_std_mapping()
+        if args.coverage_data:
+            coverage.save(args.coverage_data)
+        if args.lcov:
+            coverage.write_lcov(args.lcov, GlobalSourceMapping.std_modules)
+        if args.cobertura:
+            coverage.write_cobertura(args.cobertura, GlobalSourceMapping.std_modules)
+
+    print(f"slowest {args.slowest} cases:")
+    for result in sorted(results, key=lambda result: -result.time)[:args.slowest]:
+        print(f"    {result.time:7.2f}s {result.path}")
+    counts = [
+        f"{sum(1 for result in results if result.outcome == outcome)} {outcome}"
+        for outcome in [PASSED, FAILED, ERROR, TIMEOUT]
+    ]
+    print(f"{', '.join(counts)} in {wall_time:.2f}s (warm-up {warm_up_time:.2f}s)")
+    if any(not result.is_success() for result in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
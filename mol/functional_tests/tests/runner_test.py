@@ -0,0 +1,59 @@
+from mol.functional_tests import runner
+from mol.functional_tests.runner import (
+    PASSED, TIMEOUT, collect_cases, is_failed_case, run_cases, write_json, write_junit,
+)
+from mol.move_vm.runtime.coverage import Coverage
+from libra.rustlib import assert_equal
+from xml.etree import ElementTree
+import json
+import os
+import time
+
+CASES = os.path.join(os.path.dirname(__file__), "../../../ir-testsuite/tests")
+
+
+def test_collect_cases_skips_failed_cases():
+    cases = collect_cases(CASES)
+    assert len(cases) > 0
+    assert all(case.endswith(".mvir") for case in cases)
+    assert not any(is_failed_case(case) for case in cases)
+
+
+def test_run_cases(tmp_path, monkeypatch):
+    passing = os.path.join(CASES, "commands/assign_copy.mvir")
+    hanging = "hanging.mvir"
+    functional_tests = runner.testsuite.functional_tests
+
+    # Workers are forked, so they see the patched testsuite.
+    def hang(compiler, path):
+        if path == hanging:
+            time.sleep(60)
+        functional_tests(compiler, path)
+
+    monkeypatch.setattr(runner.testsuite, "functional_tests", hang)
+    results = run_cases([passing, hanging], 2, 5)
+    assert_equal([result.outcome for result in results], [PASSED, TIMEOUT])
+    assert_equal(results[0].path, passing)
+    assert results[1].time >= 5
+
+    write_json(results, tmp_path / "report.json")
+    report = json.loads((tmp_path / "report.json").read_text())
+    assert_equal(report["counts"], {"passed": 1, "failed": 0, "error": 0, "timeout": 1})
+
+    write_junit(results, tmp_path / "report.xml")
+    suite = ElementTree.parse(tmp_path / "report.xml").getroot()
+    assert_equal(suite.get("tests"), "2")
+    assert_equal(suite.get("errors"), "1")
+    assert_equal(suite.findall("testcase")[1].find("error").get("message"), TIMEOUT)
+
+
+def test_run_cases_with_coverage():
+    payment = os.path.join(CASES, "payments/peer_to_peer_payment.mvir")
+    coverage = Coverage()
+    results = run_cases([payment], 1, None, coverage=coverage)
+    assert_equal([result.outcome for result in results], [PASSED])
+    # The coverage recorded by the worker is merged into the runner's.
+    assert any(
+        qual_name.endswith("::LibraAccount") and bitmap != 0
+        for ((qual_name, _), bitmap) in coverage.bitmaps.items()
+    )
@@ -1,4 +1,4 @@
-from typing import Mapping, Optional
+from typing import List, Mapping, Optional, Tuple
 from mol.compiler.bytecode_source_map.mapping import SourceMapping
 from mol.compiler.bytecode_source_map.utils import source_map_from_file
 from libra import Address
@@ -25,17 +25,31 @@ def snake_to_camel(word):
     return ''.join(x.capitalize() for x in word.split('_'))
 
 
+# Registry of the source mappings of the modules, keyed by "address::Module".
+#
+# The stdlib modules are only indexed by `init_std_mapping`: the source map and source code of a
+# module are read the first time it is looked up. Lookups of modules without a mapping are
+# cached too, until a mapping is added for them.
 class GlobalSourceMapping:
-    mapping: Mapping[str, SourceMapping] = {}
+    # Mapping of every module looked up or added so far, `None` for modules without one.
+    mapping: Mapping[str, Optional[SourceMapping]] = {}
+    # The (.mv, .mvsm, .move) files of every stdlib module not loaded yet.
+    std_files: Mapping[str, Tuple[Path, Path, Path]] = {}
+    std_indexed: bool = False
+    # The qualified name of every stdlib module.
+    std_modules: List[str] = []
     move2mvsm: Mapping[str, str] = {}
 
 
     @classmethod
     def init_std_mapping(cls) -> None:
+        if cls.std_indexed:
+            return
         address = Address.default().hex()
         curdir = dirname(__file__)
         path = join(curdir, "./stdlib/modules/")
         mvs = [f for f in listdir(path) if f.endswith(".mv")]
+        std_modules = []
         for x in mvs:
             module = x.split(".")[0]
             mv = Path(join(path, x))
@@ -43,13 +57,23 @@ class GlobalSourceMapping:
             move = Path(join(path, camel_to_snake(module))).with_suffix(".move")
             if move.exists() and mvsm.exists():
                 qual_name = "::".join([address, module])
-                source_map = source_map_from_file(mvsm)
-                mapping = SourceMapping(source_map, mv.read_bytes())
-                mapping.with_source_code(str(move), move.read_text())
-                cls.mapping[qual_name] = mapping
+                std_modules.append(qual_name)
+                if cls.mapping.get(qual_name) is None:
+                    cls.mapping.pop(qual_name, None)
+                    cls.std_files[qual_name] = (mv, mvsm, move)
                 cls.move2mvsm[str(move)] = str(mvsm)
             else:
                 bail(f"can't find source or mapping for {mv}")
+        cls.std_modules = std_modules
+        cls.std_indexed = True
+
+    @classmethod
+    def load_std_mapping(cls, qual_name: str) -> SourceMapping:
+        (mv, mvsm, move) = cls.std_files.pop(qual_name)
+        source_map = source_map_from_file(mvsm)
+        mapping = SourceMapping(source_map, mv.read_bytes())
+        mapping.with_source_code(str(move), move.read_text())
+        return mapping
 
     @classmethod
     def add(cls, address: str, module: str, mapping: SourceMapping) -> None:
@@ -58,16 +82,20 @@ class GlobalSourceMapping:
 
     @classmethod
     def add_mapping(cls, qual_name: str, mapping: SourceMapping) -> None:
-        if not cls.mapping:
-            cls.init_std_mapping()
+        cls.std_files.pop(qual_name, None)
         cls.mapping[qual_name] = mapping
 
     @classmethod
     def find_mapping(cls, qual_name: str) -> Optional[SourceMapping]:
         if qual_name in cls.mapping:
             return cls.mapping[qual_name]
+        cls.init_std_mapping()
+        if qual_name in cls.std_files:
+            mapping = cls.load_std_mapping(qual_name)
         else:
-            return None
+            mapping = None
+        cls.mapping[qual_name] = mapping
+        return mapping
 
     @classmethod
     def find(cls, address: str, module: str) -> Optional[SourceMapping]:
@@ -5,6 +5,9 @@ from mol.move_vm.state.execution_context import SystemExecutionContext, Transact
 from mol.libra_vm.counters import *
 from mol.move_vm.state.data_cache import BlockDataCache, RemoteCache, RemoteStorage
 from mol.move_vm.runtime.move_vm import MoveVM
+from mol.move_vm.runtime.code_cache import VMModuleCache
+from mol.move_vm.runtime.execution_counters import ExecutionCounters
+from mol.move_vm.runtime.gas_meter import GasProfiler
 from mol.libra_vm.lib import VMVerifier, VMExecutor
 from mol.libra_vm.system_module_names import *
 from libra_storage.state_view import StateView
@@ -13,6 +16,7 @@ from libra import Address
 from libra.account_config import AccountConfig, CORE_CODE_ADDRESS
 from libra.hasher import HashValue
 from libra.block_metadata import BlockMetadata
+from libra.validator_set import ValidatorSet
 from libra.transaction import (
     ChangeSet, SignatureCheckedTransaction, SignedTransaction, Transaction,
     TransactionArgument, TransactionOutput, TransactionPayload, TransactionStatus,
@@ -29,9 +33,10 @@ from mol.vm.gas_schedule import (
 from mol.vm.transaction_metadata import TransactionMetadata
 from mol.move_vm.types.values import Value
 from dataclasses import dataclass
-from typing import List, Optional, Mapping, Union
+from typing import List, Optional, Mapping, Tuple, Union
 from libra.rustlib import usize, bail
 from canoser import RustEnum, Uint64, MapT, BytesT
+import contextlib
 import traceback
 import logging
 
@@ -43,10 +48,64 @@ logger = logging.getLogger(__name__)
 class LibraVM(VMVerifier, VMExecutor):
     move_vm: MoveVM
     gas_schedule: Optional[CostTable] = None
+    # Opcode and native function counters of the blocks executed, when enabled.
+    counters: Optional[ExecutionCounters] = None
+    # Attribution of the gas of the transaction being dry run, if any.
+    gas_profiler: Optional[GasProfiler] = None
 
     @classmethod
-    def new(cls) -> LibraVM:
-        return cls(MoveVM.new(), None)
+    def new(cls, code_cache: Optional[VMModuleCache] = None) -> LibraVM:
+        return cls(MoveVM.new(code_cache), None)
+
+
+    # Count the executions of every opcode and native function in the blocks this VM executes
+    # from now on, per block and per transaction. Execution is slower while counting.
+    def enable_counters(self, sample_rate: int = 16) -> ExecutionCounters:
+        self.counters = ExecutionCounters(sample_rate)
+        return self.counters
+
+
+    # Stop counting, and return the counters collected so far.
+    def disable_counters(self) -> Optional[ExecutionCounters]:
+        ret = self.counters
+        self.counters = None
+        return ret
+
+
+    # Execute `transaction` on top of `state_view` without committing anything, and attribute the
+    # gas units it uses to the functions it runs, and to the opcodes and native functions they
+    # pay for. Return the output of the transaction and the root of the attribution tree.
+    def dry_run(
+        self,
+        transaction: SignedTransaction,
+        state_view: StateView,
+    ) -> Tuple[TransactionOutput, GasProfiler]:
+        gas_profiler = GasProfiler()
+        self.gas_profiler = gas_profiler
+        try:
+            outputs = self.execute_block_impl(
+                [Transaction('UserTransaction', transaction)],
+                state_view,
+            )
+        finally:
+            self.gas_profiler = None
+        return (outputs[0], gas_profiler)
+
+
+    # Make the counters of this VM, if any, record a new block for the duration of the context.
+    @contextlib.contextmanager
+    def counting_block(self):
+        counters = self.counters
+        if counters is None:
+            yield
+            return
+        counters.begin_block()
+        previous = ExecutionCounters.active
+        ExecutionCounters.active = counters
+        try:
+            yield
+        finally:
+            ExecutionCounters.active = previous
 
 
     # Provides access to some internal APIs of the Libra VM.
@@ -269,6 +328,7 @@ class LibraVM(VMVerifier, VMExecutor):
         payload: VerifiedTranscationPayload,
     ) -> TransactionOutput:
         ctx = TransactionExecutionContext.new(txn_data.max_gas_amount, remote_cache)
+        ctx.gas_profiler = self.gas_profiler
         # TODO: The logic for handling falied transaction fee is pretty ugly right now. Fix it later.
         failed_gas_left = GasUnits.new(0)
         try:
@@ -342,6 +402,8 @@ class LibraVM(VMVerifier, VMExecutor):
         txn: SignatureCheckedTransaction,
     ) -> TransactionOutput:
         txn_data = TransactionMetadata.new(txn.into_inner())
+        if self.counters is not None:
+            self.counters.begin_transaction(txn_data.sender.hex(), txn_data.sequence_number)
         try:
             verified_payload = self.verify_transaction_impl(txn, state_view, remote_cache)
             result = self.execute_verified_payload(
@@ -354,10 +416,30 @@ class LibraVM(VMVerifier, VMExecutor):
 
         if TransactionStatus.Keep == result.status.tag:
             remote_cache.push_write_set(result.write_set)
+            self.invalidate_caches(result, remote_cache)
 
+        if self.counters is not None:
+            self.counters.end_transaction()
         return result
 
 
+    # Drop the cached code a committed transaction output makes stale, so that the same VM can
+    # keep its caches across transactions and blocks. A write to a code access path invalidates
+    # that module and its dependents; a reconfiguration event flushes every cache and reloads the
+    # on-chain configs.
+    def invalidate_caches(
+        self,
+        output: TransactionOutput,
+        data_cache: RemoteCache,
+    ) -> None:
+        change_event_key = ValidatorSet.change_event_key()
+        if any(event.key == change_event_key for event in output.events):
+            self.move_vm.flush()
+            self.load_configs_impl(data_cache)
+        else:
+            self.move_vm.invalidate_write_set(output.write_set)
+
+
     def process_change_set(
         self,
         remote_cache: BlockDataCache,
@@ -365,6 +447,7 @@ class LibraVM(VMVerifier, VMExecutor):
     ) -> TransactionOutput:
         (write_set, events) = change_set.into_inner()
         remote_cache.push_write_set(write_set)
+        self.move_vm.invalidate_write_set(write_set)
         self.load_configs_impl(remote_cache)
         return TransactionOutput(
             write_set,
@@ -413,6 +496,7 @@ class LibraVM(VMVerifier, VMExecutor):
             output = interpreter_context\
                 .get_transaction_output(txn_data, VMStatus(StatusCode.EXECUTED))
             remote_cache.push_write_set(output.write_set)
+            self.invalidate_caches(output, remote_cache)
             return output
         except Exception:
             traceback.print_exc()
@@ -492,19 +576,20 @@ class LibraVM(VMVerifier, VMExecutor):
         blocks = chunk_block_transactions(transactions)
         data_cache = BlockDataCache.new(state_view)
         self.load_configs_impl(data_cache)
-        for block in blocks:
-            if block.UserTransaction:
-                outs =\
-                    self.execute_user_transactions(block.value, data_cache, state_view)
-                result.extend(outs)
-            elif block.BlockPrologue:
-                result.append(self.process_block_prologue(data_cache, block.value))
-            elif block.WriteSet:
-                change_set = block.value
-                self.check_change_set(change_set, state_view)
-                out = self.process_change_set(data_cache, change_set)
-                # .unwrap_or_else(discard_error_output)
-                result.append(out)
+        with self.counting_block():
+            for block in blocks:
+                if block.UserTransaction:
+                    outs =\
+                        self.execute_user_transactions(block.value, data_cache, state_view)
+                    result.extend(outs)
+                elif block.BlockPrologue:
+                    result.append(self.process_block_prologue(data_cache, block.value))
+                elif block.WriteSet:
+                    change_set = block.value
+                    self.check_change_set(change_set, state_view)
+                    out = self.process_change_set(data_cache, change_set)
+                    # .unwrap_or_else(discard_error_output)
+                    result.append(out)
 
         report_block_count(count)
         return result
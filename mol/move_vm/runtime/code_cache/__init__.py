@@ -1,2 +1,3 @@
 from mol.move_vm.runtime.code_cache.module_cache import *
-from mol.move_vm.runtime.code_cache.script_cache import *
\ No newline at end of file
+from mol.move_vm.runtime.code_cache.script_cache import *
+from mol.move_vm.runtime.code_cache.shared_cache import *
\ No newline at end of file
@@ -3,6 +3,8 @@ from mol.move_vm.runtime.interpreter_context import InterpreterContext
 from mol.move_vm.runtime.loaded_data import FunctionRef, FunctionReference, LoadedModule
 from mol.bytecode_verifier import VerifiedModule
 
+from libra.access_path import AccessPath
+from libra.hasher import HashValue
 from libra.language_storage import ModuleId
 from libra.vm_error import StatusCode, VMStatus
 from mol.vm.vm_exception import VMException
@@ -16,7 +18,7 @@ from mol.vm.views import FunctionHandleView, StructHandleView
 from mol.move_vm.types.loaded_data import StructDef, Type
 from mol.move_vm.types.native_structs import resolve_native_struct
 from mol.move_vm.types.type_context import TypeContext
-from typing import List, Optional, Mapping
+from typing import List, Optional, Mapping, Set, Iterable
 from dataclasses import dataclass, field
 from copy import deepcopy
 # Cache for modules published on chain.
@@ -26,9 +28,22 @@ from copy import deepcopy
 # Cache for modules that resides in a VM. It is an internally mutable map from module
 # identifier to a reference to loaded module, where the actual module is owned by the Arena
 # allocator so that it will guarantee to outlive the lifetime of the transaction.
+#
+# Every entry remembers the SHA3 hash of the code blob it was loaded from, so that a long-lived
+# cache can tell when the code under a module id has changed. Entries are dropped through
+# `invalidate`, `invalidate_access_paths` and `flush`, together with every cached module that
+# (transitively) imports them, since their resolved struct defs and linking depend on it.
+#
+# The hashes of all the blobs that passed verification are kept in `verified` across
+# invalidations. When such a blob is loaded again it is not verified a second time, and is
+# deserialized lazily so that only the function bodies that get executed are decoded.
 @dataclass
 class VMModuleCache:
     cmap: Mapping[ModuleId, LoadedModule] = field(default_factory=dict)
+    versions: Mapping[ModuleId, HashValue] = field(default_factory=dict)
+    code_paths: Mapping[AccessPath, ModuleId] = field(default_factory=dict)
+    dependents: Mapping[ModuleId, Set[ModuleId]] = field(default_factory=dict)
+    verified: Set[HashValue] = field(default_factory=set)
 
 
     # Given a function handle index, resolves that handle into an internal representation of
@@ -145,18 +160,102 @@ class VMModuleCache:
         if mid in self.cmap:
             return self.cmap[mid]
 
-        module = load_and_verify_module_id(mid, data_view)
+        blob = data_view.load_module(mid)
+        version = HashValue.from_sha3_256(blob)
+        if version in self.verified:
+            module = VerifiedModule(CompiledModule.deserialize_lazy(blob))
+        else:
+            module = VerifiedModule.new(CompiledModule.deserialize(blob))
         loaded_module = LoadedModule.new(module)
-        self.cmap[deepcopy(mid)] = loaded_module
+        self.insert(deepcopy(mid), loaded_module, version)
         return loaded_module
 
 
-    def cache_module(self, module: VerifiedModule):
+    # Cache a module that has been verified outside of the VM.
+    #
+    # Caching the same code again is a no-op. Caching different code under an id that is already
+    # present replaces the old entry and invalidates its dependents.
+    #
+    # Returns the ids of the modules that have been invalidated.
+    def cache_module(self, module: VerifiedModule) -> Set[ModuleId]:
         module_id = module.self_id()
-        # TODO: Check ModuleId duplication in statedb
-        loaded_module = LoadedModule.new(module)
-        if module_id not in self.cmap:
-            self.cmap[module_id] = loaded_module
+        version = module.as_inner().hash_value()
+        if self.versions.get(module_id) == version:
+            return set()
+
+        removed = self.invalidate(module_id)
+        self.insert(module_id, LoadedModule.new(module), version)
+        return removed
+
+
+    def insert(self, module_id: ModuleId, loaded_module: LoadedModule, version: HashValue):
+        self.cmap[module_id] = loaded_module
+        self.versions[module_id] = version
+        self.verified.add(version)
+        self.code_paths[module_id.into()] = module_id
+        for dep in module_dependencies(loaded_module):
+            self.dependents.setdefault(dep, set()).add(module_id)
+
+
+    # Return the hash of the code blob the module was loaded from, or `None` if not cached.
+    def version_of(self, module_id: ModuleId) -> Optional[HashValue]:
+        return self.versions.get(module_id)
+
+
+    # Drop a module and, transitively, every cached module importing it.
+    #
+    # Returns the ids of the dropped modules, including `module_id` even if it was not cached.
+    def invalidate(self, module_id: ModuleId) -> Set[ModuleId]:
+        removed = set()
+        pending = [module_id]
+        while pending:
+            mid = pending.pop()
+            if mid in removed:
+                continue
+            removed.add(mid)
+            pending.extend(self.dependents.pop(mid, ()))
+            loaded_module = self.cmap.pop(mid, None)
+            if loaded_module is None:
+                continue
+            self.versions.pop(mid, None)
+            self.code_paths.pop(mid.into(), None)
+            for dep in module_dependencies(loaded_module):
+                if dep in self.dependents:
+                    self.dependents[dep].discard(mid)
+        return removed
+
+
+    # Invalidate the cached modules stored under any of the given code access paths, e.g. the
+    # keys of a committed write set. Non-code paths are ignored.
+    #
+    # Returns the ids of the dropped modules.
+    def invalidate_access_paths(self, access_paths: Iterable[AccessPath]) -> Set[ModuleId]:
+        removed = set()
+        for ap in access_paths:
+            mid = self.code_paths.get(ap)
+            if mid is not None and mid not in removed:
+                removed |= self.invalidate(mid)
+        return removed
+
+
+    # Return a cache sharing the `LoadedModule`s of this one but owning its maps, so that adding
+    # or invalidating entries does not affect the original.
+    def copy(self) -> VMModuleCache:
+        return VMModuleCache(
+            dict(self.cmap),
+            dict(self.versions),
+            dict(self.code_paths),
+            {mid: set(deps) for (mid, deps) in self.dependents.items()},
+            set(self.verified),
+        )
+
+
+    # Drop every cached module.
+    def flush(self):
+        self.cmap.clear()
+        self.versions.clear()
+        self.code_paths.clear()
+        self.dependents.clear()
 
 
     # Resolve a StructHandle into a StructDef recursively in either the cache or the `fetcher`.
@@ -220,6 +319,20 @@ class VMModuleCache:
 
 
 
+# Return the ids of the modules imported by `module`, excluding the module itself.
+def module_dependencies(module: ModuleAccess) -> List[ModuleId]:
+    self_handle = module.self_handle()
+    return [
+        ModuleId(module.address_at(handle.address), module.identifier_at(handle.name))
+        for handle in module.module_handles()
+        if handle != self_handle
+    ]
+
+
+def is_code_access_path(access_path: AccessPath) -> bool:
+    return access_path.path[0] == AccessPath.CODE_TAG
+
+
 def load_and_verify_module_id(
     mid: ModuleId,
     data_view: InterpreterContext,
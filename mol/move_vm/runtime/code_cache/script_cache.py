@@ -1,10 +1,11 @@
 from __future__ import annotations
-from mol.move_vm.runtime.code_cache.module_cache import load_and_verify_module_id
+from mol.move_vm.runtime.code_cache.module_cache import load_and_verify_module_id, module_dependencies
 from mol.move_vm.runtime.interpreter_context import InterpreterContext
 from mol.move_vm.runtime.loaded_data import FunctionRef, FunctionReference, LoadedModule
 
 from mol.bytecode_verifier import verify_script_dependencies, VerifiedScript
 
+from libra.access_path import AccessPath
 from libra.hasher import HashValue
 from libra.transaction import SCRIPT_HASH_LENGTH
 from libra.language_storage import ModuleId
@@ -13,7 +14,7 @@ from libra.vm_error import StatusCode, VMStatus
 from mol.vm.vm_exception import VMException
 from mol.vm.errors import vm_error, Location, VMResult
 from mol.vm.file_format import CompiledScript, ScriptAccess
-from typing import List, Optional, Mapping
+from typing import List, Optional, Mapping, Set, Iterable
 from dataclasses import dataclass, field
 import logging
 
@@ -24,10 +25,13 @@ logger = logging.getLogger(__name__)
 
 
 # The cache for commonly executed scripts. Currently there's no eviction policy, and it maps
-# hash of script bytes into `FunctionRef`.
+# hash of script bytes into `FunctionRef`. `deps` maps the same hash to the code access paths
+# of the modules the script was verified against, so that a script is dropped when any of
+# them changes.
 @dataclass
 class ScriptCache:
     cmap: Mapping[bytes, FunctionRef] = field(default_factory=dict)
+    deps: Mapping[bytes, Set[AccessPath]] = field(default_factory=dict)
 
 
     # Compiles, verifies, caches and resolves `raw_bytes` into a `FunctionRef` that can be
@@ -51,8 +55,24 @@ class ScriptCache:
             loaded_module = LoadedModule.new(fake_module)
             ret = FunctionRef.new(loaded_module, CompiledScript.MAIN_INDEX)
             self.cmap[hash_value] = ret
+            self.deps[hash_value] = {mid.into() for mid in module_dependencies(loaded_module)}
             return ret
 
+
+    # Drop every cached script depending on a module stored under one of `access_paths`.
+    def invalidate(self, access_paths: Iterable[AccessPath]):
+        access_paths = set(access_paths)
+        if not access_paths:
+            return
+        for hash_value in [h for (h, deps) in self.deps.items() if deps & access_paths]:
+            self.cmap.pop(hash_value, None)
+            self.deps.pop(hash_value, None)
+
+
+    def flush(self):
+        self.cmap.clear()
+        self.deps.clear()
+
     @classmethod
     def deserialize_and_verify(cls,
         raw_bytes: bytes,
@@ -0,0 +1,82 @@
+from __future__ import annotations
+from mol.move_vm.runtime.code_cache.module_cache import VMModuleCache
+from mol.move_vm.runtime.interpreter_context import InterpreterContext
+from mol.move_vm.runtime.loaded_data import LoadedModule
+from mol.bytecode_verifier import VerifiedModule
+from mol.vm.file_format import StructDefinitionIndex
+from typing import Iterable, Optional
+import gc
+import multiprocessing
+
+# Module cache shared copy-on-write between a parent process and its forked workers.
+#
+# The parent deserializes, verifies and loads the modules once with `build_shared_module_cache`
+# and installs the result with `install_shared_module_cache`. Every VM created afterwards (in the
+# parent or in a worker forked from it) starts from a `VMModuleCache.copy()` of the shared cache:
+# the maps are private to the VM, but the `LoadedModule`s themselves are the shared objects.
+#
+# Installing freezes the garbage collector, moving every object alive at that point into the
+# permanent generation. Collections in the workers then never traverse (and write to) those
+# objects, so the pages holding them stay shared with the parent.
+
+
+SHARED_MODULE_CACHE: Optional[VMModuleCache] = None
+
+
+# Build a module cache holding `modules`. If `data_view` is given, the struct defs of every
+# module are resolved too, so that workers don't have to fill `LoadedModuleCache` themselves.
+def build_shared_module_cache(
+    modules: Iterable[VerifiedModule],
+    data_view: Optional[InterpreterContext] = None,
+) -> VMModuleCache:
+    cache = VMModuleCache()
+    for module in modules:
+        cache.cache_module(module)
+    if data_view is not None:
+        for loaded_module in list(cache.cmap.values()):
+            warm_struct_defs(cache, loaded_module, data_view)
+    return cache
+
+
+def warm_struct_defs(
+    cache: VMModuleCache,
+    module: LoadedModule,
+    data_view: InterpreterContext,
+):
+    for idx in range(module.struct_defs().__len__()):
+        cache.resolve_struct_def(module, StructDefinitionIndex.new(idx), data_view)
+
+
+# Make `cache` the process-wide shared cache and freeze the garbage collector. Must be called in
+# the parent before forking the workers.
+def install_shared_module_cache(cache: VMModuleCache):
+    global SHARED_MODULE_CACHE
+    SHARED_MODULE_CACHE = cache
+    gc.collect()
+    gc.freeze()
+
+
+# Drop the process-wide shared cache. Objects frozen by `install_shared_module_cache` are moved
+# back to the oldest generation.
+def uninstall_shared_module_cache():
+    global SHARED_MODULE_CACHE
+    SHARED_MODULE_CACHE = None
+    gc.unfreeze()
+
+
+def shared_module_cache() -> Optional[VMModuleCache]:
+    return SHARED_MODULE_CACHE
+
+
+# Return a fresh module cache for a new VM: a copy of the shared cache if one is installed,
+# an empty cache otherwise.
+def new_module_cache() -> VMModuleCache:
+    if SHARED_MODULE_CACHE is not None:
+        return SHARED_MODULE_CACHE.copy()
+    return VMModuleCache()
+
+
+# The `multiprocessing` context workers must be started with to inherit the shared cache. Only
+# the "fork" start method shares memory with the parent; it is the default on Linux.
+def fork_context() -> multiprocessing.context.BaseContext:
+    return multiprocessing.get_context("fork")
@@ -0,0 +1,238 @@
+from __future__ import annotations
+from mol.global_source_mapping import GlobalSourceMapping
+from mol.move_vm.runtime.recorder import FunctionCache, Recorder
+from libra.account_address import Address
+from dataclasses import dataclass, field
+from typing import Any, ClassVar, Iterable, List, Mapping, Optional, Tuple
+from xml.etree import ElementTree
+import json
+import time
+
+# Code coverage of Move modules.
+#
+# While a `Coverage` is active, the interpreter runs every frame one instruction at a time and
+# sets the bit of every code offset it executes in the bitmap of the function, an `int`. The
+# bitmaps are only mapped to source lines, through the `code_map` of the function source maps,
+# when a report is written:
+#
+#   with Coverage() as coverage:
+#       ...execute transactions...
+#   coverage.write_lcov("move.info")          # genhtml move.info
+#   coverage.write_cobertura("coverage.xml")
+#
+# The bitmaps of several processes are merged with `merge`, from the dictionaries of `to_data`.
+# Only the modules whose source mapping is known to `GlobalSourceMapping` are reported.
+# `coverage_main.py` merges coverage data files and writes their reports from the command line.
+
+# Key of a function: the qualified name of its module, `address::Module`, and its index.
+FunctionKey = Tuple[str, int]
+
+
+# Line coverage of a function, or of a module.
+@dataclass
+class LineCoverage:
+    name: str
+    # The line of the declaration of the function, 0 for a module.
+    line: int = 0
+    executed: bool = False
+    # Whether every line with code was executed.
+    lines: Mapping[int, bool] = field(default_factory=dict)
+
+    def lines_covered(self) -> int:
+        return sum(1 for hit in self.lines.values() if hit)
+
+    def line_rate(self) -> float:
+        return self.lines_covered() / len(self.lines) if self.lines else 1.0
+
+
+@dataclass
+class ModuleCoverage(LineCoverage):
+    address: str = ""
+    path: str = ""
+    functions: List[LineCoverage] = field(default_factory=list)
+
+
+# The lines of `func_map` with code, and whether they were executed according to `bitmap`. The
+# code map only has an entry where the location changes: an offset has the location of the
+# closest entry before it.
+def map_lines(func_map, bitmap: int) -> Mapping[int, bool]:
+    lines = {}
+    offsets = sorted(func_map.code_map)
+    for (i, offset) in enumerate(offsets):
+        executed = bitmap >> offset
+        if i + 1 < len(offsets):
+            executed &= (1 << (offsets[i + 1] - offset)) - 1
+        line = func_map.code_map[offset].line_no
+        lines[line] = lines.get(line, False) or executed != 0
+    return lines
+
+
+# The names of the functions of the stdlib module `name`, by index.
+def stdlib_function_names(name: str) -> Mapping[int, str]:
+    from mol.move_vm.runtime.loaded_data import LoadedModule
+    from mol.stdlib import find_stdlib_module_by_name
+    module = find_stdlib_module_by_name(name)
+    if module is None:
+        return {}
+    table = LoadedModule.new(module).function_defs_table
+    return {idx.v0: str(fname) for (fname, idx) in table.items()}
+
+
+class Coverage(Recorder):
+    # The coverage the interpreter records into, if any.
+    active: ClassVar[Optional[Coverage]] = None
+
+    def __init__(self):
+        self.bitmaps: Mapping[FunctionKey, int] = {}
+        self.names: Mapping[FunctionKey, str] = {}
+        self.keys: FunctionCache[FunctionKey] = FunctionCache(self.function_key)
+
+    def activate(self) -> Optional[Coverage]:
+        previous = Coverage.active
+        Coverage.active = self
+        return previous
+
+    def restore(self, previous: Optional[Coverage]) -> None:
+        Coverage.active = previous
+
+    def function_key(self, function) -> FunctionKey:
+        module = function.module()
+        key = (f"{module.address().hex()}::{module.name()}", function.idx.v0)
+        self.names[key] = str(function.name())
+        return key
+
+    def key(self, function) -> FunctionKey:
+        return self.keys.get(function.fdef, function)
+
+    # Record the execution of the instruction at `pc` of `function`.
+    def mark(self, function, pc: int) -> None:
+        key = self.key(function)
+        self.bitmaps[key] = self.bitmaps.get(key, 0) | (1 << pc)
+
+    # The bitmaps, as JSON data.
+    def to_data(self) -> Mapping[str, Any]:
+        modules = {}
+        for ((qual_name, idx), bitmap) in self.bitmaps.items():
+            modules.setdefault(qual_name, {})[str(idx)] = {
+                "name": self.names.get((qual_name, idx)),
+                "offsets": hex(bitmap),
+            }
+        return {"version": 1, "modules": modules}
+
+    # Add the bitmaps of `data`, from `to_data`.
+    def merge(self, data: Mapping[str, Any]) -> None:
+        for (qual_name, functions) in data["modules"].items():
+            for (idx, function) in functions.items():
+                key = (qual_name, int(idx))
+                self.bitmaps[key] = self.bitmaps.get(key, 0) | int(function["offsets"], 16)
+                if function["name"] is not None:
+                    self.names[key] = function["name"]
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as file:
+            json.dump(self.to_data(), file)
+
+    @classmethod
+    def load(cls, paths: Iterable[str]) -> Coverage:
+        coverage = cls()
+        for path in paths:
+            with open(path) as file:
+                coverage.merge(json.load(file))
+        return coverage
+
+    # The line coverage of the modules executed, and of `modules` too, by qualified name.
+    def line_coverage(self, modules: Iterable[str] = ()) -> List[ModuleCoverage]:
+        qual_names = set(modules)
+        qual_names.update(qual_name for (qual_name, _) in self.bitmaps)
+        ret = []
+        for qual_name in sorted(qual_names):
+            mapping = GlobalSourceMapping.find_mapping(qual_name)
+            if mapping is None or not mapping.has_source_code_and_map():
+                continue
+            (address, name) = qual_name.split("::")
+            names = stdlib_function_names(name) if address == Address.default().hex() else {}
+            module = ModuleCoverage(name, address=address, path=mapping.source_code.path)
+            for (idx, func_map) in sorted(mapping.source_map.function_map.items()):
+                bitmap = self.bitmaps.get((qual_name, idx), 0)
+                function = LineCoverage(
+                    self.names.get((qual_name, idx)) or names.get(idx) or f"function_{idx}",
+                    func_map.decl_location.line_no,
+                    bitmap != 0,
+                    map_lines(func_map, bitmap),
+                )
+                module.functions.append(function)
+                for (line, hit) in function.lines.items():
+                    module.lines[line] = module.lines.get(line, False) or hit
+            module.executed = any(function.executed for function in module.functions)
+            ret.append(module)
+        return ret
+
+    def write_lcov(self, path: str, modules: Iterable[str] = ()) -> None:
+        with open(path, "w") as file:
+            for module in self.line_coverage(modules):
+                file.write(f"TN:\nSF:{module.path}\n")
+                for function in module.functions:
+                    file.write(f"FN:{function.line},{module.name}::{function.name}\n")
+                for function in module.functions:
+                    file.write(f"FNDA:{int(function.executed)},{module.name}::{function.name}\n")
+                file.write(f"FNF:{len(module.functions)}\n")
+                file.write(f"FNH:{sum(1 for function in module.functions if function.executed)}\n")
+                for (line, hit) in sorted(module.lines.items()):
+                    file.write(f"DA:{line},{int(hit)}\n")
+                file.write(f"LF:{len(module.lines)}\nLH:{module.lines_covered()}\n")
+                file.write("end_of_record\n")
+
+    def write_cobertura(self, path: str, modules: Iterable[str] = ()) -> None:
+        reports = self.line_coverage(modules)
+        valid = sum(len(module.lines) for module in reports)
+        covered = sum(module.lines_covered() for module in reports)
+        root = ElementTree.Element("coverage", {
+            "line-rate": f"{covered / valid if valid else 1.0:.4f}",
+            "branch-rate": "0",
+            "lines-covered": str(covered),
+            "lines-valid": str(valid),
+            "branches-covered": "0",
+            "branches-valid": "0",
+            "complexity": "0",
+            "version": "1",
+            "timestamp": str(int(time.time())),
+        })
+        packages = ElementTree.SubElement(root, "packages")
+        by_address = {}
+        for module in reports:
+            by_address.setdefault(module.address, []).append(module)
+        for (address, modules) in sorted(by_address.items()):
+            lines = sum(len(module.lines) for module in modules)
+            hits = sum(module.lines_covered() for module in modules)
+            package = ElementTree.SubElement(packages, "package", {
+                "name": f"0x{address.lstrip('0') or '0'}",
+                "line-rate": f"{hits / lines if lines else 1.0:.4f}",
+                "branch-rate": "0",
+                "complexity": "0",
+            })
+            classes = ElementTree.SubElement(package, "classes")
+            for module in modules:
+                cls = ElementTree.SubElement(classes, "class", {
+                    "name": module.name,
+                    "filename": module.path,
+                    "line-rate": f"{module.line_rate():.4f}",
+                    "branch-rate": "0",
+                    "complexity": "0",
+                })
+                methods = ElementTree.SubElement(cls, "methods")
+                for function in module.functions:
+                    method = ElementTree.SubElement(methods, "method", {
+                        "name": function.name,
+                        "signature": "",
+                        "line-rate": f"{function.line_rate():.4f}",
+                        "branch-rate": "0",
+                    })
+                    write_cobertura_lines(method, function.lines)
+                write_cobertura_lines(cls, module.lines)
+        ElementTree.ElementTree(root).write(path, encoding="utf-8", xml_declaration=True)
+
+
+def write_cobertura_lines(parent, lines: Mapping[int, bool]) -> None:
+    element = ElementTree.SubElement(parent, "lines")
+    for (line, hit) in sorted(lines.items()):
+        ElementTree.SubElement(element, "line", {"number": str(line), "hits": str(int(hit))})
@@ -0,0 +1,37 @@
+import argparse, sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+
+from mol.global_source_mapping import GlobalSourceMapping
+from mol.move_vm.runtime.coverage import Coverage
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(prog='Move coverage', add_help=True)
+    parser.add_argument('data', nargs='+', help='coverage data files to merge')
+    parser.add_argument('--lcov', help='write the lcov coverage to this file')
+    parser.add_argument('--cobertura', help='write the Cobertura coverage to this file')
+    parser.add_argument('-o', '--output', help='write the merged coverage data to this file')
+    parser.add_argument('--stdlib', action='store_true',
+        help='report the stdlib modules that were not executed too')
+    return parser
+
+
+def main(argv=None):
+    args = get_parser().parse_args(argv)
+    coverage = Coverage.load(args.data)
+    modules = []
+    if args.stdlib:
+        GlobalSourceMapping.init_std_mapping()
+        modules = GlobalSourceMapping.std_modules
+    if args.output:
+        coverage.save(args.output)
+    if args.lcov:
+        coverage.write_lcov(args.lcov, modules)
+    if args.cobertura:
+        coverage.write_cobertura(args.cobertura, modules)
+    for module in coverage.line_coverage(modules):
+        print(f"{module.line_rate():7.1%} {module.lines_covered():5}/{len(module.lines):<5} {module.path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+from __future__ import annotations
+from mol.vm.file_format_common import Opcodes
+from dataclasses import dataclass, field
+from typing import Any, ClassVar, List, Mapping, Optional
+import json
+
+# Per-opcode execution counters.
+#
+# While an `ExecutionCounters` is active, the interpreter runs every untraced frame in a loop that
+# counts the executions of each opcode, and measures the wall time of one instruction out of
+# `sample_rate` into a histogram of the opcode. Native functions are counted and timed on every
+# call, keyed by their entry in `dispatch.NATIVE_FUNCTION_MAP`, as `Module::function`. When no
+# counters are active, the interpreter runs its usual loop and pays nothing for them.
+#
+#   vm = LibraVM.new()
+#   counters = vm.enable_counters()
+#   vm.execute_block_impl(transactions, state_view)
+#   counters.dump_json("counters.json")
+#
+# The counts are kept per transaction and per block: the block totals also include what runs
+# outside of user transactions, like the block prologue.
+
+OPCODE_SLOTS = max(Opcodes) + 1
+
+
+# Histogram bucket of a duration: durations up to 2^n nanoseconds, and above 2^(n-1), go to n.
+def histogram_bucket(seconds: float) -> int:
+    return int(seconds * 1_000_000_000).bit_length()
+
+
+@dataclass
+class NativeStats:
+    calls: int = 0
+    time: float = 0.0
+
+    def merge(self, other: NativeStats) -> None:
+        self.calls += other.calls
+        self.time += other.time
+
+
+# The counts of a transaction, or of a block.
+@dataclass
+class CounterSet:
+    # Executions of every opcode, indexed by `Opcodes` value.
+    counts: List[int] = field(default_factory=lambda: [0] * OPCODE_SLOTS)
+    # Sampled executions of every opcode, and their total wall time.
+    sampled: List[int] = field(default_factory=lambda: [0] * OPCODE_SLOTS)
+    sampled_time: List[float] = field(default_factory=lambda: [0.0] * OPCODE_SLOTS)
+    # Histogram of the sampled wall times of every opcode, by `histogram_bucket`.
+    histograms: List[Mapping[int, int]] = field(default_factory=lambda: [{} for _ in range(OPCODE_SLOTS)])
+    natives: Mapping[str, NativeStats] = field(default_factory=dict)
+
+    def record_time(self, opcode: int, seconds: float) -> None:
+        self.sampled[opcode] += 1
+        self.sampled_time[opcode] += seconds
+        histogram = self.histograms[opcode]
+        bucket = histogram_bucket(seconds)
+        histogram[bucket] = histogram.get(bucket, 0) + 1
+
+    def record_native(self, name: str, seconds: float) -> None:
+        stats = self.natives.get(name)
+        if stats is None:
+            stats = self.natives[name] = NativeStats()
+        stats.calls += 1
+        stats.time += seconds
+
+    def merge(self, other: CounterSet) -> None:
+        for opcode in range(OPCODE_SLOTS):
+            self.counts[opcode] += other.counts[opcode]
+            self.sampled[opcode] += other.sampled[opcode]
+            self.sampled_time[opcode] += other.sampled_time[opcode]
+            histogram = self.histograms[opcode]
+            for (bucket, count) in other.histograms[opcode].items():
+                histogram[bucket] = histogram.get(bucket, 0) + count
+        for (name, stats) in other.natives.items():
+            mine = self.natives.get(name)
+            if mine is None:
+                mine = self.natives[name] = NativeStats()
+            mine.merge(stats)
+
+    def instructions(self) -> int:
+        return sum(self.counts)
+
+    # Counts and times by opcode name, of the opcodes that ran.
+    def opcodes(self) -> Mapping[str, Mapping[str, Any]]:
+        ret = {}
+        for opcode in Opcodes:
+            count = self.counts[opcode]
+            if count == 0:
+                continue
+            sampled = self.sampled[opcode]
+            ret[opcode.name] = {
+                "count": count,
+                "sampled": sampled,
+                "mean_ns": self.sampled_time[opcode] * 1_000_000_000 / sampled if sampled else None,
+                # Upper bound of every bucket, in nanoseconds.
+                "histogram_ns": {
+                    str(1 << bucket): n for (bucket, n) in sorted(self.histograms[opcode].items())
+                },
+            }
+        return ret
+
+    def to_json(self) -> Mapping[str, Any]:
+        return {
+            "instructions": self.instructions(),
+            "opcodes": self.opcodes(),
+            "natives": {
+                name: {"calls": stats.calls, "time_ns": int(stats.time * 1_000_000_000)}
+                for (name, stats) in sorted(self.natives.items())
+            },
+        }
+
+
+@dataclass
+class TransactionCounters:
+    sender: str
+    sequence_number: int
+    counters: CounterSet = field(default_factory=CounterSet)
+
+    def to_json(self) -> Mapping[str, Any]:
+        ret = {"sender": self.sender, "sequence_number": self.sequence_number}
+        ret.update(self.counters.to_json())
+        return ret
+
+
+@dataclass
+class BlockCounters:
+    total: CounterSet = field(default_factory=CounterSet)
+    transactions: List[TransactionCounters] = field(default_factory=list)
+
+    def to_json(self) -> Mapping[str, Any]:
+        return {
+            "total": self.total.to_json(),
+            "transactions": [txn.to_json() for txn in self.transactions],
+        }
+
+
+@dataclass
+class ExecutionCounters:
+    # The counters the interpreter records into, if any.
+    active: ClassVar[Optional[ExecutionCounters]] = None
+
+    # One instruction out of `sample_rate` is timed.
+    sample_rate: int = 16
+    blocks: List[BlockCounters] = field(default_factory=list)
+    # The set the interpreter records into: that of the running transaction, or of the block.
+    current: Optional[CounterSet] = None
+    transaction: Optional[TransactionCounters] = None
+    # Instructions left before the next sample.
+    countdown: int = 0
+
+    def begin_block(self) -> None:
+        block = BlockCounters()
+        self.blocks.append(block)
+        self.current = block.total
+        self.transaction = None
+
+    def begin_transaction(self, sender: str, sequence_number: int) -> None:
+        if not self.blocks:
+            self.begin_block()
+        self.transaction = TransactionCounters(sender, sequence_number)
+        self.current = self.transaction.counters
+
+    def end_transaction(self) -> None:
+        block = self.blocks[-1]
+        if self.transaction is not None:
+            block.transactions.append(self.transaction)
+            block.total.merge(self.transaction.counters)
+            self.transaction = None
+        self.current = block.total
+
+    # The set to record into, in a new block if none was begun.
+    def recording(self) -> CounterSet:
+        if self.current is None:
+            self.begin_block()
+        return self.current
+
+    # Whether the next instruction is to be timed.
+    def sample(self) -> bool:
+        if self.countdown > 0:
+            self.countdown -= 1
+            return False
+        self.countdown = self.sample_rate - 1
+        return True
+
+    # The totals of every block.
+    def total(self) -> CounterSet:
+        ret = CounterSet()
+        for block in self.blocks:
+            ret.merge(block.total)
+        return ret
+
+    def to_json(self) -> Mapping[str, Any]:
+        return {
+            "sample_rate": self.sample_rate,
+            "total": self.total().to_json(),
+            "blocks": [block.to_json() for block in self.blocks],
+        }
+
+    def dump_json(self, path: str) -> None:
+        with open(path, "w") as file:
+            json.dump(self.to_json(), file, indent=2)
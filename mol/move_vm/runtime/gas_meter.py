@@ -1,12 +1,115 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Any, List, Mapping, Optional, Tuple
 
 # Gas metering logic for the Move VM.
 
+# What gas is consumed for, besides opcodes, for the gas profiler.
+NATIVE = "native"
+INTRINSIC = "intrinsic"
+
 def gas_instr(context, selff, opcode, mem_size):
-    context.deduct_gas(selff.gas_schedule.instruction_cost(opcode).total().mul(mem_size))
+    amount = selff.gas_schedule.instruction_cost(opcode).total().mul(mem_size)
+    if context.gas_profiler is not None:
+        context.gas_profiler.charge(context, opcode.name, mem_size.get(), amount)
+    context.deduct_gas(amount)
 
 def gas_const_instr(context, selff, opcode):
-    context.deduct_gas(selff.gas_schedule.instruction_cost(opcode).total())
+    amount = selff.gas_schedule.instruction_cost(opcode).total()
+    if context.gas_profiler is not None:
+        context.gas_profiler.charge(context, opcode.name, None, amount)
+    context.deduct_gas(amount)
 
-def gas_consume(context, expr):
+def gas_consume(context, expr, kind: str = NATIVE):
+    if context.gas_profiler is not None:
+        context.gas_profiler.charge(context, kind, None, expr)
     context.deduct_gas(expr)
 
+
+# Gas charged for one kind of operation, on operands of one size.
+@dataclass
+class GasCharge:
+    count: int = 0
+    gas: int = 0
+
+
+# The gas consumed by a function, on one call path, over all its calls on that path.
+@dataclass
+class GasNode:
+    name: str
+    calls: int = 0
+    # Gas charged in the function itself, by the opcode or `NATIVE` or `INTRINSIC` it was charged
+    # for, and the `AbstractMemorySize` it was charged on, if any.
+    charges: Mapping[Tuple[str, Optional[int]], GasCharge] = field(default_factory=dict)
+    children: Mapping[str, GasNode] = field(default_factory=dict)
+
+    def child(self, name: str) -> GasNode:
+        node = self.children.get(name)
+        if node is None:
+            node = self.children[name] = GasNode(name)
+        return node
+
+    def self_gas(self) -> int:
+        return sum(charge.gas for charge in self.charges.values())
+
+    def total_gas(self) -> int:
+        return self.self_gas() + sum(child.total_gas() for child in self.children.values())
+
+    def to_json(self) -> Mapping[str, Any]:
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "self_gas": self.self_gas(),
+            "total_gas": self.total_gas(),
+            "charges": [
+                {"kind": kind, "size": size, "count": charge.count, "gas": charge.gas}
+                for ((kind, size), charge) in sorted(
+                    self.charges.items(), key=lambda item: -item[1].gas
+                )
+            ],
+            "children": [
+                child.to_json()
+                for child in sorted(self.children.values(), key=lambda child: -child.total_gas())
+            ],
+        }
+
+
+# Attributes every gas deduction of a transaction to the function it is made in, on the call
+# path of that function, and to the opcode or native function it pays for.
+#
+# The profiler is set on the execution context of the transaction, whose interpreter reports the
+# calls and returns to it. The gas charged is in gas units, and the gas that ran out is charged
+# for what was left of it.
+class GasProfiler:
+    def __init__(self, name: str = "transaction"):
+        self.root = GasNode(name, 1)
+        self.stack: List[GasNode] = [self.root]
+
+    # Called at the start of every execution: close the calls of an execution that aborted.
+    def begin_execution(self) -> None:
+        del self.stack[1:]
+
+    def enter(self, name: str) -> None:
+        node = self.stack[-1].child(name)
+        node.calls += 1
+        self.stack.append(node)
+
+    def exit(self) -> None:
+        if len(self.stack) > 1:
+            self.stack.pop()
+
+    def charge(self, context, kind: str, size: Optional[int], amount) -> None:
+        gas = min(amount.get(), context.remaining_gas().get())
+        key = (kind, size)
+        charges = self.stack[-1].charges
+        charge = charges.get(key)
+        if charge is None:
+            charge = charges[key] = GasCharge()
+        charge.count += 1
+        charge.gas += gas
+
+    def total_gas(self) -> int:
+        return self.root.total_gas()
+
+    def to_json(self) -> Mapping[str, Any]:
+        return self.root.to_json()
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import logging
+import time
 from copy import deepcopy
 from dataclasses import dataclass, field
 from enum import IntEnum
@@ -20,10 +21,13 @@ from mol.compiler.bytecode_source_map.mapping import SourceMapping
 from mol.libra_vm.system_module_names import ACCOUNT_MODULE, EMIT_EVENT_NAME, SAVE_ACCOUNT_NAME
 from mol.move_core.types.identifier import IdentStr
 from mol.move_core import JsonPrintable
-from mol.move_vm.runtime.gas_meter import gas_instr, gas_const_instr, gas_consume
+from mol.move_vm.runtime.coverage import Coverage
+from mol.move_vm.runtime.execution_counters import ExecutionCounters
+from mol.move_vm.runtime.gas_meter import gas_instr, gas_const_instr, gas_consume, INTRINSIC
 from mol.move_vm.runtime.interpreter_context import InterpreterContext
 from mol.move_vm.runtime.loaded_data import FunctionRef, FunctionReference, LoadedModule
 from mol.move_vm.runtime.move_vm import MoveVM
+from mol.move_vm.runtime.profiler import function_name as qualified_name
 from mol.move_vm.runtime.runtime import VMRuntime
 from mol.move_vm.runtime.trace_help import TraceType, TraceCallback, GlobalTracer, TracableFrame
 from mol.move_vm.types.identifier import create_access_path, resource_storage_key
@@ -164,7 +168,7 @@ class Interpreter:
         # We count the intrinsic cost of the transaction here, since that needs to also cover the
         # setup of the function.
         interp = Interpreter.new(txn_data, gas_schedule)
-        gas_consume(context, calculate_intrinsic_gas(txn_size))
+        gas_consume(context, calculate_intrinsic_gas(txn_size), INTRINSIC)
         interp.execute(runtime, context, func, args)
 
 
@@ -216,16 +220,41 @@ class Interpreter:
             locls.store_loc(i, value)
 
         current_frame = Frame.new(function, [], [], locls)
-        current_frame.trace_call()
+        if GlobalTracer.tracer is not None:
+            current_frame.trace_call(context.remaining_gas().get())
+        gas_profiler = context.gas_profiler
+        if gas_profiler is not None:
+            gas_profiler.begin_execution()
+            gas_profiler.enter(qualified_name(current_frame))
         while True:
             code = current_frame.code_definition()
 
-            exit_code = self\
-                .execute_code_unit(runtime, context, current_frame, code)
-                #.or_else(|err| Err(self.maybe_core_dump(err, &current_frame)))
+            # The loop is picked when entering or resuming a frame: frames without trace callbacks
+            # run the untraced loop, which pays nothing for tracing, nor for coverage or counters
+            # unless they are active. The counted loop also records the coverage, if any.
+            if current_frame.f_trace is None and current_frame.f_trace_opcodes is None:
+                if ExecutionCounters.active is not None:
+                    exit_code = self.execute_code_unit_counted(
+                        runtime, context, current_frame, code, ExecutionCounters.active,
+                        Coverage.active,
+                    )
+                elif Coverage.active is not None:
+                    exit_code = self.execute_code_unit_covered(
+                        runtime, context, current_frame, code, Coverage.active,
+                    )
+                else:
+                    exit_code = self\
+                        .execute_code_unit(runtime, context, current_frame, code)
+                        #.or_else(|err| Err(self.maybe_core_dump(err, &current_frame)))
+            else:
+                exit_code = self\
+                    .execute_code_unit_traced(runtime, context, current_frame, code)
 
             if exit_code.tag == ExitCodeTag.Return:
-                current_frame.trace_return(self.operand_stack)
+                if GlobalTracer.tracer is not None:
+                    current_frame.trace_return(self.operand_stack, context.remaining_gas().get())
+                if gas_profiler is not None:
+                    gas_profiler.exit()
                 # TODO: assert consistency of current frame: stack height correct
                 if create_account_marker == self.call_stack.v0.__len__():
                     return
@@ -273,36 +302,118 @@ class Interpreter:
                     self.call_stack.push(current_frame)
                     opt_frame.f_back = current_frame
                     current_frame = opt_frame
-                    opt_frame.trace_call()
+                    if GlobalTracer.tracer is not None:
+                        opt_frame.trace_call(context.remaining_gas().get())
+                    if gas_profiler is not None:
+                        gas_profiler.enter(qualified_name(opt_frame))
+
+
+    # Execute a Move function under its trace callbacks, one instruction at a time, until a return
+    # or a call opcode is found. Every new source line is reported to `frame.f_trace` and every
+    # instruction to `frame.f_trace_opcodes`.
+    def execute_code_unit_traced(
+        self,
+        runtime: VMRuntime,
+        context: InterpreterContext,
+        frame: Frame,
+        code: List[Bytecode],
+    ) -> ExitCode:
+        func_map = frame.function_source_map()
+        coverage = Coverage.active
+
+        while True:
+            if frame.f_trace is None and frame.f_trace_opcodes is None:
+                # The callbacks are gone, run the rest of the frame untraced.
+                return self.execute_code_unit(runtime, context, frame, code)
+
+            if func_map is not None:
+                if frame.f_trace is not None:
+                    line_no = frame.get_lineno(frame.pc)
+                    if line_no is not None and line_no != frame.line_no:
+                        frame.line_no = line_no
+                        src = frame.mapping.source_code.lines[line_no-1]
+                        ltrace = frame.f_trace(frame, TraceType.LINE, (line_no, src))
+                        frame.f_trace = ltrace
+
+            if frame.f_trace_opcodes is not None:
+                instruction = code[frame.pc]
+                ltrace = frame.f_trace_opcodes(frame, TraceType.OPCODE, (frame.pc, instruction))
+                frame.f_trace_opcodes = ltrace
+
+            if coverage is not None:
+                coverage.mark(frame.function, frame.pc)
+            exit_code = self.execute_code_unit(runtime, context, frame, code, True)
+            if exit_code is not None:
+                return exit_code
+
+
+    # Execute a Move function one instruction at a time, until a return or a call opcode is found,
+    # setting the bit of every offset executed in the bitmap of the function in `coverage`.
+    def execute_code_unit_covered(
+        self,
+        runtime: VMRuntime,
+        context: InterpreterContext,
+        frame: Frame,
+        code: List[Bytecode],
+        coverage: Coverage,
+    ) -> ExitCode:
+        key = coverage.key(frame.function)
+        executed = coverage.bitmaps.get(key, 0)
+        try:
+            while True:
+                executed |= 1 << frame.pc
+                exit_code = self.execute_code_unit(runtime, context, frame, code, True)
+                if exit_code is not None:
+                    return exit_code
+        finally:
+            coverage.bitmaps[key] = executed
+
+
+    # Execute a Move function one instruction at a time, until a return or a call opcode is found,
+    # counting the executions of every opcode in `counters` and timing a sample of them. The
+    # instructions executed are marked in `coverage` too, if any.
+    def execute_code_unit_counted(
+        self,
+        runtime: VMRuntime,
+        context: InterpreterContext,
+        frame: Frame,
+        code: List[Bytecode],
+        counters: ExecutionCounters,
+        coverage: Optional[Coverage] = None,
+    ) -> ExitCode:
+        recording = counters.recording()
+        while True:
+            opcode = code[frame.pc].tag
+            recording.counts[opcode] += 1
+            if coverage is not None:
+                coverage.mark(frame.function, frame.pc)
+            if counters.sample():
+                start = time.perf_counter()
+                exit_code = self.execute_code_unit(runtime, context, frame, code, True)
+                recording.record_time(opcode, time.perf_counter() - start)
+            else:
+                exit_code = self.execute_code_unit(runtime, context, frame, code, True)
+            if exit_code is not None:
+                return exit_code
 
 
     # Execute a Move function until a return or a call opcode is found.
+    #
+    # With `single_step`, only the instruction at `frame.pc` is executed, and `None` is returned
+    # if it is neither a return nor a call.
     def execute_code_unit(
         self,
         runtime: VMRuntime,
         context: InterpreterContext,
         frame: Frame,
         code: List[Bytecode],
-    ) -> ExitCode:
+        single_step: bool = False,
+    ) -> Optional[ExitCode]:
         # TODO: re-enbale this once gas metering is sorted out
         #code = frame.code_definition()
-        func_map = frame.function_source_map()
 
         while True:
-            for instruction in code[frame.pc:]:
-                if func_map is not None:
-                    if frame.f_trace is not None:
-                        line_no = frame.get_lineno(frame.pc)
-                        if line_no is not None and line_no != frame.line_no:
-                            frame.line_no = line_no
-                            src = frame.mapping.source_code.lines[line_no-1]
-                            ltrace = frame.f_trace(frame, TraceType.LINE, (line_no, src))
-                            frame.f_trace = ltrace
-
-                if frame.f_trace_opcodes is not None:
-                    ltrace = frame.f_trace_opcodes(frame, TraceType.OPCODE, (frame.pc, instruction))
-                    frame.f_trace_opcodes = ltrace
-
+            for instruction in code[frame.pc:frame.pc + 1] if single_step else code[frame.pc:]:
                 frame.pc += 1
                 if instruction.tag == Opcodes.POP:
                     gas_const_instr(context, self, Opcodes.POP)
@@ -649,6 +760,8 @@ class Interpreter:
                 #     return ExitCode.Return
                 # else:
                 raise VMException(VMStatus(StatusCode.PC_OVERFLOW))
+            if single_step:
+                return None
 
 
     # Returns a `Frame` if the call is to a Move function. Calls to native functions are
@@ -699,6 +812,15 @@ class Interpreter:
         native_function = dispatch.resolve_native_function(module_id, function_name)
         # native_function = NativeFunction.resolve(module_id, function_name)
             #.ok_or_else(|| VMStatus(StatusCode.LINKER_ERROR))
+        # Native calls have no frame: the tracer gets the function, and the gas left.
+        tracer = GlobalTracer.tracer
+        if tracer is not None:
+            tracer(function, TraceType.NATIVE_CALL, context.remaining_gas().get())
+        counters = ExecutionCounters.active
+        if counters is not None:
+            start = time.perf_counter()
+        if context.gas_profiler is not None:
+            context.gas_profiler.enter(qualified_name(function))
         if module_id == ACCOUNT_MODULE and function_name == EMIT_EVENT_NAME:
             self.call_emit_event(context, type_actual_tags, type_actuals)
         elif module_id == ACCOUNT_MODULE and function_name == SAVE_ACCOUNT_NAME:
@@ -728,6 +850,14 @@ class Interpreter:
                 raise VMException(result.result)
             else:
                 bail("unreachable!")
+        if context.gas_profiler is not None:
+            context.gas_profiler.exit()
+        if counters is not None:
+            counters.recording().record_native(
+                f"{module.name()}::{function_name}", time.perf_counter() - start,
+            )
+        if tracer is not None:
+            tracer(function, TraceType.NATIVE_RETURN, context.remaining_gas().get())
 
 
 
@@ -1091,6 +1221,7 @@ class Frame(TracableFrame, JsonPrintable):
     type_actual_tags: List[TypeTag]
     type_actuals: List[Type]
     line_no: int = -1
+    gas_left: Optional[Uint64] = None
     mapping: Optional[SourceMapping] = None
     f_trace: TraceCallback = None
     f_trace_opcodes: TraceCallback = None
@@ -19,6 +19,9 @@ logger = logging.getLogger(__name__)
 # The `InterpreterContext` context trait specifies the mutations that are allowed to the
 # `TransactionExecutionContext` within the interpreter.
 class InterpreterContext(abc.ABC):
+    # The `GasProfiler` the gas deductions are reported to, if any.
+    gas_profiler = None
+
     @abc.abstractmethod
     def move_resource_to(
         self,
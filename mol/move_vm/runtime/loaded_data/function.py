@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import abc
 from copy import deepcopy
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List, Optional, Mapping
 
 from canoser import Uint8
@@ -135,18 +135,32 @@ class FunctionRef(FunctionReference):
         )
 
 # Resolved form of a function definition
+#
+# For a function whose `LazyCodeUnit` has not been decoded yet, `code` is only copied out of the
+# code unit when first accessed.
 @dataclass
 class FunctionDef(JsonPrintable):
     local_count: usize
     arg_count: usize
     return_count: usize
-    code: List[Bytecode]
+    # `None` until first accessed when `code_unit` is set.
+    _code: Optional[List[Bytecode]]
     flags: Uint8
+    # The undecoded code unit `_code` is copied out of.
+    code_unit: Optional[CodeUnit] = field(default=None, repr=False, compare=False)
+
+    @property
+    def code(self) -> List[Bytecode]:
+        if self._code is None:
+            self._code = deepcopy(self.code_unit.code)
+            self.code_unit = None
+        return self._code
 
     @classmethod
     def new(cls, module: VerifiedModule, idx: FunctionDefinitionIndex) -> FunctionDef:
         definition = module.function_def_at(idx)
-        code = deepcopy(definition.code.code)
+        code_unit = definition.code
+        code = deepcopy(code_unit.code) if code_unit.is_decoded() else None
         handle = module.function_handle_at(definition.function)
         function_sig = module.function_signature_at(handle.signature)
         flags = definition.flags
@@ -162,6 +176,7 @@ class FunctionDef(JsonPrintable):
             function_sig.return_types.__len__(),
             code,
             flags,
+            None if code is not None else code_unit,
         )
 
 
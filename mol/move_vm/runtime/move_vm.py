@@ -5,6 +5,7 @@ from mol.move_vm.types.chain_state import ChainState
 from mol.move_vm.runtime.interpreter_context import InterpreterContext
 from mol.move_vm.runtime.loaded_data import LoadedModule
 from mol.move_vm.runtime.runtime import VMRuntime
+from mol.move_vm.runtime.code_cache import VMModuleCache
 from mol.bytecode_verifier import VerifiedModule
 
 from mol.vm.gas_schedule import CostTable
@@ -12,8 +13,9 @@ from mol.vm.file_format_common import Opcodes
 from mol.vm.transaction_metadata import TransactionMetadata
 from mol.move_vm.types.loaded_data import StructDef
 from mol.move_vm.types.values import Value
+from libra.transaction import WriteSet
 from dataclasses import dataclass
-from typing import List, Optional, Mapping
+from typing import List, Optional, Mapping, Set
 from canoser import Uint8
 
 @dataclass
@@ -24,8 +26,8 @@ class MoveVMImpl:
 class MoveVM(MoveVMImpl):
 
     @classmethod
-    def new(cls) -> MoveVM:
-        return cls(VMRuntime.new())
+    def new(cls, code_cache: Optional[VMModuleCache] = None) -> MoveVM:
+        return cls(VMRuntime.new(code_cache))
 
 
     def execute_function(
@@ -66,6 +68,21 @@ class MoveVM(MoveVMImpl):
         self.runtime.cache_module(module)
 
 
+    # Drop a cached module and everything depending on it.
+    def invalidate(self, module_id: ModuleId) -> Set[ModuleId]:
+        return self.runtime.invalidate(module_id)
+
+
+    # Drop the cached code a committed write set makes stale.
+    def invalidate_write_set(self, write_set: WriteSet) -> Set[ModuleId]:
+        return self.runtime.invalidate_write_set(write_set)
+
+
+    # Drop every cached module and script.
+    def flush(self):
+        self.runtime.flush()
+
+
     def resolve_struct_tag_by_name(
         self,
         module_id: ModuleId,
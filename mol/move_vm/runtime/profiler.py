@@ -0,0 +1,212 @@
+from __future__ import annotations
+from mol.move_vm.runtime.recorder import FunctionCache, Recorder
+from mol.move_vm.runtime.trace_help import GlobalTracer, TraceType
+from dataclasses import dataclass, field
+from typing import Any, List, Mapping, Optional, Tuple
+import marshal
+import pstats
+import time
+
+# Profiler of Move functions.
+#
+# The profiler is a tracer: it only handles the call and return events of Move functions and of
+# native functions, and never asks for line or opcode events, so traced frames still run the
+# untraced interpreter loop. Its overhead is a clock read and a few dictionary updates per call,
+# which is low enough to leave it enabled on a sample of the executions.
+#
+#   profiler = Profiler()
+#   with profiler:
+#       ...execute transactions...
+#   profiler.dump_stats("move.prof")        # python -m pstats move.prof
+#   profiler.write_collapsed("move.folded") # flamegraph.pl move.folded > move.svg
+#
+# `profiler_main.py` profiles a functional test from the command line.
+#
+# For every function, named `0xaddress::Module::function`, it records the number of calls and
+# the wall time and gas spent in the function itself (exclusive) and including its callees
+# (inclusive), per caller too.
+
+# The name of the function running in `frame`, or of the native function `frame` is.
+def function_name(frame) -> str:
+    if hasattr(frame, "address_module_function"):
+        (address, module, function) = frame.address_module_function()
+    else:
+        module = frame.module()
+        (address, module, function) = (module.address().hex(), module.name(), frame.name())
+    return f"0x{address.lstrip('0') or '0'}::{module}::{function}"
+
+
+@dataclass
+class CallStats:
+    calls: int = 0
+    # Calls that were not made from within the same function, directly or not.
+    primitive_calls: int = 0
+    exclusive_time: float = 0.0
+    inclusive_time: float = 0.0
+    exclusive_gas: int = 0
+    inclusive_gas: int = 0
+
+    def add(self, primitive: bool, time: float, inclusive_time: float, gas: int, inclusive_gas: int):
+        self.calls += 1
+        self.exclusive_time += time
+        self.exclusive_gas += gas
+        if primitive:
+            self.primitive_calls += 1
+            self.inclusive_time += inclusive_time
+            self.inclusive_gas += inclusive_gas
+
+    def pstats_entry(self) -> Tuple[int, int, float, float]:
+        return (self.primitive_calls, self.calls, self.exclusive_time, self.inclusive_time)
+
+    # The entry of a caller, whose counts are in the opposite order: all calls first, then the
+    # primitive ones.
+    def pstats_caller_entry(self) -> Tuple[int, int, float, float]:
+        return (self.calls, self.primitive_calls, self.exclusive_time, self.inclusive_time)
+
+
+@dataclass
+class FunctionStats(CallStats):
+    callers: Mapping[str, CallStats] = field(default_factory=dict)
+
+
+# A call being profiled.
+@dataclass
+class ProfiledCall:
+    name: str
+    # The names of the functions on the call stack, root first, separated by ";".
+    stack: str
+    start_time: float
+    start_gas: Optional[int]
+    children_time: float = 0.0
+    children_gas: int = 0
+
+
+class Profiler(Recorder):
+    def __init__(self):
+        self.functions: Mapping[str, FunctionStats] = {}
+        # Exclusive wall time of every distinct call stack, in seconds.
+        self.stack_times: Mapping[str, float] = {}
+        # Exclusive gas of every distinct call stack.
+        self.stack_gas: Mapping[str, int] = {}
+        self.calls: List[ProfiledCall] = []
+        # Number of calls of every function on `calls`, to count recursive calls once.
+        self.active: Mapping[str, int] = {}
+        self.last_time = 0.0
+        self.last_gas: Optional[int] = None
+        self.names: FunctionCache[str] = FunctionCache(function_name)
+
+    def activate(self) -> Any:
+        previous = GlobalTracer.gettrace()
+        GlobalTracer.settrace(self.trace)
+        return previous
+
+    def restore(self, previous: Any) -> None:
+        GlobalTracer.settrace(previous)
+        self.unwind()
+
+    # Called by the interpreter after every complete execution.
+    def reset(self) -> None:
+        self.unwind()
+
+    def name(self, frame) -> str:
+        fdef = frame.function.fdef if hasattr(frame, "function") else frame.fdef
+        return self.names.get(fdef, frame)
+
+    def trace(self, frame, event: TraceType, arg: Any):
+        if event == TraceType.CALL:
+            if frame.f_back is None:
+                # A new execution: close the calls of an execution that aborted.
+                self.unwind()
+            self.enter(self.name(frame), frame.gas_left)
+        elif event == TraceType.RETURN:
+            self.exit(frame.gas_left)
+        elif event == TraceType.NATIVE_CALL:
+            self.enter(self.name(frame), arg)
+        elif event == TraceType.NATIVE_RETURN:
+            self.exit(arg)
+        return None
+
+    def enter(self, name: str, gas_left: Optional[int]) -> None:
+        now = time.perf_counter()
+        stack = f"{self.calls[-1].stack};{name}" if self.calls else name
+        self.calls.append(ProfiledCall(name, stack, now, gas_left))
+        self.active[name] = self.active.get(name, 0) + 1
+        self.last_time = now
+        self.last_gas = gas_left
+
+    def exit(self, gas_left: Optional[int], now: Optional[float] = None) -> None:
+        if not self.calls:
+            return
+        if now is None:
+            now = time.perf_counter()
+        call = self.calls.pop()
+        inclusive_time = now - call.start_time
+        inclusive_gas = 0
+        if call.start_gas is not None and gas_left is not None:
+            inclusive_gas = call.start_gas - gas_left
+        exclusive_time = inclusive_time - call.children_time
+        exclusive_gas = inclusive_gas - call.children_gas
+
+        self.active[call.name] -= 1
+        primitive = self.active[call.name] == 0
+        stats = self.functions.get(call.name)
+        if stats is None:
+            stats = self.functions[call.name] = FunctionStats()
+        stats.add(primitive, exclusive_time, inclusive_time, exclusive_gas, inclusive_gas)
+
+        if self.calls:
+            parent = self.calls[-1]
+            parent.children_time += inclusive_time
+            parent.children_gas += inclusive_gas
+            caller = stats.callers.get(parent.name)
+            if caller is None:
+                caller = stats.callers[parent.name] = CallStats()
+            caller.add(primitive, exclusive_time, inclusive_time, exclusive_gas, inclusive_gas)
+
+        self.stack_times[call.stack] = self.stack_times.get(call.stack, 0.0) + exclusive_time
+        self.stack_gas[call.stack] = self.stack_gas.get(call.stack, 0) + exclusive_gas
+        self.last_time = now
+        self.last_gas = gas_left
+
+    # Close the calls left open by an aborted execution, as of the last event.
+    def unwind(self) -> None:
+        while self.calls:
+            self.exit(self.last_gas, self.last_time)
+
+    # Statistics in the format of `pstats`: a function `0x1::M::f` is reported as `f` in the file
+    # `0x1::M`.
+    def create_stats(self) -> None:
+        def key(name):
+            (module, function) = name.rsplit("::", 1)
+            return (module, 0, function)
+
+        self.stats = {
+            key(name): stats.pstats_entry() + ({
+                key(caller): caller_stats.pstats_caller_entry()
+                for (caller, caller_stats) in stats.callers.items()
+            },)
+            for (name, stats) in self.functions.items()
+        }
+
+    # Write the statistics to `path`, to be read by `pstats.Stats(path)`.
+    def dump_stats(self, path: str) -> None:
+        self.create_stats()
+        with open(path, "wb") as file:
+            marshal.dump(self.stats, file)
+
+    def print_stats(self, sort: str = "cumulative") -> None:
+        pstats.Stats(self).strip_dirs().sort_stats(sort).print_stats()
+
+    # The call stacks in the collapsed format of flamegraph.pl, one "root;...;leaf weight" per
+    # line. The weight is the exclusive wall time in microseconds, or the exclusive gas.
+    def collapsed_stacks(self, weight: str = "time") -> List[str]:
+        if weight == "gas":
+            weights = self.stack_gas
+        else:
+            weights = {stack: int(t * 1_000_000) for (stack, t) in self.stack_times.items()}
+        return [f"{stack} {value}" for (stack, value) in sorted(weights.items()) if value > 0]
+
+    def write_collapsed(self, path: str, weight: str = "time") -> None:
+        with open(path, "w") as file:
+            for line in self.collapsed_stacks(weight):
+                file.write(line + "\n")
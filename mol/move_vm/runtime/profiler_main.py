@@ -0,0 +1,36 @@
+import argparse, sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+
+from mol.functional_tests import testsuite
+from mol.functional_tests.ir_compiler import IRCompiler
+from mol.move_vm.runtime.profiler import Profiler
+from mol.stdlib import stdlib_modules
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(prog='Move profiler', add_help=True)
+    parser.add_argument('progname', help='the .mvir functional test to profile')
+    parser.add_argument('-o', '--output', help='write pstats statistics to this file')
+    parser.add_argument('--collapsed', help='write collapsed stacks to this file')
+    parser.add_argument('--weight', choices=['time', 'gas'], default='time',
+        help='weight of the collapsed stacks')
+    parser.add_argument('-s', '--sort', default='cumulative', help='sort order of the printed statistics')
+    return parser
+
+
+def main(argv=None):
+    args = get_parser().parse_args(argv)
+
+    profiler = Profiler()
+    with profiler:
+        testsuite.functional_tests(IRCompiler(list(stdlib_modules())), args.progname)
+    if args.output:
+        profiler.dump_stats(args.output)
+    if args.collapsed:
+        profiler.write_collapsed(args.collapsed, args.weight)
+    if not args.output and not args.collapsed:
+        profiler.print_stats(args.sort)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+from __future__ import annotations
+import abc
+from typing import Any, Callable, Generic, Mapping, Tuple, TypeVar
+
+# Helpers shared by the recorders of executions, like the profiler and the coverage.
+
+T = TypeVar("T")
+
+
+# A recorder that the interpreter reports to while it is enabled, for example in a `with` block.
+# Enabling it replaces the recorder that was active, which is restored when it is disabled, so
+# recorders of the same kind can be nested.
+class Recorder(abc.ABC):
+    # What was active before `enable`, for `disable` to restore.
+    previous: Any = None
+
+    # Make this recorder active, returning what was active before.
+    @abc.abstractmethod
+    def activate(self) -> Any:
+        pass
+
+    # Make `previous` active again.
+    @abc.abstractmethod
+    def restore(self, previous: Any) -> None:
+        pass
+
+    def enable(self) -> None:
+        self.previous = self.activate()
+
+    def disable(self) -> None:
+        self.restore(self.previous)
+        self.previous = None
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self.disable()
+
+
+# Values computed once per function, like its name, by id of its `FunctionDef`. The definition is
+# kept alive with its value, so that its id is not reused by another one.
+class FunctionCache(Generic[T]):
+    def __init__(self, compute: Callable[[Any], T]):
+        self.compute = compute
+        self.entries: Mapping[int, Tuple[Any, T]] = {}
+
+    # The value of the function of definition `fdef`, computed from `source` the first time.
+    def get(self, fdef, source) -> T:
+        entry = self.entries.get(id(fdef))
+        if entry is None:
+            entry = self.entries[id(fdef)] = (fdef, self.compute(source))
+        return entry[1]
@@ -1,7 +1,9 @@
 from __future__ import annotations
 from mol.move_vm.types.identifier import create_access_path, resource_storage_key
 from mol.move_vm.runtime.loaded_data import FunctionRef, FunctionReference, LoadedModule
-from mol.move_vm.runtime.code_cache import VMModuleCache, ScriptCache
+from mol.move_vm.runtime.code_cache import (
+    VMModuleCache, ScriptCache, is_code_access_path, new_module_cache
+    )
 from mol.move_vm.state.data_cache import RemoteCache
 from mol.move_vm.runtime.interpreter_context import InterpreterContext
 #from mol.move_vm.runtime.interpreter import Interpreter
@@ -10,7 +12,7 @@ from mol.bytecode_verifier import VerifiedModule
 from libra.account_config import AccountConfig, CORE_CODE_ADDRESS
 from mol.move_core.types.identifier import IdentStr, Identifier
 from libra.language_storage import ModuleId, StructTag
-from libra.transaction import MAX_TRANSACTION_SIZE_IN_BYTES
+from libra.transaction import MAX_TRANSACTION_SIZE_IN_BYTES, WriteSet
 from libra.vm_error import StatusCode, SubStatus, VMStatus
 
 # from mol.libra_vm.system_module_names import GAS_SCHEDULE_MODULE
@@ -29,7 +31,7 @@ from mol.move_vm.types.loaded_data import StructDef, Type
 from mol.move_vm.types.type_context import TypeContext
 from mol.move_vm.types.values import Value
 from dataclasses import dataclass
-from typing import List, Optional, Mapping
+from typing import List, Optional, Mapping, Set
 import logging
 
 logger = logging.getLogger(__name__)
@@ -49,9 +51,14 @@ class VMRuntime:
 
     # Create a new VM instance with an Arena allocator to store the modules and a `config` that
     # contains the whitelist that this VM is allowed to execute.
+    #
+    # Without an explicit `code_cache`, the VM starts from a copy of the process-wide shared
+    # module cache if one is installed (see `shared_cache.py`).
     @classmethod
-    def new(cls) -> VMRuntime:
-        return cls(VMModuleCache(), ScriptCache())
+    def new(cls, code_cache: Optional[VMModuleCache] = None) -> VMRuntime:
+        if code_cache is None:
+            code_cache = new_module_cache()
+        return cls(code_cache, ScriptCache())
 
 
     def publish_module(
@@ -125,7 +132,31 @@ class VMRuntime:
 
 
     def cache_module(self, module: VerifiedModule):
-        self.code_cache.cache_module(module)
+        removed = self.code_cache.cache_module(module)
+        self.script_cache.invalidate(mid.into() for mid in removed)
+
+
+    # Drop a module from the code cache, along with every cached module and script depending
+    # on it. Returns the ids of the dropped modules.
+    def invalidate(self, module_id: ModuleId) -> Set[ModuleId]:
+        removed = self.code_cache.invalidate(module_id)
+        self.script_cache.invalidate(mid.into() for mid in removed)
+        return removed
+
+
+    # Invalidate everything cached from the code access paths a committed write set touches.
+    def invalidate_write_set(self, write_set: WriteSet) -> Set[ModuleId]:
+        code_paths = {ap for (ap, _op) in write_set.write_set if is_code_access_path(ap)}
+        if not code_paths:
+            return set()
+        removed = self.code_cache.invalidate_access_paths(code_paths)
+        self.script_cache.invalidate(code_paths | {mid.into() for mid in removed})
+        return removed
+
+
+    def flush(self):
+        self.code_cache.flush()
+        self.script_cache.flush()
 
 
     def resolve_struct_tag_by_name(
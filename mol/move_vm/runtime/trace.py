@@ -6,6 +6,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../.
 from typing import Callable, Union, Any, Tuple
 from mol.functional_tests import testsuite
 from mol.functional_tests.ir_compiler import IRCompiler
+from mol.move_vm.runtime.coverage import Coverage
 from mol.move_vm.runtime.trace_help import TraceType, TraceCallback, GlobalTracer
 from mol.stdlib import stdlib_modules
 from mol.global_source_mapping import GlobalSourceMapping
@@ -16,9 +17,9 @@ def print_function(amf: Tuple[str, str, str]) -> str:
     return a[0:4] +"..."+ a[-5:-1] + f" {m}::{f}"
 
 
+# Lines are counted by `Coverage`, which does not need trace callbacks.
 class Trace:
-    def __init__(self, count, trace, countfuncs, countcallers, bytecode):
-        self.counts = {}   # keys are (filename, linenumber)
+    def __init__(self, trace, countfuncs, countcallers, bytecode):
         self.donothing = False
         self.trace = trace
         self.bytecode = bytecode
@@ -29,15 +30,9 @@ class Trace:
             self.globaltrace = self.globaltrace_trackcallers
         elif countfuncs:
             self.globaltrace = self.globaltrace_countfuncs
-        elif trace and count:
-            self.globaltrace = self.globaltrace_lt
-            self.localtrace = self.localtrace_trace_and_count
         elif trace:
             self.globaltrace = self.globaltrace_lt
             self.localtrace = self.localtrace_trace
-        elif count:
-            self.globaltrace = self.globaltrace_lt
-            self.localtrace = self.localtrace_count
         else:
             # Ahem -- do nothing?  Okay.
             self.donothing = True
@@ -102,26 +97,11 @@ class Trace:
             else:
                 return None
 
-    def localtrace_trace_and_count(self, frame, why, arg):
-        if why == TraceType.LINE:
-            print("\t", arg[0], arg[1])
-            this_func = frame.address_module_function()
-            key = this_func, frame.pc
-            self.counts[key] = self.counts.get(key, 0) + 1
-        return self.localtrace
-
     def localtrace_trace(self, frame, why, arg):
         if why == TraceType.LINE:
             print("\t", arg[0], arg[1])
         return self.localtrace
 
-    def localtrace_count(self, frame, why, arg):
-        if why == TraceType.LINE:
-            this_func = frame.address_module_function()
-            key = this_func, frame.pc
-            self.counts[key] = self.counts.get(key, 0) + 1
-        return self.localtrace
-
     def opcode_trace(self, frame, why, arg):
         if why == TraceType.OPCODE:
             print("\t", arg[0], arg[1])
@@ -138,10 +118,8 @@ def main():
             'One of these (or --report) must be given')
 
     grp.add_argument('-c', '--count', action='store_true',
-            help='Count the number of times each line is executed and write '
-                 'the counts to <module>.cover for each module executed, in '
-                 'the module\'s directory. See also --coverdir, --file, '
-                 '--no-report below.')
+            help='Record which lines are executed and print the line coverage of '
+                 'every module executed. See also --lcov and --cobertura below.')
     grp.add_argument('-t', '--trace', action='store_true',
             help='Print each line to sys.stdout before it is executed')
     grp.add_argument('-b', '--bytecode', action='store_true',
@@ -164,6 +142,10 @@ def main():
     #         help='Ignore files in the given directory '
     #              '(multiple directories can be joined by os.pathsep).')
 
+    grp = parser.add_argument_group('Coverage reports')
+    grp.add_argument('--lcov', help='Write the lcov coverage to this file, with --count')
+    grp.add_argument('--cobertura', help='Write the Cobertura coverage to this file, with --count')
+
     parser.add_argument('progname', nargs='?',
             help='file to run as main program')
     parser.add_argument('arguments', nargs=argparse.REMAINDER,
@@ -184,11 +166,14 @@ def main():
     if opts.progname is None:
         parser.error('progname is missing: required with the main options')
 
-    tracer = Trace(opts.count, opts.trace, countfuncs=opts.listfuncs,
+    tracer = Trace(opts.trace, countfuncs=opts.listfuncs,
               countcallers=opts.trackcalls, bytecode=opts.bytecode)
+    coverage = Coverage() if opts.count else None
 
     if not tracer.donothing:
         GlobalTracer.settrace(tracer.globaltrace)
+    if coverage is not None:
+        coverage.enable()
 
     try:
         compiler = IRCompiler()
@@ -197,10 +182,16 @@ def main():
     finally:
         if not tracer.donothing:
             GlobalTracer.settrace(None)
-
-    if opts.count:
-        for k, v in tracer.counts.items():
-            print(k, v)
+        if coverage is not None:
+            coverage.disable()
+
+    if coverage is not None:
+        for module in coverage.line_coverage():
+            print(f"{module.line_rate():7.1%} {module.lines_covered():5}/{len(module.lines):<5} {module.path}")
+        if opts.lcov:
+            coverage.write_lcov(opts.lcov)
+        if opts.cobertura:
+            coverage.write_cobertura(opts.cobertura)
 
 if __name__=='__main__':
     main()
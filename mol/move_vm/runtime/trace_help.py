@@ -50,8 +50,11 @@ class TracableFrame(JsonPrintable):
         if gtrace is not None:
             gtrace.__self__.reset()
 
-    def trace_call(self):
+    # `gas_left` is the gas left when the frame is entered, or returns, for the tracer to read
+    # from `frame.gas_left`.
+    def trace_call(self, gas_left: Optional[int] = None):
         TracableFrame.CURRENT_FRAME = self
+        self.gas_left = gas_left
         gtrace = GlobalTracer.gettrace()
         if gtrace is not None:
             self.try_attach_mapping()
@@ -66,7 +69,8 @@ class TracableFrame(JsonPrintable):
                 else:
                     self.f_trace = ltrace
 
-    def trace_return(self, operand_stack):
+    def trace_return(self, operand_stack, gas_left: Optional[int] = None):
+        self.gas_left = gas_left
         gtrace = GlobalTracer.gettrace()
         if gtrace is not None:
             size = self.function.return_count()
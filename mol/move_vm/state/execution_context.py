@@ -1,4 +1,5 @@
 from __future__ import annotations
+from mol.move_vm.runtime.gas_meter import GasProfiler
 from mol.move_vm.runtime.interpreter_context import InterpreterContextImpl
 # from mol.libra_vm.counters import *
 from mol.move_vm.state.data_cache import RemoteCache, TransactionDataCache
@@ -51,6 +52,8 @@ class TransactionExecutionContext(InterpreterContextImpl, ChainState, JsonPrinta
     event_data: List[ContractEvent]
     # Data store
     data_view: TransactionDataCache
+    # Attribution of the gas deducted, when profiling.
+    gas_profiler: Optional[GasProfiler] = None
 
 
     @classmethod
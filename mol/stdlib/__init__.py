@@ -1 +1,7 @@
-from mol.stdlib.stdlib import *
\ No newline at end of file
+from mol.stdlib.stdlib import *
+from mol.stdlib import stdlib
+
+
+# Resolves the lazily built names of `mol.stdlib.stdlib`, e.g. `STAGED_MOVELANG_STDLIB`.
+def __getattr__(name: str):
+    return getattr(stdlib, name)
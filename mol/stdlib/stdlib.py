@@ -3,6 +3,7 @@ from mol.bytecode_verifier import VerifiedModule
 import os, json
 from os import listdir
 from os.path import isfile, join, abspath, dirname
+from functools import lru_cache
 from typing import List, Mapping, Optional
 from canoser import Struct
 
@@ -22,18 +23,33 @@ def build_stdlib() -> List[VerifiedModule]:
     return [VerifiedModule.new(x) for x in cms]
 
 
-STAGED_MOVELANG_STDLIB = build_stdlib()
-
+# The staged stdlib is verified on first use rather than on import, and the same list is returned
+# from then on.
+@lru_cache(maxsize=None)
 def stdlib_modules()  -> List[VerifiedModule]:
-    return STAGED_MOVELANG_STDLIB
+    return build_stdlib()
+
+# `STAGED_MOVELANG_STDLIB` is an alias of `stdlib_modules()`, resolved when first accessed.
+def __getattr__(name: str):
+    if name == "STAGED_MOVELANG_STDLIB":
+        return stdlib_modules()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def find_stdlib_module_by_name(name: str)  -> Optional[VerifiedModule]:
-    for module in STAGED_MOVELANG_STDLIB:
+    for module in stdlib_modules():
         if module.name() == name:
             return module
     return None
 
 
+# Returns the compiled bytes of the staged transaction script `name`, e.g. "peer_to_peer".
+def staged_transaction_script(name: str) -> bytes:
+    curdir = dirname(__file__)
+    filename = join(curdir, "./staged/transaction_scripts", name + ".mv")
+    with open(filename, 'rb') as file:
+        return file.read()
+
+
 def build_stdlib_map() -> Mapping[str, CompiledModule]:
     ret = {}
     modules = parse_stdlib_file()
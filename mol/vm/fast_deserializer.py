@@ -0,0 +1,626 @@
+from __future__ import annotations
+from mol.vm.vm_exception import VMException
+from mol.vm.deserializer import Table, check_tables
+from mol.vm.file_format import *
+from mol.vm.file_format_common import *
+from libra.account_address import ADDRESS_LENGTH
+from libra.vm_error import StatusCode, VMStatus
+from canoser import Uint16
+from typing import Callable, List, Optional, Tuple
+import struct
+
+# Deserializer backend working directly over a `memoryview` of the binary.
+#
+# It produces the same `CompiledModuleMut`/`CompiledScriptMut` and reports the same status codes
+# as `deserializer.py`, which is kept as the reference implementation. Instead of going through a
+# `Cursor` one call per byte, every reader takes the view of a table and a position and returns
+# the value read together with the next position. Each table gets its own view, so reading past
+# the end of a table raises `IndexError` or `struct.error`, both reported as `MALFORMED`.
+# Instructions are decoded through `OPCODE_TABLE`, which maps each opcode byte to its operand
+# decoder.
+#
+# With `lazy`, code streams of function definitions are only scanned for their length and left in
+# the binary as `LazyCodeUnit`s.
+
+Position = int
+
+_U16 = struct.Struct("<H")
+_U64 = struct.Struct("<Q")
+_U128 = struct.Struct("<QQ")
+_TABLE_HEADER = struct.Struct("<BII")
+
+
+def malformed(message: str = None) -> VMException:
+    status = VMStatus(StatusCode.MALFORMED)
+    if message is not None:
+        status = status.with_message(message)
+    return VMException(status)
+
+
+# Module internal function that manages deserialization of transactions.
+def deserialize_compiled_script(binary: bytes) -> CompiledScriptMut:
+    try:
+        view = memoryview(binary)
+        tables = read_tables(view)
+        script = CompiledScriptMut.default()
+        build_common_tables(view, tables, script)
+        build_script_tables(view, tables, script)
+        return script
+    except (IndexError, struct.error) as err:
+        raise malformed(err.__str__())
+
+
+# Module internal function that manages deserialization of modules.
+def deserialize_compiled_module(binary: bytes, lazy: bool = False) -> CompiledModuleMut:
+    try:
+        view = memoryview(binary)
+        tables = read_tables(view)
+        module = CompiledModuleMut.default()
+        build_common_tables(view, tables, module)
+        build_module_tables(view, tables, module, lazy)
+        return module
+    except (IndexError, struct.error) as err:
+        raise malformed(err.__str__())
+
+
+# Verifies the header of the binary, reads all the table headers and checks them.
+def read_tables(view: memoryview) -> List[Table]:
+    magic_size = BinaryConstants.LIBRA_MAGIC_SIZE
+    if len(view) < magic_size:
+        raise malformed()
+    if view[:magic_size] != BinaryConstants.LIBRA_MAGIC:
+        raise VMException(VMStatus(StatusCode.BAD_MAGIC))
+    for (offset, version) in [(magic_size, 1), (magic_size + 1, 0)]:
+        if view[offset] != version:
+            raise VMException(VMStatus(StatusCode.UNKNOWN_VERSION))
+    table_count = view[magic_size + 2]
+
+    pos = BinaryConstants.HEADER_SIZE
+    tables = []
+    for _count in range(table_count):
+        (kind, offset, count) = _TABLE_HEADER.unpack_from(view, pos)
+        pos += _TABLE_HEADER.size
+        tables.append(Table(TableType.from_u8(kind), offset, count))
+    check_tables(tables, pos, len(view))
+    return tables
+
+
+def table_view(view: memoryview, table: Table) -> memoryview:
+    return view[table.offset:table.offset + table.count]
+
+
+# Builds the common tables in a compiled unit.
+def build_common_tables(view: memoryview, tables: List[Table], common: Any):
+    for table in tables:
+        loader = COMMON_TABLE_LOADERS.get(table.kind)
+        if loader is not None:
+            loader(table_view(view, table), getattr(common, COMMON_TABLE_FIELDS[table.kind]))
+        elif table.kind not in MODULE_TABLE_KINDS:
+            raise malformed()
+
+
+# Builds tables related to a `CompiledModuleMut`.
+def build_module_tables(
+    view: memoryview,
+    tables: List[Table],
+    module: CompiledModuleMut,
+    lazy: bool = False,
+):
+    for table in tables:
+        if table.kind == TableType.STRUCT_DEFS:
+            load_struct_defs(table_view(view, table), module.struct_defs)
+        elif table.kind == TableType.FIELD_DEFS:
+            load_field_defs(table_view(view, table), module.field_defs)
+        elif table.kind == TableType.FUNCTION_DEFS and lazy:
+            load_lazy_function_defs(view, table, module.function_defs)
+        elif table.kind == TableType.FUNCTION_DEFS:
+            load_function_defs(table_view(view, table), module.function_defs)
+        elif table.kind == TableType.MAIN:
+            raise malformed("Module doesn't have main function.")
+        elif table.kind not in COMMON_TABLE_LOADERS:
+            raise malformed()
+
+
+# Builds tables related to a `CompiledScriptMut`.
+def build_script_tables(view: memoryview, tables: List[Table], script: CompiledScriptMut):
+    for table in tables:
+        if table.kind == TableType.MAIN:
+            (script.main, _pos) = load_function_def(table_view(view, table), 0)
+        elif table.kind not in COMMON_TABLE_LOADERS:
+            raise malformed()
+
+
+# Reads a ULEB128 value that does not need more than `max_shift / 7 + 1` bytes. The hot loops
+# below inline the common single byte case and only call this for larger values.
+def read_uleb128(view: memoryview, pos: Position, max_shift: int = 14) -> Tuple[int, Position]:
+    value = 0
+    shift = 0
+    while True:
+        byte = view[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return (value, pos)
+        shift += 7
+        if shift > max_shift:
+            raise malformed("invalid ULEB128 representation")
+
+
+def read_uleb_u16(view: memoryview, pos: Position) -> Tuple[int, Position]:
+    byte = view[pos]
+    if byte < 0x80:
+        return (byte, pos + 1)
+    return read_uleb128(view, pos)
+
+
+def read_bytes(view: memoryview, pos: Position, size: int) -> Tuple[bytes, Position]:
+    end = pos + size
+    if end > len(view):
+        raise malformed(f"{end} exceed buffer size: {len(view)}")
+    return (view[pos:end].tobytes(), end)
+
+
+# Builds the `ModuleHandle` table.
+def load_module_handles(view: memoryview, module_handles: List[ModuleHandle]):
+    pos = 0
+    end = len(view)
+    while pos < end:
+        (address, pos) = read_uleb_u16(view, pos)
+        (name, pos) = read_uleb_u16(view, pos)
+        module_handles.append(ModuleHandle(
+            address = AddressPoolIndex(address),
+            name = IdentifierIndex(name),
+        ))
+
+
+# Builds the `StructHandle` table.
+def load_struct_handles(view: memoryview, struct_handles: List[StructHandle]):
+    pos = 0
+    end = len(view)
+    while pos < end:
+        (module_handle, pos) = read_uleb_u16(view, pos)
+        (name, pos) = read_uleb_u16(view, pos)
+        flag = SerializedNominalResourceFlag.from_u8(view[pos])
+        pos += 1
+        (type_formals, pos) = load_kinds(view, pos)
+        struct_handles.append(StructHandle(
+            ModuleHandleIndex(module_handle),
+            IdentifierIndex(name),
+            flag == SerializedNominalResourceFlag.NOMINAL_RESOURCE,
+            type_formals,
+        ))
+
+
+# Builds the `FunctionHandle` table.
+def load_function_handles(view: memoryview, function_handles: List[FunctionHandle]):
+    pos = 0
+    end = len(view)
+    while pos < end:
+        (module_handle, pos) = read_uleb_u16(view, pos)
+        (name, pos) = read_uleb_u16(view, pos)
+        (signature, pos) = read_uleb_u16(view, pos)
+        function_handles.append(FunctionHandle(
+            module = ModuleHandleIndex(module_handle),
+            name = IdentifierIndex(name),
+            signature = FunctionSignatureIndex(signature),
+        ))
+
+
+# Builds the `AddressPool`.
+def load_address_pool(view: memoryview, addresses: AddressPool):
+    if len(view) % ADDRESS_LENGTH != 0:
+        raise malformed()
+    for start in range(0, len(view), ADDRESS_LENGTH):
+        addresses.append(view[start:start + ADDRESS_LENGTH].tobytes())
+
+
+# Reads the blobs of the `IdentifierPool` and `ByteArrayPool`.
+def load_blobs(view: memoryview) -> List[bytes]:
+    blobs = []
+    pos = 0
+    end = len(view)
+    while pos < end:
+        (size, pos) = read_uleb128(view, pos, 28)
+        if size > Uint16.max_value:
+            raise malformed()
+        (blob, pos) = read_bytes(view, pos, size)
+        blobs.append(blob)
+    return blobs
+
+
+# Builds the `IdentifierPool`.
+def load_identifiers(view: memoryview, identifiers: IdentifierPool):
+    for blob in load_blobs(view):
+        try:
+            identifiers.append(blob.decode("utf-8"))
+        except UnicodeDecodeError as err:
+            raise malformed(err.__str__())
+
+
+# Builds the `ByteArrayPool`.
+def load_byte_array_pool(view: memoryview, byte_arrays: bytearrayPool):
+    for blob in load_blobs(view):
+        byte_arrays.append(bytearray(blob))
+
+
+def expect_signature_type(view: memoryview, pos: Position, expected: SignatureType) -> Position:
+    if view[pos] != expected:
+        raise VMException(VMStatus(StatusCode.UNEXPECTED_SIGNATURE_TYPE))
+    return pos + 1
+
+
+# Builds the `TypeSignaturePool`.
+def load_type_signatures(view: memoryview, type_signatures: TypeSignaturePool):
+    pos = 0
+    end = len(view)
+    while pos < end:
+        pos = expect_signature_type(view, pos, SignatureType.TYPE_SIGNATURE)
+        (token, pos) = load_signature_token(view, pos)
+        type_signatures.append(TypeSignature(token))
+
+
+# Builds the `FunctionSignaturePool`.
+def load_function_signatures(view: memoryview, function_signatures: FunctionSignaturePool):
+    pos = 0
+    end = len(view)
+    while pos < end:
+        pos = expect_signature_type(view, pos, SignatureType.FUNCTION_SIGNATURE)
+        (returns_signature, pos) = load_signature_token_list(view, pos)
+        (args_signature, pos) = load_signature_token_list(view, pos)
+        (type_formals, pos) = load_kinds(view, pos)
+        function_signatures.append(FunctionSignature(
+            returns_signature,
+            args_signature,
+            type_formals,
+        ))
+
+
+# Builds the `LocalsSignaturePool`.
+def load_locals_signatures(view: memoryview, locals_signatures: LocalsSignaturePool):
+    pos = 0
+    end = len(view)
+    while pos < end:
+        pos = expect_signature_type(view, pos, SignatureType.LOCAL_SIGNATURE)
+        (local_signature, pos) = load_signature_token_list(view, pos)
+        locals_signatures.append(LocalsSignature(local_signature))
+
+
+# Deserializes a list of `SignatureToken`s prefixed by a one byte count.
+def load_signature_token_list(view: memoryview, pos: Position) -> Tuple[List[SignatureToken], Position]:
+    token_count = view[pos]
+    pos += 1
+    tokens = []
+    for _i in range(token_count):
+        (token, pos) = load_signature_token(view, pos)
+        tokens.append(token)
+    return (tokens, pos)
+
+
+# Deserializes a list of `SignatureToken`s prefixed by a ULEB128 count.
+def load_signature_tokens(view: memoryview, pos: Position) -> Tuple[List[SignatureToken], Position]:
+    (length, pos) = read_uleb_u16(view, pos)
+    tokens = []
+    for _ in range(length):
+        (token, pos) = load_signature_token(view, pos)
+        tokens.append(token)
+    return (tokens, pos)
+
+
+# Deserializes a `SignatureToken`.
+def load_signature_token(view: memoryview, pos: Position) -> Tuple[SignatureToken, Position]:
+    stype = SerializedType.from_u8(view[pos])
+    pos += 1
+    if stype in PRIMITIVE_TYPES:
+        return (SignatureToken(stype), pos)
+    elif stype == SerializedType.VECTOR:
+        (ty, pos) = load_signature_token(view, pos)
+        return (SignatureToken(stype, vector_type=ty), pos)
+    elif stype == SerializedType.REFERENCE or stype == SerializedType.MUTABLE_REFERENCE:
+        (ref_token, pos) = load_signature_token(view, pos)
+        return (SignatureToken(stype, reference=ref_token), pos)
+    elif stype == SerializedType.STRUCT:
+        (sh_idx, pos) = read_uleb_u16(view, pos)
+        (types, pos) = load_signature_tokens(view, pos)
+        return (SignatureToken(stype, struct=(StructHandleIndex(sh_idx), types)), pos)
+    elif stype == SerializedType.TYPE_PARAMETER:
+        (idx, pos) = read_uleb_u16(view, pos)
+        return (SignatureToken(stype, typeParameter=idx), pos)
+    else:
+        raise malformed()
+
+
+def load_kinds(view: memoryview, pos: Position) -> Tuple[List[Kind], Position]:
+    (length, pos) = read_uleb_u16(view, pos)
+    kinds = []
+    for _ in range(length):
+        kinds.append(KINDS[SerializedKind.from_u8(view[pos])])
+        pos += 1
+    return (kinds, pos)
+
+
+# Builds the `StructDefinition` table.
+def load_struct_defs(view: memoryview, struct_defs: List[StructDefinition]):
+    pos = 0
+    end = len(view)
+    while pos < end:
+        (struct_handle, pos) = read_uleb_u16(view, pos)
+        flag = SerializedNativeStructFlag.from_u8(view[pos])
+        pos += 1
+        (field_count, pos) = read_uleb_u16(view, pos)
+        (fields, pos) = read_uleb_u16(view, pos)
+        if flag == SerializedNativeStructFlag.NATIVE:
+            if field_count != 0 or fields != 0:
+                raise malformed()
+            field_information = StructFieldInformation.Native()
+        else:
+            field_information = StructFieldInformation.Declared(
+                field_count,
+                FieldDefinitionIndex(fields),
+            )
+        struct_defs.append(StructDefinition(
+            StructHandleIndex(struct_handle),
+            field_information,
+        ))
+
+
+# Builds the `FieldDefinition` table.
+def load_field_defs(view: memoryview, field_defs: List[FieldDefinition]):
+    pos = 0
+    end = len(view)
+    while pos < end:
+        (struct_, pos) = read_uleb_u16(view, pos)
+        (name, pos) = read_uleb_u16(view, pos)
+        (signature, pos) = read_uleb_u16(view, pos)
+        field_defs.append(FieldDefinition(
+            StructHandleIndex(struct_),
+            IdentifierIndex(name),
+            TypeSignatureIndex(signature),
+        ))
+
+
+# Builds the `FunctionDefinition` table.
+def load_function_defs(view: memoryview, func_defs: List[FunctionDefinition]):
+    pos = 0
+    end = len(view)
+    while pos < end:
+        (func_def, pos) = load_function_def(view, pos)
+        func_defs.append(func_def)
+
+
+# Builds the `FunctionDefinition` table with `LazyCodeUnit`s. Positions are relative to the start
+# of the binary, which the code units keep a reference to.
+def load_lazy_function_defs(view: memoryview, table: Table, func_defs: List[FunctionDefinition]):
+    end = table.offset + table.count
+    view = view[:end]
+    pos = table.offset
+    while pos < end:
+        (func_def, pos) = load_function_def(view, pos, lazy=True)
+        func_defs.append(func_def)
+
+
+# Deserializes a `FunctionDefinition`.
+def load_function_def(
+    view: memoryview,
+    pos: Position,
+    lazy: bool = False,
+) -> Tuple[FunctionDefinition, Position]:
+    (function, pos) = read_uleb_u16(view, pos)
+    flags = view[pos]
+    length = view[pos + 1]
+    pos += 2
+    acquires_global_resources = []
+    for _ in range(length):
+        (idx, pos) = read_uleb_u16(view, pos)
+        acquires_global_resources.append(StructDefinitionIndex(idx))
+    if lazy:
+        (code_unit, pos) = load_lazy_code_unit(view, pos)
+    else:
+        (code_unit, pos) = load_code_unit(view, pos)
+    return (FunctionDefinition(
+        FunctionHandleIndex(function),
+        flags,
+        acquires_global_resources,
+        code_unit,
+    ), pos)
+
+
+# Deserializes a `CodeUnit`.
+def load_code_unit(view: memoryview, pos: Position) -> Tuple[CodeUnit, Position]:
+    (max_stack_size, pos) = read_uleb_u16(view, pos)
+    (locals_, pos) = read_uleb_u16(view, pos)
+    (code, pos) = load_code(view, pos)
+    return (CodeUnit(max_stack_size, LocalsSignatureIndex(locals_), code), pos)
+
+
+# Deserializes a `CodeUnit` without its code stream, which is only scanned for its length.
+# `view` must start at the beginning of the binary.
+def load_lazy_code_unit(view: memoryview, pos: Position) -> Tuple[LazyCodeUnit, Position]:
+    (max_stack_size, pos) = read_uleb_u16(view, pos)
+    (locals_, pos) = read_uleb_u16(view, pos)
+    code_unit = LazyCodeUnit(
+        max_stack_size,
+        LocalsSignatureIndex(locals_),
+        view.obj,
+        pos,
+        len(view),
+    )
+    return (code_unit, skip_code(view, pos))
+
+
+# Returns the position right after the code stream at `pos`, without decoding it.
+def skip_code(view: memoryview, pos: Position) -> Position:
+    (bytecode_count,) = _U16.unpack_from(view, pos)
+    pos += 2
+    table = OPCODE_TABLE
+    for _ in range(bytecode_count):
+        (opcode, decoder) = table[view[pos]]
+        pos += 1
+        if opcode is None:
+            decode_unknown_opcode(view, pos)
+        elif decoder is not None:
+            (fixed, ulebs) = decoder.width
+            pos += fixed
+            for _ in range(ulebs):
+                while view[pos] >= 0x80:
+                    pos += 1
+                pos += 1
+    if pos > len(view):
+        raise malformed()
+    return pos
+
+
+# Decodes the code stream of a `LazyCodeUnit`.
+def decode_code(binary: bytes, start: Position, end: Position) -> List[Bytecode]:
+    try:
+        (code, _pos) = load_code(memoryview(binary)[:end], start)
+        return code
+    except (IndexError, struct.error) as err:
+        raise malformed(err.__str__())
+
+
+# Deserializes a code stream (`Bytecode`s).
+def load_code(view: memoryview, pos: Position) -> Tuple[List[Bytecode], Position]:
+    (bytecode_count,) = _U16.unpack_from(view, pos)
+    pos += 2
+    code = []
+    append = code.append
+    table = OPCODE_TABLE
+    for _ in range(bytecode_count):
+        (opcode, decoder) = table[view[pos]]
+        pos += 1
+        if decoder is None:
+            append(Bytecode(opcode))
+        else:
+            (value, pos) = decoder(view, pos)
+            append(Bytecode(opcode, value))
+    return (code, pos)
+
+
+# Operand decoders, indexed by opcode in `OPCODE_TABLE`. Each one takes the position right after
+# the opcode byte and returns the operand and the position of the next instruction. Its `width`
+# is the count of fixed size bytes and of ULEB128 values in the operand, used by `skip_code`.
+
+def decode_u8(view: memoryview, pos: Position) -> Tuple[int, Position]:
+    return (view[pos], pos + 1)
+decode_u8.width = (1, 0)
+
+
+def decode_u16(view: memoryview, pos: Position) -> Tuple[int, Position]:
+    return (_U16.unpack_from(view, pos)[0], pos + 2)
+decode_u16.width = (2, 0)
+
+
+def decode_u64(view: memoryview, pos: Position) -> Tuple[int, Position]:
+    return (_U64.unpack_from(view, pos)[0], pos + 8)
+decode_u64.width = (8, 0)
+
+
+def decode_u128(view: memoryview, pos: Position) -> Tuple[int, Position]:
+    (low, high) = _U128.unpack_from(view, pos)
+    return ((high << 64) | low, pos + 16)
+decode_u128.width = (16, 0)
+
+
+def index_decoder(index_type: type) -> Callable:
+    def decode(view: memoryview, pos: Position) -> Tuple[Index, Position]:
+        idx = view[pos]
+        if idx < 0x80:
+            return (index_type(idx), pos + 1)
+        (idx, pos) = read_uleb128(view, pos)
+        return (index_type(idx), pos)
+    decode.width = (0, 1)
+    return decode
+
+
+def instantiation_decoder(index_type: type) -> Callable:
+    def decode(view: memoryview, pos: Position) -> Tuple[Tuple[Index, LocalsSignatureIndex], Position]:
+        idx = view[pos]
+        if idx < 0x80:
+            pos += 1
+        else:
+            (idx, pos) = read_uleb128(view, pos)
+        types_idx = view[pos]
+        if types_idx < 0x80:
+            pos += 1
+        else:
+            (types_idx, pos) = read_uleb128(view, pos)
+        return ((index_type(idx), LocalsSignatureIndex(types_idx)), pos)
+    decode.width = (0, 2)
+    return decode
+
+
+def decode_unknown_opcode(view: memoryview, pos: Position):
+    raise VMException(VMStatus(StatusCode.UNKNOWN_OPCODE))
+
+
+OPERAND_DECODERS: Mapping[Opcodes, Callable] = {
+    Opcodes.BR_TRUE: decode_u16,
+    Opcodes.BR_FALSE: decode_u16,
+    Opcodes.BRANCH: decode_u16,
+    Opcodes.LD_U8: decode_u8,
+    Opcodes.LD_U64: decode_u64,
+    Opcodes.LD_U128: decode_u128,
+    Opcodes.LD_ADDR: index_decoder(AddressPoolIndex),
+    Opcodes.LD_BYTEARRAY: index_decoder(ByteArrayPoolIndex),
+    Opcodes.COPY_LOC: decode_u8,
+    Opcodes.MOVE_LOC: decode_u8,
+    Opcodes.ST_LOC: decode_u8,
+    Opcodes.MUT_BORROW_LOC: decode_u8,
+    Opcodes.IMM_BORROW_LOC: decode_u8,
+    Opcodes.MUT_BORROW_FIELD: index_decoder(FieldDefinitionIndex),
+    Opcodes.IMM_BORROW_FIELD: index_decoder(FieldDefinitionIndex),
+    Opcodes.CALL: instantiation_decoder(FunctionHandleIndex),
+    Opcodes.PACK: instantiation_decoder(StructDefinitionIndex),
+    Opcodes.UNPACK: instantiation_decoder(StructDefinitionIndex),
+    Opcodes.EXISTS: instantiation_decoder(StructDefinitionIndex),
+    Opcodes.MUT_BORROW_GLOBAL: instantiation_decoder(StructDefinitionIndex),
+    Opcodes.IMM_BORROW_GLOBAL: instantiation_decoder(StructDefinitionIndex),
+    Opcodes.MOVE_FROM: instantiation_decoder(StructDefinitionIndex),
+    Opcodes.MOVE_TO: instantiation_decoder(StructDefinitionIndex),
+}
+
+# (opcode, operand decoder) for every byte value. Bytes that are not an opcode map to a decoder
+# raising `UNKNOWN_OPCODE`; opcodes without operand have no decoder.
+OPCODE_TABLE: List[Tuple[Optional[Opcodes], Optional[Callable]]] = \
+    [(None, decode_unknown_opcode)] * 256
+for _opcode in Opcodes:
+    OPCODE_TABLE[_opcode] = (_opcode, OPERAND_DECODERS.get(_opcode))
+
+PRIMITIVE_TYPES = frozenset(x for x in SerializedType if x.is_primitive())
+
+KINDS: Mapping[SerializedKind, Kind] = {
+    SerializedKind.ALL: Kind.All,
+    SerializedKind.UNRESTRICTED: Kind.Unrestricted,
+    SerializedKind.RESOURCE: Kind.Resource,
+}
+
+COMMON_TABLE_LOADERS: Mapping[TableType, Callable] = {
+    TableType.MODULE_HANDLES: load_module_handles,
+    TableType.STRUCT_HANDLES: load_struct_handles,
+    TableType.FUNCTION_HANDLES: load_function_handles,
+    TableType.ADDRESS_POOL: load_address_pool,
+    TableType.IDENTIFIERS: load_identifiers,
+    TableType.BYTE_ARRAY_POOL: load_byte_array_pool,
+    TableType.TYPE_SIGNATURES: load_type_signatures,
+    TableType.FUNCTION_SIGNATURES: load_function_signatures,
+    TableType.LOCALS_SIGNATURES: load_locals_signatures,
+}
+
+COMMON_TABLE_FIELDS: Mapping[TableType, str] = {
+    TableType.MODULE_HANDLES: "module_handles",
+    TableType.STRUCT_HANDLES: "struct_handles",
+    TableType.FUNCTION_HANDLES: "function_handles",
+    TableType.ADDRESS_POOL: "address_pool",
+    TableType.IDENTIFIERS: "identifiers",
+    TableType.BYTE_ARRAY_POOL: "byte_array_pool",
+    TableType.TYPE_SIGNATURES: "type_signatures",
+    TableType.FUNCTION_SIGNATURES: "function_signatures",
+    TableType.LOCALS_SIGNATURES: "locals_signatures",
+}
+
+MODULE_TABLE_KINDS = frozenset([
+    TableType.STRUCT_DEFS,
+    TableType.FIELD_DEFS,
+    TableType.FUNCTION_DEFS,
+    TableType.MAIN,
+])
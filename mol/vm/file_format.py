@@ -8,6 +8,7 @@ from libra.account_address import Address
 from mol.move_core.types.identifier import IdentStr, Identifier
 from mol.move_core import JsonPrintable
 from libra.language_storage import ModuleId
+from libra.hasher import HashValue
 from libra.vm_error import StatusCode, VMStatus
 from libra.rustlib import ensure, bail, usize, flatten
 from canoser import Uint8, Uint32, Uint16, Uint64, Uint128
@@ -647,9 +648,12 @@ class SignatureToken:
 
 
     # Creating a new type by Substituting the type variables with type actuals.
+    #
+    # Tokens are treated as immutable: subtrees without type variables and the substituted
+    # actuals are shared with the inputs rather than copied.
     def substitute(self, tys: List[SignatureToken]) -> SignatureToken:
         if self.is_primitive():
-            return deepcopy(self)
+            return self
         elif self.tag == SerializedType.VECTOR:
             ty = self.vector_type
             return SignatureToken(
@@ -670,7 +674,7 @@ class SignatureToken:
             )
         elif self.tag == SerializedType.TYPE_PARAMETER:
             idx = self.typeParameter
-            return deepcopy(tys[int(idx)])
+            return tys[int(idx)]
         else:
             bail("unreachable!")
 
@@ -730,6 +734,54 @@ class CodeUnit:
     # A native function implemented in Rust.
     NATIVE = 0x2
 
+    # Whether the code stream is in memory, see `LazyCodeUnit`.
+    def is_decoded(self) -> bool:
+        return "code" in self.__dict__
+
+
+# A `CodeUnit` of a lazily deserialized module (see `CompiledModule.deserialize_lazy`). The code
+# stream stays in the binary, as the byte range `start..end`, until `code` is first accessed. It
+# is then decoded and bounds checked against the module recorded by the bounds checker when the
+# module was frozen; a malformed code stream raises `VMException` at that point.
+class LazyCodeUnit(CodeUnit):
+    def __init__(
+        self,
+        max_stack_size: Uint16,
+        locals: LocalsSignatureIndex,
+        binary: bytes,
+        start: usize,
+        end: usize,
+    ):
+        self.max_stack_size = max_stack_size
+        self.locals = locals
+        self.binary = binary
+        self.start = start
+        self.end = end
+        self.bounds_context = None
+
+
+    def __getattr__(self, name):
+        if name != "code":
+            raise AttributeError(name)
+        from mol.vm.fast_deserializer import decode_code
+        from mol.vm.check_bounds import check_bounds_CodeUnit
+        code = decode_code(self.binary, self.start, self.end)
+        self.code = code
+        if self.bounds_context is not None:
+            errors = check_bounds_CodeUnit(self, self.bounds_context)
+            if errors:
+                del self.code
+                raise VMException(errors)
+        return code
+
+
+    def check_bounds(self, context) -> List[VMStatus]:
+        if self.is_decoded():
+            from mol.vm.check_bounds import check_bounds_CodeUnit
+            return check_bounds_CodeUnit(self, context)
+        self.bounds_context = context
+        return []
+
 
 # `Bytecode` is a VM instruction of variable size. The type of the bytecode (opcode) defines
 # the size of the bytecode.
@@ -1142,6 +1194,9 @@ class CompiledProgram:
 # A CompiledScript does not have definition tables because it can only have a `main(args)`.
 # A CompiledScript defines the constant pools (string, address, signatures, etc.), the handle
 # tables (external code references) and it has a `main` definition.
+#
+# Since it is immutable, a CompiledScript keeps the bytes it was deserialized from (or first
+# serialized to) and their hash. `into_inner` drops them, as the inner script may then change.
 @dataclass
 class CompiledScript(ScriptAccess):
     v0: CompiledScriptMut
@@ -1149,8 +1204,19 @@ class CompiledScript(ScriptAccess):
     # Returns the index of `main` in case a script is converted to a module.
     MAIN_INDEX: FunctionDefinitionIndex = FunctionDefinitionIndex(0)
 
+    binary: Optional[bytes] = field(default=None, compare=False, repr=False)
+    sha3_256: Optional[HashValue] = field(default=None, compare=False, repr=False)
+
     def serialize(self) -> bytes:
-        return self.as_inner().serialize()
+        if self.binary is None:
+            self.binary = bytes(self.as_inner().serialize())
+        return self.binary
+
+    # Returns the SHA3-256 hash of the serialized script.
+    def hash_value(self) -> HashValue:
+        if self.sha3_256 is None:
+            self.sha3_256 = HashValue.from_sha3_256(self.serialize())
+        return self.sha3_256
 
     # Deserializes a bytes slice into a `CompiledScript` instance.
     @classmethod
@@ -1158,7 +1224,9 @@ class CompiledScript(ScriptAccess):
         binary = bytes(binary)
         try:
             deserialized = CompiledScriptMut.deserialize_no_check_bounds(binary)
-            return deserialized.freeze()
+            script = deserialized.freeze()
+            script.binary = binary
+            return script
         except VMException:
             raise
         except Exception as err:
@@ -1179,6 +1247,8 @@ class CompiledScript(ScriptAccess):
     # Converts this instance into the inner `CompiledScriptMut`. Converting back to a
     # `CompiledScript` would require it to be verified again.
     def into_inner(self) -> CompiledScriptMut:
+        self.binary = None
+        self.sha3_256 = None
         return self.v0
 
 
@@ -1237,7 +1307,7 @@ class CompiledScriptMut:
     # exposed as a public function to enable testing the deserializer
     @classmethod
     def deserialize_no_check_bounds(cls, binary: bytes) -> CompiledScriptMut:
-        from mol.vm.deserializer import deserialize_compiled_script
+        from mol.vm.fast_deserializer import deserialize_compiled_script
         return deserialize_compiled_script(binary)
 
     # Converts this instance into `CompiledScript` after verifying it for basic internal
@@ -1275,6 +1345,9 @@ class CompiledScriptMut:
 # It is a unit of code that can be used by transactions or other modules.
 #
 # A module is published as a single entry and it is retrieved as a single blob.
+#
+# Since it is immutable, a CompiledModule keeps the bytes it was deserialized from (or first
+# serialized to) and their hash. `into_inner` drops them, as the inner module may then change.
 @dataclass
 class CompiledModule(ModuleAccess):
     v0: CompiledModuleMut
@@ -1282,8 +1355,19 @@ class CompiledModule(ModuleAccess):
     # By convention, the index of the module being implemented is 0.
     IMPLEMENTED_MODULE_INDEX: Uint16 = 0
 
+    binary: Optional[bytes] = field(default=None, compare=False, repr=False)
+    sha3_256: Optional[HashValue] = field(default=None, compare=False, repr=False)
+
     def serialize(self) -> bytes:
-        return bytes(self.as_inner().serialize())
+        if self.binary is None:
+            self.binary = bytes(self.as_inner().serialize())
+        return self.binary
+
+    # Returns the SHA3-256 hash of the serialized module.
+    def hash_value(self) -> HashValue:
+        if self.sha3_256 is None:
+            self.sha3_256 = HashValue.from_sha3_256(self.serialize())
+        return self.sha3_256
 
 
     # Deserialize a bytes slice into a `CompiledModule` instance.
@@ -1292,7 +1376,9 @@ class CompiledModule(ModuleAccess):
         binary = bytes(binary)
         try:
             deserialized = CompiledModuleMut.deserialize_no_check_bounds(binary)
-            return deserialized.freeze()
+            module = deserialized.freeze()
+            module.binary = binary
+            return module
         except VMException:
             raise
         except Exception as err:
@@ -1301,6 +1387,17 @@ class CompiledModule(ModuleAccess):
             raise VMException(status)
 
 
+    # Deserialize a bytes slice into a `CompiledModule` whose function bodies are `LazyCodeUnit`s.
+    # Tables and handles are bounds checked here, each code stream when it is first accessed.
+    @classmethod
+    def deserialize_lazy(cls, binary: bytes) -> CompiledModule:
+        from mol.vm.fast_deserializer import deserialize_compiled_module
+        binary = bytes(binary)
+        module = deserialize_compiled_module(binary, lazy=True).freeze()
+        module.binary = binary
+        return module
+
+
     #impl ModuleAccess for CompiledModule:
     def as_module(self) -> CompiledModule:
         return self
@@ -1312,6 +1409,8 @@ class CompiledModule(ModuleAccess):
     # Converts this instance into the inner `CompiledModuleMut`. Converting back to a
     # `CompiledModule` would require it to be verified again.
     def into_inner(self) -> CompiledModuleMut:
+        self.binary = None
+        self.sha3_256 = None
         return self.v0
 
     # Returns the number of items of a specific `IndexKind`.
@@ -1407,7 +1506,7 @@ class CompiledModuleMut:
     # exposed as a public function to enable testing the deserializer
     @classmethod
     def deserialize_no_check_bounds(cls, binary: bytes) -> CompiledModuleMut:
-        from mol.vm.deserializer import deserialize_compiled_module
+        from mol.vm.fast_deserializer import deserialize_compiled_module
         return deserialize_compiled_module(binary)
 
 
@@ -0,0 +1,25 @@
+from mol.bytecode_verifier.borrow_graph import BorrowGraph, Edge, EdgeType
+from mol.bytecode_verifier.ref_id import RefID
+from libra.rustlib import assert_equal
+
+
+def test_snapshot_is_isolated():
+    graph = BorrowGraph.new()
+    root, a, b = RefID(0), RefID(1), RefID(2)
+    graph.add(root)
+    graph.add(a)
+    graph.add_weak_edge(root, ["f"], a)
+
+    snapshot = graph.snapshot()
+    assert snapshot.v0 is graph.v0
+
+    graph.add(b)
+    graph.add_strong_edge(root, ["f"], b)
+    assert b not in snapshot.v0
+    assert_equal(snapshot.v0[root], {Edge(EdgeType.Weak, ("f",), a)})
+    assert_equal(graph.v0[root], {Edge(EdgeType.Strong, ("f",), b)})
+    assert_equal(graph.v0[b], {Edge(EdgeType.Weak, (), a)})
+
+    snapshot.remove(a)
+    assert_equal(snapshot.v0[root], set())
+    assert a in graph.v0
@@ -1,4 +1,6 @@
-from mol.bytecode_verifier import CodeUnitVerifier
+from mol.bytecode_verifier import (
+    CodeUnitVerifier, enable_parallel_verification, disable_parallel_verification
+    )
 from libra.vm_error import StatusCode
 from mol.vm.file_format import *
 from mol.vm.file_format_common import Opcodes
@@ -46,3 +48,46 @@ def test_valid_fallthrough_abort():
     errors = CodeUnitVerifier.verify(module)
     assert not errors
 
+
+
+def multi_procedure_module(codes) -> CompiledModule:
+    module = empty_module()
+    module.function_signatures.append(FunctionSignature(
+        arg_types=[],
+        return_types=[],
+        type_formals=[],
+    ))
+    for (idx, code) in enumerate(codes):
+        code_unit = CodeUnit()
+        code_unit.code = code
+        fun_def = FunctionDefinition()
+        fun_def.function = FunctionHandleIndex(idx)
+        fun_def.code = code_unit
+        module.identifiers.append(f"f{idx}")
+        module.function_handles.append(FunctionHandle(
+            module=ModuleHandleIndex(0),
+            name=IdentifierIndex(idx + 1),
+            signature=FunctionSignatureIndex(0),
+        ))
+        module.function_defs.append(fun_def)
+    return module.freeze()
+
+
+def test_parallel_verification_same_errors():
+    codes = []
+    for idx in range(CodeUnitVerifier.PARALLEL_THRESHOLD + 5):
+        if idx % 3 == 0:
+            codes.append([Bytecode(Opcodes.LD_TRUE), Bytecode(Opcodes.POP)])
+        else:
+            codes.append([Bytecode(Opcodes.RET)])
+    module = multi_procedure_module(codes)
+    serial = CodeUnitVerifier.verify(module)
+    assert serial
+    try:
+        enable_parallel_verification(3)
+        assert_equal(CodeUnitVerifier.WORKERS, 3)
+        parallel = CodeUnitVerifier.verify(module)
+    finally:
+        disable_parallel_verification()
+    assert_equal(parallel, serial)
+    assert CodeUnitVerifier.POOL is None
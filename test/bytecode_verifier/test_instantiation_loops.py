@@ -0,0 +1,19 @@
+from mol.bytecode_verifier.instantiation_loops import strongly_connected_components
+from libra.rustlib import assert_equal
+
+
+def test_scc():
+    # 0 -> 1 -> 2 -> 0, 2 -> 3, 3 -> 3, 4 alone
+    succ = [[1], [2], [0, 3], [3], []]
+    sccs = [sorted(x) for x in strongly_connected_components(succ)]
+    assert_equal(sorted(sccs), [[0, 1, 2], [3], [4]])
+    # reverse topological order
+    assert sccs.index([3]) < sccs.index([0, 1, 2])
+
+
+def test_scc_deep_chain():
+    count = 100_000
+    succ = [[idx + 1] for idx in range(count - 1)] + [[0]]
+    sccs = strongly_connected_components(succ)
+    assert_equal(len(sccs), 1)
+    assert_equal(len(sccs[0]), count)
@@ -1,5 +1,9 @@
-from .testutils import compile_module_string_with_stdlib, compile_script_string_with_stdlib
+from .testutils import compile_module_string_with_stdlib, compile_script_string_with_stdlib, stdlib
+from mol.compiler.ir_to_bytecode.context import CompiledDependency, Context, DEPENDENCY_CACHE
+from mol.move_ir.types.ast import QualifiedModuleIdent
 from mol.vm.file_format import *
+from libra.account_address import Address
+from libra.rustlib import assert_equal
 from mol.vm import Opcodes, ScriptAccess
 import pytest
 
@@ -55,3 +59,27 @@ def test_compile_module_with_imports():
     """
     compiled_module_res = compile_module_string_with_stdlib(code)
     _compiled_module = compiled_module_res
+
+
+def test_dependencies_are_built_for_imported_modules_only():
+    code = """
+        import 0x0.LibraAccount;
+        import 0x0.LibraTimestamp;
+
+        main() {
+            let t: u64;
+            t = LibraTimestamp.now_microseconds();
+            return;
+        }
+    """
+    deps = stdlib()
+    DEPENDENCY_CACHE.clear()
+    compile_script_string_with_stdlib(code)
+    assert_equal(len(DEPENDENCY_CACHE), 1)
+
+    timestamp = [m for m in deps if m.name() == "LibraTimestamp"][0]
+    cached = CompiledDependency.cached(timestamp)
+    assert cached is list(DEPENDENCY_CACHE.values())[0]
+    context = Context.new(deps, QualifiedModuleIdent("M", Address.default()))
+    assert_equal(context.compiled_dependencies, {})
+    assert context.dependency(QualifiedModuleIdent("LibraTimestamp", Address.default())) is cached
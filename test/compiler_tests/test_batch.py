@@ -0,0 +1,90 @@
+from mol.compiler.batch import compile_batch, topological_order, BUILD_STATE_FILE
+from mol.compiler.main import main as compiler_main
+from mol.vm.file_format import CompiledModule, CompiledScript
+from libra.account_address import Address
+from libra.rustlib import assert_equal
+import json
+import pytest
+
+MODULE_A = """
+module A {
+    public one(): u64 {
+        return 1;
+    }
+}
+"""
+
+MODULE_B = """
+module B {
+    import 0x0.A;
+    public two(): u64 {
+        return A.one() + A.one();
+    }
+}
+"""
+
+SCRIPT = """
+import 0x0.B;
+main() {
+    let x: u64;
+    x = B.two();
+    return;
+}
+"""
+
+
+def write_tree(root):
+    (root / "a.mvir").write_text(MODULE_A)
+    (root / "sub").mkdir()
+    (root / "sub" / "b.mvir").write_text(MODULE_B)
+    (root / "main.mvir").write_text(SCRIPT)
+
+
+def test_topological_order():
+    graph = {"s": ["b"], "b": ["a"], "a": [], "c": []}
+    assert_equal(topological_order(graph), ["a", "b", "c", "s"])
+    with pytest.raises(ValueError):
+        topological_order({"a": ["b"], "b": ["a"]})
+
+
+def test_batch_compile(tmp_path):
+    write_tree(tmp_path)
+    report = compile_batch(str(tmp_path), Address.default())
+    assert_equal(sorted(report.compiled), ["a.mvir", "main.mvir", "sub/b.mvir"])
+    assert_equal(report.failed, {})
+    assert_equal(CompiledModule.deserialize((tmp_path / "sub" / "b.mv").read_bytes()).name(), "B")
+    CompiledScript.deserialize((tmp_path / "main.mv").read_bytes())
+    assert (tmp_path / "main.mvsm").exists()
+
+    report = compile_batch(str(tmp_path), Address.default())
+    assert_equal(report.compiled, [])
+    assert_equal(len(report.skipped), 3)
+
+    # Changing the body of A recompiles its dependents only if its output changed.
+    (tmp_path / "a.mvir").write_text(MODULE_A + "\n")
+    report = compile_batch(str(tmp_path), Address.default())
+    assert_equal(report.compiled, ["a.mvir"])
+    (tmp_path / "a.mvir").write_text(MODULE_A.replace("return 1;", "return 2;"))
+    report = compile_batch(str(tmp_path), Address.default())
+    assert_equal(report.compiled, ["a.mvir", "sub/b.mvir", "main.mvir"])
+
+
+def test_batch_failures(tmp_path):
+    write_tree(tmp_path)
+    (tmp_path / "a.mvir").write_text(MODULE_A.replace("return 1;", "return true;"))
+    report = compile_batch(str(tmp_path), Address.default())
+    assert_equal(sorted(report.failed), ["a.mvir", "main.mvir", "sub/b.mvir"])
+    assert_equal(report.failed["sub/b.mvir"], ["dependency a.mvir failed"])
+    state = json.loads((tmp_path / BUILD_STATE_FILE).read_text())
+    assert_equal(state["units"], {})
+
+
+def test_batch_manifest_on_process_pool(tmp_path, capsys):
+    write_tree(tmp_path)
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps(["sub/b.mvir", "a.mvir"]))
+    out_dir = tmp_path / "out"
+    compiler_main(["--batch", "-j", "2", "--out-dir", str(out_dir), str(manifest)])
+    assert "compiled 2, up to date 0, failed 0" in capsys.readouterr().out
+    assert (out_dir / "sub" / "b.mv").exists()
+    assert not (tmp_path / "main.mv").exists()
@@ -0,0 +1,100 @@
+from mol.compiler.compile_cache import CacheEntry, CompileCache
+from mol.functional_tests.ir_compiler import IRCompiler
+from mol.stdlib import stdlib_modules
+from libra.account_address import Address
+from libra.rustlib import assert_equal
+from pathlib import Path
+import pytest
+
+MODULE = """
+module M {
+    public f(x: u64): u64 {
+        return move(x) + 1;
+    }
+}
+"""
+
+SCRIPT = """
+import 0x0.LibraAccount;
+main() {
+    let x: u64;
+    x = LibraAccount.balance(get_txn_sender());
+    return;
+}
+"""
+
+
+def test_cache_hit_skips_compiling(tmp_path, monkeypatch):
+    cache = CompileCache.new(tmp_path)
+    deps = stdlib_modules()
+    address = Address.default()
+    unit = cache.compile("m.mvir", MODULE, address, deps)
+    assert not unit.cache_hit
+    assert_equal((cache.hits, cache.misses), (0, 1))
+
+    import mol.compiler.compile_cache as compile_cache
+    monkeypatch.setattr(compile_cache, "parse_script_or_module", None)
+    cached = CompileCache.new(tmp_path).compile("m.mvir", MODULE, address, deps)
+    assert cached.cache_hit
+    assert_equal(cached.module.serialize(), unit.module.serialize())
+    assert_equal(cached.source_map.serialize(), unit.source_map.serialize())
+    assert_equal(cached.parsed, unit.parsed)
+
+
+def test_cache_key():
+    cache = CompileCache(Path("unused"))
+    deps = stdlib_modules()
+    address = Address.default()
+    key = cache.key("m.mvir", MODULE, address, deps)
+    assert_equal(key, cache.key("m.mvir", MODULE, address, list(deps)))
+    assert key != cache.key("m.mvir", MODULE + " ", address, deps)
+    assert key != cache.key("n.mvir", MODULE, address, deps)
+    assert key != cache.key("m.mvir", MODULE, bytes([1] * 16), deps)
+    assert key != cache.key("m.mvir", MODULE, address, deps[:-1])
+    assert key != cache.key("m.mvir", MODULE, address, deps, optimize=True)
+    assert key != cache.key("m.mvir", MODULE, address, deps, inline=True)
+
+
+def test_script(tmp_path):
+    cache = CompileCache.new(tmp_path)
+    deps = stdlib_modules()
+    unit = cache.compile("s.mvir", SCRIPT, Address.default(), deps)
+    cached = cache.compile("s.mvir", SCRIPT, Address.default(), deps)
+    assert cached.is_script() and cached.cache_hit
+    assert_equal(cached.serialize(), unit.serialize())
+
+
+def test_errors_are_not_cached(tmp_path):
+    cache = CompileCache.new(tmp_path)
+    with pytest.raises(Exception):
+        cache.compile("m.mvir", "module M { f(x: T) { return; } }", Address.default(), [])
+    assert_equal(list(tmp_path.glob("*/*")), [])
+
+
+def test_corrupted_entry_is_a_miss(tmp_path):
+    cache = CompileCache.new(tmp_path)
+    deps = stdlib_modules()
+    address = Address.default()
+    unit = cache.compile("m.mvir", MODULE, address, deps)
+    path = cache.path(cache.key("m.mvir", MODULE, address, deps))
+    entry = CacheEntry.deserialize(path.read_bytes())
+    for corrupted in [
+        path.read_bytes()[:-1],
+        CacheEntry(entry.is_script, entry.compiled[:-1], entry.source_map, entry.parsed).serialize(),
+        CacheEntry(entry.is_script, entry.compiled, b"\x10", entry.parsed).serialize(),
+    ]:
+        path.write_bytes(corrupted)
+        assert cache.get(path.name) is None
+        recompiled = cache.compile("m.mvir", MODULE, address, deps)
+        assert not recompiled.cache_hit
+        assert_equal(recompiled.module.serialize(), unit.module.serialize())
+    assert cache.compile("m.mvir", MODULE, address, deps).cache_hit
+
+
+def test_ir_compiler_with_cache(tmp_path):
+    logs = []
+    for _ in range(2):
+        compiler = IRCompiler(cache=CompileCache.new(tmp_path))
+        compiler.compile(logs.append, Address.default(), SCRIPT)
+    assert_equal((compiler.cache.hits, compiler.cache.misses), (1, 0))
+    assert_equal(logs[0], logs[1])
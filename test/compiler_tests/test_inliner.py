@@ -0,0 +1,114 @@
+from __future__ import annotations
+from mol.bytecode_verifier import VerifiedModule
+from mol.compiler.ir_to_bytecode.compiler import compile_module
+from mol.compiler.ir_to_bytecode.parser import parse_module
+from mol.vm.file_format import FunctionDefinitionIndex
+from mol.vm import Opcodes
+from libra.account_address import Address
+from libra.rustlib import assert_equal
+
+MODULE = """
+module M {
+    max(a: u64, b: u64): u64 {
+        if (copy(a) > copy(b)) {
+            return move(a);
+        }
+        return move(b);
+    }
+
+    double(x: u64): u64 {
+        return copy(x) + move(x);
+    }
+
+    public quadruple(x: u64): u64 {
+        return Self.double(Self.double(move(x)));
+    }
+
+    public clamp(x: u64): u64 {
+        let y: u64;
+        y = Self.max(move(x), 10);
+        return move(y);
+    }
+
+    public nested(x: u64): u64 {
+        return 1 + Self.max(move(x), 10);
+    }
+
+    public generic<T: unrestricted>(x: T): T {
+        return move(x);
+    }
+
+    public not_inlined(x: u64): u64 {
+        return Self.quadruple(Self.generic<u64>(move(x)));
+    }
+
+    countdown(x: u64): u64 {
+        if (copy(x) == 0) {
+            return 0;
+        }
+        return Self.countdown(move(x) - 1);
+    }
+
+    public recursive(): u64 {
+        return Self.countdown(3);
+    }
+}
+"""
+
+
+def compile_inlined():
+    module = parse_module("m.mvir", MODULE)
+    (compiled, source_map) = compile_module(Address.default(), module, [], inline=True)
+    return (VerifiedModule.new(compiled).into_inner(), source_map)
+
+
+def function(module, name):
+    for (idx, fdef) in enumerate(module.function_defs()):
+        handle = module.function_handle_at(fdef.function)
+        if module.identifier_at(handle.name) == name:
+            return (idx, fdef)
+
+
+def calls(fdef):
+    return [instr for instr in fdef.code.code if instr.tag == Opcodes.CALL]
+
+
+def test_small_functions_are_inlined():
+    (module, source_map) = compile_inlined()
+    (idx, fdef) = function(module, "quadruple")
+    assert_equal(calls(fdef), [])
+    assert_equal([instr.tag for instr in fdef.code.code].count(Opcodes.ADD), 2)
+    (idx, fdef) = function(module, "clamp")
+    assert_equal(calls(fdef), [])
+
+
+def test_source_map_points_at_callee():
+    (module, source_map) = compile_inlined()
+    (idx, fdef) = function(module, "quadruple")
+    function_map = source_map.get_function_source_map(FunctionDefinitionIndex(idx))
+    add = [instr.tag for instr in fdef.code.code].index(Opcodes.ADD)
+    loc = function_map.get_code_location(add)
+    assert_equal(MODULE[loc.span.start:loc.span.end], "copy(x) + move(x)")
+    names = [name for (name, _) in function_map.locls]
+    assert_equal(names, ["x", "double.x", "double.x"])
+
+
+def test_functions_that_are_not_inlined():
+    (module, _) = compile_inlined()
+    # Public and generic callees.
+    assert_equal(len(calls(function(module, "not_inlined")[1])), 2)
+    # Recursive callees.
+    assert_equal(len(calls(function(module, "recursive")[1])), 1)
+    # A callee with branches while the caller has values on the stack does not verify.
+    assert_equal(len(calls(function(module, "nested")[1])), 1)
+
+
+def test_module_is_bounds_checked_once(monkeypatch):
+    from mol.vm.check_bounds import BoundsChecker
+    checks = []
+    verify = BoundsChecker.verify
+    monkeypatch.setattr(BoundsChecker, "verify", lambda self: checks.append(1) or verify(self))
+    module = parse_module("m.mvir", MODULE)
+    compile_module(Address.default(), module, [], inline=True)
+    # Once by the inliner, once when the compiler freezes the result.
+    assert_equal(len(checks), 2)
@@ -0,0 +1,95 @@
+from mol.compiler.ir_to_bytecode.syntax.lexer import Lexer, Tok, tokenize
+from mol.compiler.ir_to_bytecode.syntax.parse_error import ParseErrorInvalidToken
+from libra.rustlib import assert_equal
+import pytest
+
+
+def tokens(text):
+    return [(tok, text[start:end]) for (tok, start, end) in tokenize("test", text)]
+
+
+def test_tokenize_spans():
+    text = "  let x: u64 = 5u8;\n"
+    assert_equal(tokenize("test", text), [
+        (Tok.Let, 2, 5),
+        (Tok.NameValue, 6, 7),
+        (Tok.Colon, 7, 8),
+        (Tok.U64, 9, 12),
+        (Tok.Equal, 13, 14),
+        (Tok.U8Value, 15, 18),
+        (Tok.Semicolon, 18, 19),
+        (Tok.EOF, 20, 20),
+    ])
+
+
+def test_numbers():
+    assert_equal(tokens("0x1F 0x 0xg 7u64 8u128 9u16"), [
+        (Tok.AddressValue, "0x1F"),
+        (Tok.U64Value, "0"),
+        (Tok.NameValue, "x"),
+        (Tok.U64Value, "0"),
+        (Tok.NameValue, "xg"),
+        (Tok.U64Value, "7u64"),
+        (Tok.U128Value, "8u128"),
+        (Tok.U64Value, "9"),
+        (Tok.NameValue, "u16"),
+        (Tok.EOF, ""),
+    ])
+
+
+def test_names_with_trailing_punctuation():
+    assert_equal(tokens('h"0aF" x.f x.0 Foo<T> vector<u8> exists<T> move(x) copy (x)'), [
+        (Tok.ByteArrayValue, 'h"0aF"'),
+        (Tok.DotNameValue, "x.f"),
+        (Tok.NameValue, "x"),
+        (Tok.Period, "."),
+        (Tok.U64Value, "0"),
+        (Tok.NameBeginTyValue, "Foo<"),
+        (Tok.NameValue, "T"),
+        (Tok.Greater, ">"),
+        (Tok.Vector, "vector"),
+        (Tok.Less, "<"),
+        (Tok.U8, "u8"),
+        (Tok.Greater, ">"),
+        (Tok.Exists, "exists<"),
+        (Tok.NameValue, "T"),
+        (Tok.Greater, ">"),
+        (Tok.Move, "move("),
+        (Tok.NameValue, "x"),
+        (Tok.RParen, ")"),
+        (Tok.NameValue, "copy"),
+        (Tok.LParen, "("),
+        (Tok.NameValue, "x"),
+        (Tok.RParen, ")"),
+        (Tok.EOF, ""),
+    ])
+
+
+def test_operators():
+    text = "&mut x &&& ||| ==> == != ! <= << >= >> .. . := : % ^ [ ] { }"
+    assert_equal([tok for (tok, _) in tokens(text)], [
+        Tok.AmpMut, Tok.NameValue, Tok.AmpAmp, Tok.Amp, Tok.PipePipe, Tok.Pipe,
+        Tok.EqualEqualGreater, Tok.EqualEqual, Tok.ExclaimEqual, Tok.Exclaim,
+        Tok.LessEqual, Tok.LessLess, Tok.GreaterEqual, Tok.GreaterGreater,
+        Tok.PeriodPeriod, Tok.Period, Tok.ColonEqual, Tok.Colon, Tok.Percent, Tok.Caret,
+        Tok.LSquare, Tok.RSquare, Tok.LBrace, Tok.RBrace, Tok.EOF,
+    ])
+
+
+def test_spec_mode():
+    lexer = Lexer.new("test", "global<T> x.f")
+    lexer.spec_mode = True
+    lexer.advance()
+    assert_equal((lexer.peek(), lexer.content()), (Tok.Global, "global"))
+    assert_equal(lexer.lookahead(), Tok.Less)
+    lexer.spec_mode = False
+    for _ in range(4):
+        lexer.advance()
+    assert_equal((lexer.peek(), lexer.content()), (Tok.DotNameValue, "x.f"))
+    assert_equal(lexer.previous_end_loc(), 9)
+
+
+def test_invalid_token():
+    with pytest.raises(ParseErrorInvalidToken) as excinfo:
+        tokenize("test", "let x = \n  #")
+    assert_equal(excinfo.value.location.span.start, 11)
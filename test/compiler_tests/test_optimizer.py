@@ -0,0 +1,228 @@
+from __future__ import annotations
+from mol.bytecode_verifier import VerifiedModule, VerifiedScript, VerifyException
+from mol.compiler.ir_to_bytecode.compiler import compile_module, compile_script
+from mol.compiler.ir_to_bytecode.optimizer import optimize_code
+from mol.compiler.ir_to_bytecode.parser import parse_module, parse_script
+from mol.vm.file_format import (
+        Bytecode, FunctionDefinitionIndex, LocalsSignature, SerializedType, SignatureToken,
+    )
+from mol.vm import Opcodes
+from libra.account_address import Address
+from libra.rustlib import assert_equal
+from libra.vm_error import StatusCode
+import pytest
+
+
+def compile_optimized_script(code):
+    script = parse_script("file_name", code)
+    (compiled, source_map) = compile_script(Address.default(), script, [], optimize=True)
+    return (VerifiedScript.new(compiled).into_inner(), source_map)
+
+
+def tags(code):
+    return [instr.tag for instr in code]
+
+
+def u64_locals(count):
+    return LocalsSignature([SignatureToken(SerializedType.U64)] * count)
+
+
+def test_constant_folding():
+    (script, _) = compile_optimized_script("""
+        main() {
+            let x: u64;
+            let b: bool;
+            x = (2 + 3) * 4;
+            b = !(copy(x) < 1 + 1);
+            assert(move(b), copy(x));
+            return;
+        }
+    """)
+    code = script.main().code.code
+    assert_equal(code[0], Bytecode(Opcodes.LD_U64, 20))
+    assert Opcodes.ADD not in tags(code)
+    assert Opcodes.MUL not in tags(code)
+
+
+def test_failing_operations_are_kept():
+    code = [
+        Bytecode(Opcodes.LD_U8, 255),
+        Bytecode(Opcodes.LD_U8, 1),
+        Bytecode(Opcodes.ADD),
+        Bytecode(Opcodes.LD_U64, 1),
+        Bytecode(Opcodes.LD_U64, 0),
+        Bytecode(Opcodes.DIV),
+        Bytecode(Opcodes.LD_U64, 256),
+        Bytecode(Opcodes.CAST_U8),
+        Bytecode(Opcodes.RET),
+    ]
+    assert_equal(optimize_code(code, u64_locals(0)), (code, list(range(len(code)))))
+
+
+def test_constant_branches():
+    (script, _) = compile_optimized_script("""
+        main() {
+            let x: u64;
+            if (true) {
+                x = 1;
+            } else {
+                x = 2;
+            }
+            while (false) {
+                x = 3;
+            }
+            return;
+        }
+    """)
+    # `x` is never read: its store is dead.
+    assert_equal(tags(script.main().code.code), [Opcodes.RET])
+
+
+def test_branch_threading():
+    code = [
+        Bytecode(Opcodes.MOVE_LOC, 0),
+        Bytecode(Opcodes.BR_TRUE, 3),
+        Bytecode(Opcodes.RET),
+        Bytecode(Opcodes.BRANCH, 4),
+        Bytecode(Opcodes.BRANCH, 2),
+    ]
+    (optimized, origins) = optimize_code(code, u64_locals(1))
+    assert_equal(optimized, [
+        Bytecode(Opcodes.MOVE_LOC, 0),
+        Bytecode(Opcodes.POP),
+        Bytecode(Opcodes.RET),
+    ])
+    assert_equal(origins, [0, 1, 2])
+
+
+def test_dead_stores():
+    code = [
+        Bytecode(Opcodes.LD_U64, 1),
+        Bytecode(Opcodes.ST_LOC, 0),
+        Bytecode(Opcodes.MOVE_LOC, 0),
+        Bytecode(Opcodes.LD_TRUE),
+        Bytecode(Opcodes.POP),
+        Bytecode(Opcodes.RET),
+    ]
+    (optimized, origins) = optimize_code(code, u64_locals(2))
+    assert_equal(optimized, [Bytecode(Opcodes.LD_U64, 1), Bytecode(Opcodes.RET)])
+    assert_equal(origins, [0, 5])
+
+    references = LocalsSignature([
+        SignatureToken(SerializedType.REFERENCE, reference=SignatureToken(SerializedType.U64)),
+    ])
+    code = [Bytecode(Opcodes.ST_LOC, 0), Bytecode(Opcodes.MOVE_LOC, 0), Bytecode(Opcodes.RET)]
+    assert_equal(optimize_code(code, references)[0], code)
+
+
+def test_liveness():
+    code = [
+        Bytecode(Opcodes.LD_U64, 1),
+        Bytecode(Opcodes.ST_LOC, 0),
+        Bytecode(Opcodes.COPY_LOC, 0),
+        Bytecode(Opcodes.ST_LOC, 1),
+        Bytecode(Opcodes.COPY_LOC, 1),
+        Bytecode(Opcodes.POP),
+        Bytecode(Opcodes.COPY_LOC, 0),
+        Bytecode(Opcodes.BR_TRUE, 2),
+        Bytecode(Opcodes.RET),
+    ]
+    (optimized, origins) = optimize_code(code, u64_locals(2))
+    # `x` is read again in the loop, `y` is not.
+    assert_equal(optimized, [
+        Bytecode(Opcodes.LD_U64, 1),
+        Bytecode(Opcodes.ST_LOC, 0),
+        Bytecode(Opcodes.COPY_LOC, 0),
+        Bytecode(Opcodes.POP),
+        Bytecode(Opcodes.COPY_LOC, 0),
+        Bytecode(Opcodes.BR_TRUE, 2),
+        Bytecode(Opcodes.RET),
+    ])
+    assert_equal(origins, [0, 1, 2, 5, 6, 7, 8])
+
+    # Borrowed locals are always live.
+    code = [
+        Bytecode(Opcodes.LD_U64, 1),
+        Bytecode(Opcodes.ST_LOC, 0),
+        Bytecode(Opcodes.IMM_BORROW_LOC, 0),
+        Bytecode(Opcodes.LD_U64, 2),
+        Bytecode(Opcodes.ST_LOC, 0),
+        Bytecode(Opcodes.READ_REF),
+        Bytecode(Opcodes.RET),
+    ]
+    assert_equal(optimize_code(code, u64_locals(1))[0], code)
+
+
+def test_dead_store_of_copied_local():
+    (script, _) = compile_optimized_script("""
+        main() {
+            let x: u64;
+            let y: u64;
+            x = 1 + 2;
+            y = copy(x) * 2;
+            assert(copy(y) > 5, 42);
+            return;
+        }
+    """)
+    code = script.main().code.code
+    assert Opcodes.ST_LOC not in tags(code)
+    assert Opcodes.COPY_LOC not in tags(code)
+
+
+def test_functions_that_do_not_verify_are_kept():
+    for optimize in [False, True]:
+        script = parse_script("file_name", """
+            main() {
+                let x: u64;
+                x = false;
+                return;
+            }
+        """)
+        (compiled, _) = compile_script(Address.default(), script, [], optimize=optimize)
+        assert_equal(tags(compiled.as_inner().main.code.code), [
+            Opcodes.LD_FALSE, Opcodes.ST_LOC, Opcodes.RET,
+        ])
+        with pytest.raises(VerifyException) as excinfo:
+            VerifiedScript.new(compiled)
+        assert_equal(
+            [status.major_status for status in excinfo.value.vm_status],
+            [StatusCode.STLOC_TYPE_MISMATCH_ERROR],
+        )
+
+
+def test_branch_out_of_bounds_is_kept():
+    code = [Bytecode(Opcodes.LD_TRUE), Bytecode(Opcodes.POP), Bytecode(Opcodes.BRANCH, 3)]
+    assert_equal(optimize_code(code, u64_locals(0))[0], code)
+
+
+def test_source_map_is_remapped():
+    text = """
+        module M {
+            f(x: u64): u64 {
+                let y: u64;
+                y = 1 + 2;
+                if (copy(x) > copy(y)) {
+                    return move(x);
+                }
+                return move(y) * 3;
+            }
+        }
+    """
+    module = parse_module("file_name", text)
+    (plain, plain_map) = compile_module(Address.default(), module, [])
+    (optimized, source_map) = compile_module(Address.default(), module, [], optimize=True)
+    VerifiedModule.new(optimized)
+
+    f = FunctionDefinitionIndex(0)
+    plain_code = plain.function_def_at(f).code.code
+    code = optimized.function_def_at(f).code.code
+    assert len(code) < len(plain_code)
+    function_map = source_map.get_function_source_map(f)
+    assert max(function_map.code_map) < len(code)
+    # The multiplication is on the last line in both versions.
+    mul = tags(code).index(Opcodes.MUL)
+    plain_mul = tags(plain_code).index(Opcodes.MUL)
+    assert_equal(
+        source_map.get_code_location(f, mul),
+        plain_map.get_code_location(f, plain_mul),
+    )
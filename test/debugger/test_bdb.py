@@ -30,3 +30,58 @@ def test_mdb(capsys):
     assert "'<SELF>', 'main'" in output
     assert output.endswith("return ('00000000000000000000000000000000', 'LibraAccount', 'epilogue') []\n")
 
+
+
+# A tracer recording the events it is called with. `TracableFrame.trace_reset` resets the
+# object the tracer is bound to.
+class Recorder:
+    def __init__(self, drop_opcodes):
+        self.events = []
+        self.drop_opcodes = drop_opcodes
+
+    def reset(self):
+        pass
+
+    def trace(self, frame, event, arg):
+        if event == TraceType.CALL:
+            self.events.append((event, frame.pc))
+            return (None, self.trace_opcode)
+
+    def trace_opcode(self, frame, event, arg):
+        self.events.append((event, arg[0]))
+        if self.drop_opcodes:
+            return None
+        return self.trace_opcode
+
+
+def run_traced(tracer):
+    from mol.functional_tests.ir_compiler import IRCompiler
+    from mol.functional_tests import testsuite
+    from mol.stdlib import stdlib_modules
+    curdir = dirname(__file__)
+    filename = join(curdir, "../../ir-testsuite/tests/examples/transfer_money.mvir")
+    GlobalTracer.settrace(tracer)
+    try:
+        testsuite.functional_tests(IRCompiler(list(stdlib_modules())), filename)
+    finally:
+        GlobalTracer.settrace(None)
+
+
+def test_opcode_tracing():
+    recorder = Recorder(False)
+    run_traced(recorder.trace)
+    events = recorder.events
+    calls = [i for (i, (event, _)) in enumerate(events) if event == TraceType.CALL]
+    assert len(calls) > 0
+    # The first instruction of every frame is traced.
+    assert all(events[i + 1] == (TraceType.OPCODE, 0) for i in calls)
+    assert len(events) > 2 * len(calls)
+
+
+def test_dropped_opcode_tracing():
+    recorder = Recorder(True)
+    run_traced(recorder.trace)
+    events = [event for (event, _) in recorder.events]
+    assert len(events) > 0
+    # Once its callback is dropped, the frame runs untraced.
+    assert events == [TraceType.CALL, TraceType.OPCODE] * (len(events) // 2)
@@ -0,0 +1,87 @@
+from mol.e2e_tests.account import AccountData
+from mol.e2e_tests.data_store import FakeDataStore
+from mol.e2e_tests.executor import FakeExecutor, VMPublishingOption
+from libra.access_path import AccessPath
+from libra.account_address import Address
+from libra.rustlib import assert_equal
+import gc
+import pytest
+
+
+def path(n):
+    return AccessPath(Address.default(), bytes([n]))
+
+
+def test_fork_reads_through_to_parent():
+    store = FakeDataStore({})
+    store.set(path(1), b"one")
+    store.set(path(2), b"two")
+    fork = store.fork()
+    assert_equal(fork.depth(), 1)
+    assert_equal(fork.set(path(1), b"uno"), b"one")
+    assert_equal(fork.remove(path(2)), b"two")
+    fork.set(path(3), b"tres")
+
+    assert_equal(fork.get(path(1)), b"uno")
+    assert_equal(fork.get(path(2)), None)
+    assert_equal(fork.get(path(3)), b"tres")
+    assert_equal(dict(fork.items()), {path(1): b"uno", path(3): b"tres"})
+    assert_equal(dict(store.items()), {path(1): b"one", path(2): b"two"})
+
+    # A deleted path can be written again.
+    fork.set(path(2), b"dos")
+    assert_equal(fork.get(path(2)), b"dos")
+
+
+def test_parent_is_read_only_while_forked():
+    store = FakeDataStore({})
+    fork = store.fork()
+    with pytest.raises(AssertionError):
+        store.set(path(1), b"one")
+    fork.discard()
+    store.set(path(1), b"one")
+
+    fork = store.fork()
+    del fork
+    gc.collect()
+    store.set(path(2), b"two")
+
+
+def test_merge_and_discard():
+    store = FakeDataStore({})
+    store.set(path(1), b"one")
+    store.set(path(2), b"two")
+
+    fork = store.fork()
+    fork.remove(path(1))
+    fork.set(path(3), b"three")
+    fork.discard()
+    assert_equal(dict(store.items()), {path(1): b"one", path(2): b"two"})
+
+    fork = store.fork()
+    other = store.fork()
+    fork.remove(path(1))
+    fork.set(path(3), b"three")
+    with pytest.raises(AssertionError):
+        fork.merge()
+    other.discard()
+    assert fork.merge() is store
+    assert_equal(dict(store.items()), {path(2): b"two", path(3): b"three"})
+    assert_equal(store.forks.__len__(), 0)
+
+
+def test_executors_share_genesis():
+    first = FakeExecutor.custom_genesis(None, None, VMPublishingOption.Open)
+    second = FakeExecutor.custom_genesis(None, None, VMPublishingOption.Open)
+    assert first.data_store.base is second.data_store.base
+    assert_equal(first.data_store.data, {})
+
+    account_data = AccountData.new(1_000, 0)
+    fork = first.fork()
+    fork.add_account_data("alice", account_data)
+    account = account_data.into_account()
+    assert_equal(fork.read_balance_resource(account).coin, 1_000)
+    assert_equal(first.read_from_access_path(account.make_balance_access_path()), None)
+    first.merge(fork)
+    assert_equal(first.read_balance_resource(account).coin, 1_000)
+    assert_equal(second.read_from_access_path(account.make_balance_access_path()), None)
@@ -0,0 +1,47 @@
+from libra import Address
+from mol.compiler.bytecode_source_map.mapping import SourceMapping
+from mol.global_source_mapping import GlobalSourceMapping
+import pytest
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(GlobalSourceMapping, "mapping", {})
+    monkeypatch.setattr(GlobalSourceMapping, "std_files", {})
+    monkeypatch.setattr(GlobalSourceMapping, "std_indexed", False)
+    monkeypatch.setattr(GlobalSourceMapping, "std_modules", [])
+    monkeypatch.setattr(GlobalSourceMapping, "move2mvsm", {})
+    return GlobalSourceMapping
+
+
+def test_std_mappings_are_loaded_on_first_find(registry):
+    address = Address.default().hex()
+    registry.init_std_mapping()
+    assert registry.mapping == {}
+    assert f"{address}::LBR" in registry.std_files
+
+    mapping = registry.find(address, "LBR")
+    assert mapping.has_source_code_and_map()
+    assert mapping.source_code.path.endswith("lbr.move")
+    assert registry.find(address, "LBR") is mapping
+    assert f"{address}::LBR" not in registry.std_files
+    assert list(registry.mapping) == [f"{address}::LBR"]
+
+
+def test_std_modules_are_indexed_once(registry):
+    registry.init_std_mapping()
+    std_modules = list(registry.std_modules)
+    assert f"{Address.default().hex()}::LBR" in std_modules
+    registry.std_indexed = False
+    registry.init_std_mapping()
+    assert registry.std_modules == std_modules
+
+
+def test_missing_mappings_are_cached(registry):
+    assert registry.find("00", "Missing") is None
+    assert registry.std_indexed
+    assert "00::Missing" in registry.mapping
+
+    mapping = SourceMapping(None, None)
+    registry.add("00", "Missing", mapping)
+    assert registry.find("00", "Missing") is mapping
@@ -0,0 +1,78 @@
+from mol.functional_tests import testsuite
+from mol.functional_tests.ir_compiler import IRCompiler
+from mol.global_source_mapping import GlobalSourceMapping
+from mol.move_vm.runtime.coverage import Coverage, map_lines
+from mol.stdlib import stdlib_modules
+from libra.rustlib import assert_equal
+from os.path import join, dirname
+from types import SimpleNamespace
+from xml.etree import ElementTree
+import json
+
+
+def test_map_lines():
+    func_map = SimpleNamespace(code_map={
+        0: SimpleNamespace(line_no=10),
+        2: SimpleNamespace(line_no=11),
+        5: SimpleNamespace(line_no=10),
+        7: SimpleNamespace(line_no=12),
+    })
+    # Offsets 3 and 8.
+    assert_equal(map_lines(func_map, 0b100001000), {10: False, 11: True, 12: True})
+    assert_equal(map_lines(func_map, 0), {10: False, 11: False, 12: False})
+
+
+def test_merge():
+    first = Coverage()
+    first.bitmaps[("00::M", 0)] = 0b01
+    first.names[("00::M", 0)] = "f"
+    second = Coverage()
+    second.bitmaps[("00::M", 0)] = 0b10
+    second.bitmaps[("00::M", 1)] = 0b1
+    merged = Coverage()
+    merged.merge(json.loads(json.dumps(first.to_data())))
+    merged.merge(second.to_data())
+    assert_equal(merged.bitmaps, {("00::M", 0): 0b11, ("00::M", 1): 0b1})
+    assert_equal(merged.names, {("00::M", 0): "f"})
+
+
+def test_nested_coverages():
+    with Coverage() as outer:
+        with Coverage() as inner:
+            assert Coverage.active is inner
+        assert Coverage.active is outer
+    assert Coverage.active is None
+
+
+def test_cover_transaction(tmp_path):
+    curdir = dirname(__file__)
+    filename = join(curdir, "../../ir-testsuite/tests/payments/peer_to_peer_payment.mvir")
+    with Coverage() as coverage:
+        testsuite.functional_tests(IRCompiler(list(stdlib_modules())), filename)
+    assert Coverage.active is None
+
+    GlobalSourceMapping.init_std_mapping()
+    modules = {
+        module.name: module for module in coverage.line_coverage(GlobalSourceMapping.std_modules)
+    }
+    functions = {function.name: function for function in modules["Libra"].functions}
+    deposit = functions["deposit"]
+    assert deposit.executed
+    assert_equal(deposit.lines_covered(), len(deposit.lines))
+    assert not functions["burn"].executed
+    assert_equal(functions["burn"].lines_covered(), 0)
+    # Modules that did not run are reported too.
+    assert not modules["FixedPoint32"].executed
+
+    coverage.write_lcov(tmp_path / "move.info")
+    records = (tmp_path / "move.info").read_text().split("end_of_record\n")
+    assert any(f"SF:{modules['Libra'].path}\n" in record for record in records)
+
+    coverage.write_cobertura(tmp_path / "coverage.xml")
+    root = ElementTree.parse(tmp_path / "coverage.xml").getroot()
+    libra = root.find("packages/package/classes/class[@name='Libra']")
+    assert_equal(libra.get("filename"), modules["Libra"].path)
+    assert_equal(
+        int(root.get("lines-covered")),
+        sum(module.lines_covered() for module in modules.values()),
+    )
@@ -0,0 +1,97 @@
+from mol.e2e_tests.common_transactions import peer_to_peer_txn
+from mol.e2e_tests.executor import FakeExecutor, VMPublishingOption
+from mol.libra_vm import LibraVM
+from mol.move_vm.runtime.coverage import Coverage
+from mol.move_vm.runtime.execution_counters import CounterSet, ExecutionCounters, histogram_bucket
+from mol.vm.file_format_common import Opcodes
+from libra.transaction import Transaction, TransactionStatus
+from libra.vm_error import StatusCode
+from libra.rustlib import assert_equal
+import json
+
+
+def test_histogram_bucket():
+    assert_equal(histogram_bucket(0.0), 0)
+    assert_equal(histogram_bucket(1e-9), 1)
+    assert_equal(histogram_bucket(1e-6), 10)
+
+
+def test_merge():
+    txn = CounterSet()
+    txn.counts[Opcodes.ADD] += 3
+    txn.record_time(Opcodes.ADD, 1e-6)
+    txn.record_native("Vector::length", 1e-6)
+    total = CounterSet()
+    total.merge(txn)
+    total.merge(txn)
+    opcodes = total.opcodes()
+    assert_equal(list(opcodes), ["ADD"])
+    assert_equal(opcodes["ADD"]["count"], 6)
+    assert_equal(opcodes["ADD"]["histogram_ns"], {"1024": 2})
+    assert_equal(total.natives["Vector::length"].calls, 2)
+
+
+def test_count_block():
+    executor = FakeExecutor.custom_genesis(None, None, VMPublishingOption.Open)
+    (sender, receiver) = executor.create_accounts(2, 10_000_000_000, 0)
+    txns = [peer_to_peer_txn(sender, receiver, seq_num, 10) for seq_num in range(2)]
+
+    vm = LibraVM.new()
+    counters = vm.enable_counters(sample_rate=1)
+    outputs = vm.execute_block_impl(
+        [Transaction('UserTransaction', txn) for txn in txns],
+        executor.get_state_view(),
+    )
+    for output in outputs:
+        assert_equal(output.status.tag, TransactionStatus.Keep)
+        assert_equal(output.status.vm_status.major_status, StatusCode.EXECUTED)
+    assert ExecutionCounters.active is None
+
+    assert_equal(len(counters.blocks), 1)
+    block = counters.blocks[0]
+    assert_equal(
+        [(txn.sender, txn.sequence_number) for txn in block.transactions],
+        [(sender.address().hex(), 0), (sender.address().hex(), 1)],
+    )
+    (first, second) = [txn.counters for txn in block.transactions]
+    assert first.instructions() > 0
+    # The two transfers run the same code.
+    assert_equal(first.counts, second.counts)
+    assert_equal(block.total.instructions(), 2 * first.instructions())
+    # Every instruction is timed with a sample rate of 1.
+    assert_equal(first.sampled, first.counts)
+    # Natives are keyed by module and function.
+    assert_equal(first.natives["LibraAccount::write_to_event_store"].calls, 2)
+
+    report = json.loads(json.dumps(counters.to_json()))
+    assert_equal(report["total"]["instructions"], 2 * first.instructions())
+    assert report["total"]["opcodes"]["CALL"]["count"] > 0
+
+    # Counting does not change the outputs.
+    assert_equal(
+        [output.gas_used for output in LibraVM.execute_block(
+            [Transaction('UserTransaction', txn) for txn in txns],
+            executor.get_state_view(),
+        )],
+        [output.gas_used for output in outputs],
+    )
+
+
+def test_count_and_cover_block():
+    executor = FakeExecutor.custom_genesis(None, None, VMPublishingOption.Open)
+    (sender, receiver) = executor.create_accounts(2, 10_000_000_000, 0)
+    block = [Transaction('UserTransaction', peer_to_peer_txn(sender, receiver, 0, 10))]
+
+    vm = LibraVM.new()
+    counted = vm.enable_counters(sample_rate=0)
+    vm.execute_block_impl(block, executor.get_state_view())
+    with Coverage() as covered:
+        LibraVM.execute_block(block, executor.get_state_view())
+
+    vm = LibraVM.new()
+    counters = vm.enable_counters(sample_rate=0)
+    with Coverage() as coverage:
+        vm.execute_block_impl(block, executor.get_state_view())
+    # Both are recorded, as when only one of them is active.
+    assert_equal(counters.blocks[0].total.counts, counted.blocks[0].total.counts)
+    assert_equal(coverage.bitmaps, covered.bitmaps)
@@ -0,0 +1,80 @@
+from mol.e2e_tests.common_transactions import PEER_TO_PEER, peer_to_peer_txn
+from mol.e2e_tests.executor import FakeExecutor, VMPublishingOption
+from mol.libra_vm import LibraVM
+from mol.move_vm.runtime.gas_meter import GasProfiler, INTRINSIC, NATIVE
+from libra.transaction import TransactionArgument, TransactionStatus
+from libra.vm_error import StatusCode
+from libra.rustlib import assert_equal
+import json
+
+
+def find(node, name):
+    if node.name == name:
+        return node
+    for child in node.children.values():
+        found = find(child, name)
+        if found is not None:
+            return found
+    return None
+
+
+def new_accounts():
+    executor = FakeExecutor.custom_genesis(None, None, VMPublishingOption.Open)
+    (sender, receiver) = executor.create_accounts(2, 10_000_000_000, 0)
+    return (executor, sender, receiver)
+
+
+def test_dry_run_transfer():
+    (executor, sender, receiver) = new_accounts()
+    txn = peer_to_peer_txn(sender, receiver, 0, 10)
+    (output, gas_profiler) = LibraVM.new().dry_run(txn, executor.get_state_view())
+    assert_equal(output.status.vm_status.major_status, StatusCode.EXECUTED)
+    # Every unit of gas used is attributed, at a gas unit price of 1.
+    assert_equal(gas_profiler.total_gas(), output.gas_used)
+
+    root = gas_profiler.root
+    assert root.charges[(INTRINSIC, None)].gas > 0
+    (main,) = root.children.values()
+    assert_equal(main.calls, 1)
+    pay = find(main, "0x0::LibraAccount::pay_from_sender")
+    assert_equal(pay.calls, 1)
+    assert pay.total_gas() > pay.self_gas() > 0
+    # Natives are charged in their own node.
+    empty = find(main, "0x0::Vector::empty")
+    assert_equal(list(empty.charges), [(NATIVE, None)])
+
+    report = json.loads(json.dumps(gas_profiler.to_json()))
+    assert_equal(report["total_gas"], output.gas_used)
+    assert {"kind", "size", "count", "gas"} == set(report["charges"][0])
+
+    # Nothing was committed.
+    assert_equal(executor.read_account_resource(sender).sequence_number, 0)
+
+
+def test_dry_run_out_of_gas():
+    (executor, sender, receiver) = new_accounts()
+    args = [
+        TransactionArgument('Address', receiver.address()),
+        TransactionArgument('U8Vector', receiver.auth_key_prefix()),
+        TransactionArgument('U64', 10),
+    ]
+    txn = sender.create_signed_txn_with_args(PEER_TO_PEER, args, 0, 700, 1)
+    vm = LibraVM.new()
+    (output, gas_profiler) = vm.dry_run(txn, executor.get_state_view())
+    assert_equal(output.status.tag, TransactionStatus.Keep)
+    assert_equal(output.status.vm_status.major_status, StatusCode.OUT_OF_GAS)
+    # The last charge is only attributed what was left.
+    assert_equal(gas_profiler.total_gas(), 700)
+    assert vm.gas_profiler is None
+
+
+def test_aborted_calls_are_closed():
+    gas_profiler = GasProfiler()
+    gas_profiler.enter("0x1::M::f")
+    gas_profiler.enter("0x1::M::g")
+    gas_profiler.begin_execution()
+    gas_profiler.enter("0x1::M::f")
+    gas_profiler.exit()
+    gas_profiler.exit()
+    assert_equal(gas_profiler.stack, [gas_profiler.root])
+    assert_equal(gas_profiler.root.children["0x1::M::f"].calls, 2)
@@ -1,12 +1,19 @@
 from mol.vm import *
 from mol.move_vm.state.data_cache import RemoteCache, BlockDataCache
 from mol.move_vm.state.execution_context import SystemExecutionContext, TransactionExecutionContext
-from mol.move_vm.runtime.code_cache import VMModuleCache
+from mol.move_vm.runtime.code_cache import (
+    VMModuleCache, build_shared_module_cache, install_shared_module_cache,
+    uninstall_shared_module_cache, fork_context
+    )
+from mol.move_vm.runtime.move_vm import MoveVM
+from mol.move_vm.runtime.runtime import VMRuntime
 from mol.move_vm.runtime.loaded_data import FunctionRef, FunctionReference, LoadedModule
 from mol.bytecode_verifier import VerifiedModule, VerifiedScript
 from mol.compiler.lib import Compiler
 from libra_storage.state_view import StateView
 from libra.access_path import AccessPath
+from libra.hasher import HashValue
+from libra.transaction.write_set import WriteOp, WriteSet
 from libra.account_address import Address
 from libra.language_storage import ModuleId
 from libra.vm_error import StatusCode, VMStatus, StatusType
@@ -21,6 +28,7 @@ from dataclasses import dataclass, field
 from libra.rustlib import *
 import pytest
 import os, json
+import gc
 from os import listdir
 from os.path import isfile, join, abspath, dirname
 
@@ -602,3 +610,153 @@ module Test {
     errors = excinfo.value.vm_status
     assert (errors[0].status_type() == StatusType.Verification)
     assert (errors[0].major_status == StatusCode.INVALID_RESOURCE_FIELD)
+
+
+def test_cache_module_same_code_is_noop():
+    vm_cache = VMModuleCache()
+    module = gen_test_module("module")
+    mod_id = module.self_id()
+    vm_cache.cache_module(module)
+    loaded = vm_cache.cmap[mod_id]
+    version = vm_cache.version_of(mod_id)
+    assert version is not None
+
+    assert vm_cache.cache_module(gen_test_module("module")) == set()
+    assert vm_cache.cmap[mod_id] is loaded
+    assert vm_cache.version_of(mod_id) == version
+
+
+def test_invalidate_drops_dependents():
+    vm_cache = VMModuleCache()
+    data_cache = FakeDataCache()
+    code1 = """
+        module M1 {
+            struct X { b: bool }
+        }
+    """
+    code2 = """
+        module M2 {
+            import 0x""" + Address.default().hex() + """.M1;
+            struct T { i: u64, x: M1.X }
+        }
+    """
+    module1 = parse_and_compile_module(code1)
+    data_cache.set(module1)
+    module2 = parse_and_compile_module(code2, [module1])
+    data_cache.set(module2)
+    ctx = SystemExecutionContext.new(data_cache, GasUnits.new(0))
+
+    module_id_1 = ModuleId(Address.default(), "M1")
+    module_id_2 = ModuleId(Address.default(), "M2")
+    vm_cache.get_loaded_module(module_id_1, ctx)
+    vm_cache.get_loaded_module(module_id_2, ctx)
+    vm_cache.cache_module(gen_test_module("module"))
+    assert vm_cache.version_of(module_id_1) == HashValue.from_sha3_256(module1.serialize())
+
+    removed = vm_cache.invalidate(module_id_1)
+    assert removed == {module_id_1, module_id_2}
+    assert module_id_1 not in vm_cache.cmap
+    assert module_id_2 not in vm_cache.cmap
+    assert vm_cache.version_of(module_id_2) is None
+    assert ModuleId(Address.default(), "module") in vm_cache.cmap
+
+    # Reloads from the data view after invalidation.
+    module2_ref = vm_cache.get_loaded_module(module_id_2, ctx)
+    assert module2_ref.self_id() == module_id_2
+
+    vm_cache.flush()
+    assert not vm_cache.cmap
+    assert not vm_cache.dependents
+
+
+def test_reload_verified_module_lazily():
+    vm_cache = VMModuleCache()
+    data_cache = FakeDataCache()
+    code = """
+        module M {
+            public f(): u64 { return 1; }
+            public g(): u64 { return 2; }
+        }
+    """
+    module = parse_and_compile_module(code)
+    data_cache.set(module)
+    ctx = SystemExecutionContext.new(data_cache, GasUnits.new(0))
+    module_id = ModuleId(Address.default(), "M")
+
+    module_ref = vm_cache.get_loaded_module(module_id, ctx)
+    assert all(x.code.is_decoded() for x in module_ref.function_defs())
+    assert HashValue.from_sha3_256(module.serialize()) in vm_cache.verified
+
+    # The same code is not verified again after the cache is flushed.
+    vm_cache.flush()
+    module_ref = vm_cache.get_loaded_module(module_id, ctx)
+    assert not any(x.code.is_decoded() for x in module_ref.function_defs())
+    func = module_ref.function_defs_table["g"]
+    fdef = module_ref.f_defs[func.into_index()]
+    assert fdef._code is None and fdef.code_unit is not None
+    assert_equal(fdef.code, [
+        Bytecode(Opcodes.LD_U64, 2),
+        Bytecode(Opcodes.RET),
+    ])
+    assert fdef.code_unit is None
+    assert module_ref.function_def_at(func).code.is_decoded()
+    assert not module_ref.function_def_at(module_ref.function_defs_table["f"]).code.is_decoded()
+
+
+def test_invalidate_write_set():
+    runtime = VMRuntime.new()
+    module = gen_test_module("module")
+    mod_id = module.self_id()
+    runtime.cache_module(module)
+    script = gen_test_script().into_inner().serialize()
+    data_cache = FakeDataCache()
+    data_cache.set(module.into_inner())
+    ctx = SystemExecutionContext.new(data_cache, GasUnits.new(0))
+    runtime.script_cache.cache_script(script, ctx)
+    assert runtime.script_cache.cmap
+
+    resource_ap = AccessPath(Address.default(), bytes([AccessPath.RESOURCE_TAG]))
+    untouched = WriteSet([(resource_ap, WriteOp('Deletion'))])
+    assert runtime.invalidate_write_set(untouched) == set()
+    assert mod_id in runtime.code_cache.cmap
+    assert runtime.script_cache.cmap
+
+    publish = WriteSet([(mod_id.into(), WriteOp('Value', module.serialize()))])
+    assert runtime.invalidate_write_set(publish) == {mod_id}
+    assert mod_id not in runtime.code_cache.cmap
+    assert not runtime.script_cache.cmap
+    assert not runtime.script_cache.deps
+
+
+def _shared_module_info(mod_id, queue):
+    vm = MoveVM.new()
+    loaded = vm.runtime.code_cache.cmap.get(mod_id)
+    queue.put((loaded is not None, id(loaded), gc.get_freeze_count() > 0))
+
+
+def test_shared_module_cache_fork():
+    module = gen_test_module("module")
+    mod_id = module.self_id()
+    shared = build_shared_module_cache([module])
+    install_shared_module_cache(shared)
+    try:
+        vm = MoveVM.new()
+        assert vm.runtime.code_cache is not shared
+        assert vm.runtime.code_cache.cmap[mod_id] is shared.cmap[mod_id]
+
+        # Invalidating in one VM leaves the shared cache untouched.
+        vm.invalidate(mod_id)
+        assert mod_id in shared.cmap
+
+        ctx = fork_context()
+        queue = ctx.Queue()
+        worker = ctx.Process(target=_shared_module_info, args=(mod_id, queue))
+        worker.start()
+        found, loaded_id, frozen = queue.get(timeout=60)
+        worker.join()
+        assert found
+        assert loaded_id == id(shared.cmap[mod_id])
+        assert frozen
+    finally:
+        uninstall_shared_module_cache()
+    assert MoveVM.new().runtime.code_cache.cmap == {}
@@ -0,0 +1,113 @@
+from mol.functional_tests import testsuite
+from mol.functional_tests.ir_compiler import IRCompiler
+from mol.move_vm.runtime.profiler import Profiler
+from mol.move_vm.runtime.trace_help import GlobalTracer
+from mol.stdlib import stdlib_modules
+from libra.rustlib import assert_equal
+from os.path import join, dirname
+import pstats
+
+
+def test_recursive_calls():
+    profiler = Profiler()
+    profiler.enter("0x1::M::f", 100)
+    profiler.enter("0x1::M::g", 90)
+    profiler.enter("0x1::M::f", 80)
+    profiler.exit(70)
+    profiler.exit(60)
+    profiler.enter("0x0::Vector::length", 60)
+    profiler.exit(59)
+    profiler.exit(50)
+
+    f = profiler.functions["0x1::M::f"]
+    assert_equal((f.calls, f.primitive_calls), (2, 1))
+    assert_equal((f.exclusive_gas, f.inclusive_gas), (29, 50))
+    g = profiler.functions["0x1::M::g"]
+    assert_equal((g.exclusive_gas, g.inclusive_gas), (20, 30))
+    assert_equal(set(g.callers), {"0x1::M::f"})
+    assert_equal(profiler.collapsed_stacks("gas"), [
+        "0x1::M::f 19",
+        "0x1::M::f;0x0::Vector::length 1",
+        "0x1::M::f;0x1::M::g 20",
+        "0x1::M::f;0x1::M::g;0x1::M::f 10",
+    ])
+
+
+def test_aborted_calls_are_closed():
+    profiler = Profiler()
+    profiler.enter("0x1::M::f", 100)
+    profiler.enter("0x1::M::g", 90)
+    profiler.reset()
+    assert_equal(profiler.calls, [])
+    assert_equal(profiler.functions["0x1::M::f"].inclusive_gas, 10)
+
+
+def test_profile_transaction(tmp_path):
+    curdir = dirname(__file__)
+    filename = join(curdir, "../../ir-testsuite/tests/payments/peer_to_peer_payment.mvir")
+    profiler = Profiler()
+    with profiler:
+        testsuite.functional_tests(IRCompiler(list(stdlib_modules())), filename)
+    assert GlobalTracer.gettrace() is None
+
+    pay = profiler.functions["0x0::LibraAccount::pay_from_sender"]
+    assert_equal(pay.calls, 1)
+    assert pay.inclusive_time >= pay.exclusive_time > 0
+    assert pay.inclusive_gas > pay.exclusive_gas > 0
+    # Natives are profiled too.
+    assert "0x0::Vector::empty" in profiler.functions
+
+    profiler.dump_stats(tmp_path / "move.prof")
+    stats = pstats.Stats(str(tmp_path / "move.prof")).stats
+    assert_equal(stats[("0x0::LibraAccount", 0, "pay_from_sender")][:2], (1, 1))
+
+    profiler.write_collapsed(tmp_path / "move.folded")
+    for line in (tmp_path / "move.folded").read_text().splitlines():
+        (stack, weight) = line.rsplit(" ", 1)
+        assert int(weight) > 0
+
+
+def test_recursive_callers(tmp_path, capsys):
+    filename = tmp_path / "countdown.mvir"
+    filename.write_text("""
+//! account: default, 1000000
+
+module M {
+    public countdown(x: u64) {
+        if (copy(x) > 0) {
+            Self.countdown(move(x) - 1);
+        }
+        return;
+    }
+}
+
+
+//! new-transaction
+import {{default}}.M;
+
+main() {
+    M.countdown(3);
+    return;
+}
+
+// check: EXECUTED
+""")
+    profiler = Profiler()
+    with profiler:
+        testsuite.functional_tests(IRCompiler(list(stdlib_modules())), str(filename))
+    profiler.dump_stats(tmp_path / "move.prof")
+    stats = pstats.Stats(str(tmp_path / "move.prof"))
+
+    ((countdown, entry),) = [
+        (key, entry) for (key, entry) in stats.stats.items() if key[2] == "countdown"
+    ]
+    (primitive_calls, calls, _, _, callers) = entry
+    assert_equal((primitive_calls, calls), (1, 4))
+    # Caller entries are (calls, primitive calls, ...), as in cProfile.
+    assert_equal(callers[countdown][:2], (3, 0))
+    ((main, main_entry),) = [(key, entry) for (key, entry) in callers.items() if key != countdown]
+    assert_equal(main[2], "main")
+    assert_equal(main_entry[:2], (1, 1))
+
+    stats.print_callers("countdown")
+    assert "3/0" in capsys.readouterr().out
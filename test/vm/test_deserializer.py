@@ -64,3 +64,108 @@ def test_malformed_6():
     vm_error = excinfo.value.vm_status[0]
     assert vm_error.major_status == StatusCode.UNKNOWN_VERSION
 
+
+
+def deserialize_status(deserialize, binary):
+    try:
+        return deserialize(binary)
+    except VMException as err:
+        return err.vm_status[0].major_status
+    except Exception:
+        return StatusCode.MALFORMED
+
+
+def test_fast_deserializer_same_modules():
+    from mol.stdlib import parse_stdlib_file
+    from mol.vm import deserializer, fast_deserializer
+    for code in parse_stdlib_file():
+        module = fast_deserializer.deserialize_compiled_module(code)
+        assert module == deserializer.deserialize_compiled_module(code)
+        assert module.serialize() == code
+
+
+def test_fast_deserializer_same_scripts():
+    from os import listdir
+    from os.path import join, dirname
+    from mol.vm import deserializer, fast_deserializer
+    sdir = join(dirname(__file__), "../../mol/stdlib/staged/transaction_scripts")
+    for mv in sorted(listdir(sdir)):
+        with open(join(sdir, mv), 'rb') as file:
+            code = file.read()
+        script = fast_deserializer.deserialize_compiled_script(code)
+        assert script == deserializer.deserialize_compiled_script(code)
+        assert script.serialize() == code
+
+
+def test_fast_deserializer_same_errors():
+    import random
+    from mol.stdlib import parse_stdlib_file
+    from mol.vm import deserializer, fast_deserializer
+    rng = random.Random(7)
+    for code in parse_stdlib_file()[:8]:
+        for _ in range(40):
+            binary = bytearray(code)
+            if rng.random() < 0.3:
+                binary = binary[:rng.randrange(len(binary))]
+            else:
+                binary[rng.randrange(len(binary))] = rng.randrange(256)
+            binary = bytes(binary)
+            expected = deserialize_status(deserializer.deserialize_compiled_module, binary)
+            actual = deserialize_status(fast_deserializer.deserialize_compiled_module, binary)
+            assert actual == expected
+
+
+def test_serialized_bytes_cached():
+    from mol.stdlib import parse_stdlib_file
+    from libra.hasher import HashValue
+    code = parse_stdlib_file()[0]
+    module = CompiledModule.deserialize(code)
+    assert module.serialize() is module.binary
+    assert module.hash_value() == HashValue.from_sha3_256(code)
+
+    inner = module.into_inner()
+    assert module.binary is None and module.sha3_256 is None
+    fresh = inner.freeze()
+    assert fresh.binary is None
+    assert fresh.serialize() == code
+    assert fresh.serialize() is fresh.binary
+
+
+def test_lazy_module():
+    from mol.stdlib import parse_stdlib_file
+    for code in parse_stdlib_file():
+        eager = CompiledModule.deserialize(code)
+        lazy = CompiledModule.deserialize_lazy(code)
+        for (fdef, lazy_fdef) in zip(eager.function_defs(), lazy.function_defs()):
+            assert not lazy_fdef.code.is_decoded()
+            assert lazy_fdef.code.locals == fdef.code.locals
+            assert lazy_fdef.code.code == fdef.code.code
+            assert lazy_fdef.code.is_decoded()
+        assert lazy.serialize() is lazy.binary
+        assert bytes(lazy.as_inner().serialize()) == code
+
+
+def test_lazy_module_bounds_checked_on_access():
+    from mol.vm.file_format import empty_module, CodeUnit, FunctionDefinition, FunctionHandle
+    from mol.vm.file_format import FunctionSignature, FunctionHandleIndex, ModuleHandleIndex
+    from mol.vm.file_format import IdentifierIndex, FunctionSignatureIndex, Bytecode
+    module = empty_module()
+    module.function_signatures.append(FunctionSignature([], [], []))
+    module.identifiers.append("f")
+    module.function_handles.append(FunctionHandle(
+        ModuleHandleIndex(0),
+        IdentifierIndex(1),
+        FunctionSignatureIndex(0),
+    ))
+    code_unit = CodeUnit()
+    code_unit.code = [Bytecode(Opcodes.COPY_LOC, 3), Bytecode(Opcodes.RET)]
+    module.function_defs.append(FunctionDefinition(FunctionHandleIndex(0), 0, [], code_unit))
+    binary = module.serialize()
+
+    lazy = CompiledModule.deserialize_lazy(binary)
+    with pytest.raises(VMException) as excinfo:
+        lazy.function_defs()[0].code.code
+    vm_error = excinfo.value.vm_status[0]
+    assert vm_error.major_status == StatusCode.INDEX_OUT_OF_BOUNDS
+    with pytest.raises(VMException):
+        CompiledModule.deserialize(binary)
@@ -11,7 +11,7 @@ def test_placeholder_script_deserialize():
         code = file.read()
         placeholder_program = Script(code, [])
         obj = CompiledScript.deserialize(placeholder_program.code)
-        bstr = obj.serialize()
+        bstr = obj.as_inner().serialize()
         assert code == bstr
 
 
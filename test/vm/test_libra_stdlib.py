@@ -19,7 +19,7 @@ def ser_deser_script(filename):
         code = file.read()
         placeholder_program = Script(code, [])
         obj = CompiledScript.deserialize(placeholder_program.code)
-        bstr = obj.serialize()
+        bstr = obj.as_inner().serialize()
         assert code == bstr
 
 
@@ -27,6 +27,6 @@ def test_std_module():
     modules = parse_stdlib_file()
     for code in modules:
         obj = CompiledModule.deserialize(code)
-        bstr = obj.serialize()
+        bstr = bytes(obj.as_inner().serialize())
         assert code == bstr
 